@@ -2,9 +2,20 @@ import streamlit as st
 import pandas as pd
 import database as db
 import logic
+import reports
+import reorder
+import cart
+import reservations
+import image_reconcile
+import backup
+import search_index
+import supply_orders
+import instrumentation
+from instrumentation import timed, timer
 import config
 import os
 import time
+import uuid
 
 st.set_page_config(page_title="Stock Management S.A.", layout="wide")
 
@@ -32,30 +43,132 @@ st.markdown("""
 
 # --- Session State ---
 if 'cart' not in st.session_state:
-    st.session_state.cart = []
+    st.session_state.cart = cart.Cart('sale_price')
 if 'last_log' not in st.session_state:
     st.session_state.last_log = None
 if 'supply_order' not in st.session_state:
-    st.session_state.supply_order = []
+    st.session_state.supply_order = cart.Cart('cost_price')
+if 'bulk_page' not in st.session_state:
+    st.session_state.bulk_page = 1
+if 'bulk_editor_version' not in st.session_state:
+    # Bumped after each bulk add so the order grid starts empty again
+    st.session_state.bulk_editor_version = 0
+if 'till_id' not in st.session_state:
+    # Identifies this browser session's stock reservations
+    st.session_state.till_id = uuid.uuid4().hex
+
+
+# --- Helpers ---
+PLACEHOLDER_IMAGE = "https://placehold.co/150x150?text=No+Image"
+BULK_PAGE_SIZE = 50  # rows per page in the bulk order grid
+
+@timed("ui.resolve_image")
+def resolve_image(prod):
+    """Local image path for a product (DB path, then static/<code>.jpg), or the placeholder."""
+    # Verified by image_reconcile.py / the ETL: no filesystem access needed
+    has_image = prod.get('has_image')
+    if has_image == 0:
+        return PLACEHOLDER_IMAGE
+    if has_image == 1 and prod.get('image_path'):
+        return os.path.join(config.BASE_DIR, prod['image_path'].replace('\\', '/'))
+
+    # Not verified yet - probe the filesystem
+    db_rel_path = prod.get('image_path')
+    if db_rel_path:
+        db_rel_path = db_rel_path.replace('\\', '/')
+        abs_path = os.path.join(config.BASE_DIR, db_rel_path)
+        if os.path.exists(abs_path):
+            return abs_path
+    
+    fallback_abs_path = os.path.join(config.STATIC_DIR, config.image_filename(prod['code']))
+    if os.path.exists(fallback_abs_path):
+        return fallback_abs_path
+    
+    return PLACEHOLDER_IMAGE
+
+def _facet_select(label, counts, key, on_change=None):
+    """Selectbox over facet values labelled with their counts. None = all."""
+    options = [None] + list(counts)
+    current = st.session_state.get(key)
+    if current is not None and current not in counts:
+        # The other facet filtered it out - keep it selectable so it can be cleared
+        options.append(current)
+    total = sum(counts.values())
+    return st.selectbox(
+        label, options, key=key, on_change=on_change,
+        format_func=lambda v: f"Todas ({total})" if v is None else f"{v} ({counts.get(v, 0)})"
+    )
+
+def facet_filters(key, in_stock_only=False, on_change=None):
+    """Brand and category filters with live counts. Returns (brand, category)."""
+    # Counts for each facet are narrowed by the selection on the other one
+    brand = st.session_state.get(f"{key}_brand")
+    category = st.session_state.get(f"{key}_category")
+    brand_counts = dict(db.get_facet_counts('brand', category=category, in_stock_only=in_stock_only))
+    category_counts = dict(db.get_facet_counts('category', brand=brand, in_stock_only=in_stock_only))
+
+    col_brand, col_category = st.columns(2)
+    with col_brand:
+        brand = _facet_select("Marca", brand_counts, f"{key}_brand", on_change)
+    with col_category:
+        category = _facet_select("Categoría", category_counts, f"{key}_category", on_change)
+    return brand, category
+
+def reset_stock_page():
+    st.session_state.stock_page = 1
+
+def reset_bulk_page():
+    st.session_state.bulk_page = 1
 
 
 # --- Sidebar ---
 with st.sidebar:
     st.title("Settings")
+    if st.button("🖼️ Verificar Imágenes", help="Validate every image in static/ and fix product image paths"):
+        with st.spinner("Verificando imágenes..."):
+            summary = image_reconcile.reconcile()
+        st.success(f"{summary['with_image']} con imagen, {summary['without_image']} sin imagen ({summary['changed']} actualizados)")
+        if summary['invalid_files']:
+            st.warning(f"{summary['invalid_files']} archivos inválidos en static/")
+
+    # Scheduled snapshot, in a background thread, once the newest one is too old
+    backup.start_background_backup()
+    if st.button("💾 Backup Now", help="Snapshot of the database into backups/ (safe while selling)"):
+        with st.spinner("Creando backup..."):
+            backup_path = backup.create_backup()
+        st.success(f"Backup: {os.path.basename(backup_path)}")
+    backups = backup.list_backups()
+    st.caption(f"Último backup: {backups[0]['created']:%d/%m/%Y %H:%M}" if backups else "Sin backups")
+
     if st.button("🔴 Reset Database", help="WARNING: This will delete all products and sales history!"):
+        backup.create_backup()  # the reset can be undone with backup.py restore
         db.clear_all_products()
         st.cache_data.clear()
         st.success("Database cleared!")
-        st.session_state.cart = [] # Clear cart too
+        st.session_state.cart.clear() # Clear cart too
         st.rerun()
 
+# --- Diagnostics (hidden tab, open the app with ?diag=1) ---
+show_diagnostics = st.query_params.get("diag") == "1"
+
+def toggle_timings():
+    # Timing is process-wide: it stays on for every session until switched off here
+    if st.session_state.diag_timing:
+        instrumentation.enable()
+    else:
+        instrumentation.disable()
+
 # --- Tabs ---
-tab1, tab2, tab3 = st.tabs(["📊 Stock & Pricing", "📦 Restocking", "🛒 Point of Sale"])
+tab_labels = ["📊 Stock & Pricing", "📦 Restocking", "🛒 Point of Sale", "📈 Reports"]
+if show_diagnostics:
+    tab_labels.append("🩺 Diagnostics")
+tabs = st.tabs(tab_labels)
+tab1, tab2, tab3, tab4 = tabs[:4]
 
 # ==========================================
 # INTERFACE A: Stock & Pricing Management
 # ==========================================
-with tab1:
+with tab1, timer("ui.tab.stock"):
     st.header("Manager View")
     
     # PDF Import
@@ -153,19 +266,18 @@ with tab1:
     if all_products:
         df = pd.DataFrame(all_products)
         
-        # Search filter
+        # Facets + search filter
+        brand_filter, category_filter = facet_filters("stock", on_change=reset_stock_page)
         search_filter = st.text_input("🔍 Filter products", placeholder="Search by name, brand, code or description...", key="stock_search")
         
-        if search_filter:
-            filtered_products = [
-                p for p in all_products 
-                if search_filter.lower() in p['name'].lower() 
-                or search_filter.lower() in str(p.get('brand', '')).lower() 
-                or search_filter.lower() in str(p['code']).lower()
-                or search_filter.lower() in str(p.get('description', '')).lower()
-            ]
-        else:
-            filtered_products = all_products
+        with timer("ui.stock.filter"):
+            if brand_filter or category_filter:
+                # Indexed lookup instead of scanning the whole catalog
+                facet_products = db.get_products(brand_filter, category_filter)
+            else:
+                facet_products = all_products
+            # Typo-tolerant, best matches first
+            filtered_products = search_index.filter_products(facet_products, search_filter)
         
         # Pagination settings
         products_per_page = 20
@@ -196,67 +308,32 @@ with tab1:
         chunk_size = 4
         chunks = [page_products[i:i + chunk_size] for i in range(0, len(page_products), chunk_size)]
         
-        for chunk in chunks:
-            cols = st.columns(chunk_size)
-            for i, prod in enumerate(chunk):
-                with cols[i]:
-                    with st.container(border=True):
-                        # Image
-                        image_shown = False
-                        db_rel_path = prod.get('image_path')
-                        
-                        if db_rel_path:
-                            db_rel_path = db_rel_path.replace('\\', '/')
-                            abs_path = os.path.join(config.BASE_DIR, db_rel_path)
-                            if os.path.exists(abs_path):
-                                st.image(abs_path, width="stretch")
-                                image_shown = True
-                        
-                        if not image_shown:
-                            safe_code = prod['code'].replace('/', '-')
-                            fallback_abs_path = os.path.join(config.STATIC_DIR, f"{safe_code}.jpg")
-                            if os.path.exists(fallback_abs_path):
-                                st.image(fallback_abs_path, width="stretch")
-                                image_shown = True
-                        
-                        if not image_shown:
-                            st.image("https://placehold.co/150x150?text=No+Image", width="stretch")
+        with timer("ui.stock.grid"):
+            for chunk in chunks:
+                cols = st.columns(chunk_size)
+                for i, prod in enumerate(chunk):
+                    with cols[i]:
+                        with st.container(border=True):
+                            # Image
+                            st.image(resolve_image(prod), width="stretch")
                         
-                        # Product Info
-                        st.markdown(f"**{prod['name'][:30]}**")
-                        st.caption(f"📦 `{prod['code']}`")
-                        st.caption(f"Marca: {prod.get('brand', 'N/A')}")
+                            # Product Info
+                            st.markdown(f"**{prod['name'][:30]}**")
+                            st.caption(f"📦 `{prod['code']}`")
+                            st.caption(f"Marca: {prod.get('brand', 'N/A')}")
                         
-                        sale_price = logic.calculate_sale_price(prod['cost_price'])
-                        st.markdown(f"💰 **Costo:** ${prod['cost_price']:,.0f}")
-                        st.markdown(f"🏷️ **Venta:** ${sale_price:,.0f}")
-                        st.markdown(f"📊 **Stock:** {prod['stock_quantity']}")
+                            sale_price = logic.calculate_sale_price(prod['cost_price'])
+                            st.markdown(f"💰 **Costo:** ${prod['cost_price']:,.0f}")
+                            st.markdown(f"🏷️ **Venta:** ${sale_price:,.0f}")
+                            st.markdown(f"📊 **Stock:** {prod['stock_quantity']}")
                         
-                        desc = prod.get('description', '') or 'Sin descripción'
-                        st.caption(f"{desc[:50]}...")
+                            desc = prod.get('description', '') or 'Sin descripción'
+                            st.caption(f"{desc[:50]}...")
                         
-                        # Add to Order button
-                        with st.expander("📦 Agregar a Pedido"):
-                            order_qty = st.number_input(
-                                "Cantidad", 
-                                min_value=1, 
-                                value=1, 
-                                key=f"stock_order_qty_{prod['code']}"
-                            )
-                            if st.button("➕ Agregar", key=f"stock_add_order_{prod['code']}", type="primary"):
-                                existing = next((item for item in st.session_state.supply_order if item['code'] == prod['code']), None)
-                                if existing:
-                                    existing['quantity'] += order_qty
-                                    st.toast(f"Actualizado: {prod['name']} (+{order_qty})")
-                                else:
-                                    st.session_state.supply_order.append({
-                                        'code': prod['code'],
-                                        'name': prod['name'],
-                                        'quantity': order_qty,
-                                        'cost_price': prod['cost_price']
-                                    })
-                                    st.toast(f"Agregado: {prod['name']} x{order_qty}")
-                                st.rerun()
+                            # Orders are built in bulk in 📦 Restocking
+                            in_order = st.session_state.supply_order.quantity(prod['code'])
+                            if in_order:
+                                st.caption(f"🧾 En pedido: {in_order}")
         
         # Bottom navigation
         st.markdown("---")
@@ -293,25 +370,7 @@ with tab1:
             
             with prod_col1:
                 # Product Image
-                image_shown = False
-                db_rel_path = current_product.get('image_path')
-                
-                if db_rel_path:
-                    db_rel_path = db_rel_path.replace('\\', '/')
-                    abs_path = os.path.join(config.BASE_DIR, db_rel_path)
-                    if os.path.exists(abs_path):
-                        st.image(abs_path, width=150)
-                        image_shown = True
-                
-                if not image_shown:
-                    safe_code = current_product['code'].replace('/', '-')
-                    fallback_abs_path = os.path.join(config.STATIC_DIR, f"{safe_code}.jpg")
-                    if os.path.exists(fallback_abs_path):
-                        st.image(fallback_abs_path, width=150)
-                        image_shown = True
-                
-                if not image_shown:
-                    st.image("https://placehold.co/150x150?text=No+Image", width=150)
+                st.image(resolve_image(current_product), width=150)
             
             with prod_col2:
                 st.markdown(f"**{current_product['name']}**")
@@ -337,9 +396,117 @@ with tab1:
 # ==========================================
 # INTERFACE B: Restocking (Supply Order)
 # ==========================================
-with tab2:
+with tab2, timer("ui.tab.restocking"):
     st.header("Restocking")
-    st.info("� Gestión de pedidos de reposición. Agrega productos desde Stock & Pricing o importa un archivo de orden.")
+    st.info("� Gestión de pedidos de reposición. Carga cantidades en la grilla de productos o importa un archivo de orden.")
+    
+    # Reorder Suggestions
+    with st.expander("🤖 Sugerencias de Reposición"):
+        st.caption("Calculadas a partir de la velocidad de venta y el stock actual.")
+        sug_col1, sug_col2, sug_col3, sug_col4 = st.columns(4)
+        with sug_col1:
+            lookback_days = st.number_input("Historial (días)", min_value=1, value=reorder.DEFAULT_LOOKBACK_DAYS, key="reorder_lookback")
+        with sug_col2:
+            lead_time_days = st.number_input("Demora proveedor (días)", min_value=0, value=reorder.DEFAULT_LEAD_TIME_DAYS, key="reorder_lead")
+        with sug_col3:
+            safety_days = st.number_input("Seguridad (días)", min_value=0, value=reorder.DEFAULT_SAFETY_DAYS, key="reorder_safety")
+        with sug_col4:
+            cover_days = st.number_input("Cobertura (días)", min_value=1, value=reorder.DEFAULT_COVER_DAYS, key="reorder_cover")
+        
+        # Computed on demand only: an expander's body runs on every rerun even when collapsed
+        reorder_params = (int(lookback_days), int(lead_time_days), int(safety_days), int(cover_days))
+        if st.button("🔄 Calcular sugerencias", key="compute_reorder_suggestions"):
+            st.session_state.reorder_suggestions = (reorder_params, reorder.get_reorder_suggestions(*reorder_params))
+        computed = st.session_state.get("reorder_suggestions")
+        suggestions = computed[1] if computed and computed[0] == reorder_params else None
+        if suggestions is None:
+            st.caption("Presiona 🔄 Calcular sugerencias para ver los productos a reponer.")
+        elif suggestions:
+            st.dataframe(
+                pd.DataFrame(suggestions)[['code', 'name', 'stock_quantity', 'velocity', 'reorder_point', 'quantity', 'cost_price']],
+                column_config={
+                    "code": "Code",
+                    "name": "Product Name",
+                    "stock_quantity": "Stock",
+                    "velocity": st.column_config.NumberColumn("Units/Day", format="%.2f"),
+                    "reorder_point": "Reorder Point",
+                    "quantity": "Suggested Qty",
+                    "cost_price": st.column_config.NumberColumn("Cost Price", format="$%.2f")
+                },
+                hide_index=True,
+                width="stretch"
+            )
+            if st.button("➕ Agregar sugerencias al pedido", type="primary", key="add_reorder_suggestions"):
+                added = reorder.merge_into_supply_order(st.session_state.supply_order, suggestions)
+                del st.session_state.reorder_suggestions  # stale once ordered
+                st.toast(f"Agregadas {added} sugerencias al pedido")
+                st.rerun()
+        else:
+            st.caption("No hay productos por debajo del punto de reposición.")
+    
+    # Bulk Order Builder: one editable page of products, committed in a single rerun
+    st.subheader("🧾 Armar Pedido")
+    bulk_brand, bulk_category = facet_filters("bulk", on_change=reset_bulk_page)
+    bulk_search = st.text_input("🔍 Filtrar", placeholder="Código, nombre o marca...", key="bulk_search",
+                                on_change=reset_bulk_page)
+    
+    with timer("ui.restocking.bulk_grid"):
+        bulk_rows, bulk_total = db.get_products_page(bulk_brand, bulk_category, bulk_search,
+                                                     page=st.session_state.bulk_page, page_size=BULK_PAGE_SIZE)
+        bulk_pages = max(1, (bulk_total + BULK_PAGE_SIZE - 1) // BULK_PAGE_SIZE)
+        
+        bulk_nav1, bulk_nav2, bulk_nav3 = st.columns([1, 2, 1])
+        with bulk_nav1:
+            if st.button("⬅️ Anterior", key="bulk_prev", disabled=st.session_state.bulk_page <= 1):
+                st.session_state.bulk_page -= 1
+                st.rerun()
+        with bulk_nav2:
+            st.caption(f"Página {st.session_state.bulk_page} de {bulk_pages} | {bulk_total} productos (menor stock primero)")
+        with bulk_nav3:
+            if st.button("Siguiente ➡️", key="bulk_next", disabled=st.session_state.bulk_page >= bulk_pages):
+                st.session_state.bulk_page += 1
+                st.rerun()
+        
+        if bulk_rows:
+            bulk_df = pd.DataFrame(bulk_rows)
+            bulk_df['in_order'] = [st.session_state.supply_order.quantity(code) for code in bulk_df['code']]
+            bulk_df['add_qty'] = 0
+            
+            # Inside a form, cell edits do not rerun the script; only the submit does
+            with st.form("bulk_order_form", border=False):
+                edited_df = st.data_editor(
+                    bulk_df,
+                    column_config={
+                        "code": "Code",
+                        "name": "Product Name",
+                        "brand": "Marca",
+                        "stock_quantity": "Stock",
+                        "cost_price": st.column_config.NumberColumn("Cost Price", format="$%.2f"),
+                        "in_order": "En pedido",
+                        "add_qty": st.column_config.NumberColumn("Agregar", min_value=0, step=1)
+                    },
+                    disabled=['code', 'name', 'brand', 'stock_quantity', 'cost_price', 'in_order'],
+                    hide_index=True,
+                    width="stretch",
+                    key=f"bulk_editor_{st.session_state.bulk_editor_version}"
+                )
+                if st.form_submit_button("➕ Agregar al pedido", type="primary"):
+                    to_add = edited_df[edited_df['add_qty'].fillna(0) > 0]
+                    for row in to_add.itertuples(index=False):
+                        st.session_state.supply_order.add({
+                            'code': row.code,
+                            'name': row.name,
+                            'quantity': int(row.add_qty),
+                            'cost_price': None if pd.isna(row.cost_price) else float(row.cost_price)
+                        })
+                    if len(to_add):
+                        # Fresh editor (quantities back to 0) on the next run
+                        st.session_state.bulk_editor_version += 1
+                        st.toast(f"{len(to_add)} productos agregados al pedido")
+                        st.rerun()
+                    st.warning("Ingresa una cantidad en la columna Agregar.")
+        else:
+            st.caption("No hay productos para esos filtros.")
     
     # Show Current Order
     if st.session_state.supply_order:
@@ -347,7 +514,7 @@ with tab2:
         st.subheader("📋 Current Order")
         
         # Display order as dataframe
-        order_df = pd.DataFrame(st.session_state.supply_order)
+        order_df = pd.DataFrame(st.session_state.supply_order.lines())
         order_df['total'] = order_df['quantity'] * order_df['cost_price']
         
         st.dataframe(
@@ -363,8 +530,7 @@ with tab2:
             width="stretch"
         )
         
-        total_order_cost = order_df['total'].sum()
-        st.metric("💰 Total Order Cost", f"${total_order_cost:,.2f}")
+        st.metric("💰 Total Order Cost", f"${st.session_state.supply_order.total_amount:,.2f}")
         
         # Action buttons
         btn_col1, btn_col2 = st.columns(2)
@@ -372,29 +538,76 @@ with tab2:
         with btn_col1:
             if st.button("📄 Generate Order File", type="primary"):
                 import datetime
-                import uuid
                 
-                # Generate unique order ID
-                order_id = f"ORD-{uuid.uuid4().hex[:8].upper()}"
                 timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
                 order_filename = f"order_{timestamp}.csv"
                 order_filepath = os.path.join(config.LOG_DIR, order_filename)
                 
-                # Add order_id column to dataframe
-                order_df['order_id'] = order_id
-                
-                # Save to CSV
-                order_df.to_csv(order_filepath, index=False)
+                # Store the order first: the CSV is only the copy sent to the supplier
+                order_id = supply_orders.create_order(st.session_state.supply_order, csv_file=order_filename)
+                supply_orders.write_order_csv(order_id, order_filepath)
                 st.success(f"Order saved: {order_filename}")
                 st.info(f"📋 Order ID: **{order_id}**")
                 st.session_state.last_order_file = order_filepath
         
         with btn_col2:
             if st.button("🗑️ Clear Order"):
-                st.session_state.supply_order = []
+                st.session_state.supply_order.clear()
                 st.rerun()
     else:
-        st.caption("No hay productos en el pedido actual. Agrega productos desde 📊 Stock & Pricing.")
+        st.caption("No hay productos en el pedido actual. Agrega productos desde la grilla 🧾 Armar Pedido.")
+    
+    # Order History Section
+    st.markdown("---")
+    st.subheader("📦 Order History")
+    
+    hist_col1, hist_col2 = st.columns([1, 3])
+    with hist_col1:
+        status_filter = st.selectbox("Estado", ["pending", "received", "all"], key="order_status_filter")
+    orders = supply_orders.list_orders(None if status_filter == "all" else status_filter)
+    with hist_col2:
+        if orders:
+            st.dataframe(
+                pd.DataFrame(orders),
+                column_config={
+                    "order_id": "Order ID",
+                    "status": "Estado",
+                    "created_at": "Creado",
+                    "received_at": "Recibido",
+                    "total_items": "Items",
+                    "total_cost": st.column_config.NumberColumn("Total", format="$%.2f")
+                },
+                hide_index=True,
+                width="stretch"
+            )
+        else:
+            st.caption("No hay pedidos.")
+    
+    if orders:
+        selected_order_id = st.selectbox("Pedido", [o['order_id'] for o in orders], key="order_history_select")
+        selected_order = supply_orders.get_order(selected_order_id)
+        if selected_order:
+            act_col1, act_col2 = st.columns(2)
+            with act_col1:
+                st.download_button(
+                    "⬇️ Download CSV",
+                    supply_orders.order_csv_text(selected_order),
+                    file_name=selected_order['csv_file'] or f"{selected_order_id}.csv",
+                    mime="text/csv",
+                    key="download_order_csv"
+                )
+            with act_col2:
+                if selected_order['status'] == supply_orders.STATUS_PENDING:
+                    if st.button("✅ Receive Order", type="primary", key="receive_order_by_id"):
+                        try:
+                            added_count = supply_orders.receive_order(selected_order_id)
+                            st.success(f"✅ Stock updated! Order **{selected_order_id}** processed ({added_count} products).")
+                            st.balloons()
+                            st.rerun()
+                        except ValueError as e:
+                            st.error(f"❌ {e}")
+                else:
+                    st.caption(f"Recibido: {selected_order['received_at'] or '-'}")
     
     # Upload Order File Section
     st.markdown("---")
@@ -405,7 +618,7 @@ with tab2:
     
     if uploaded_order:
         try:
-            import_df = pd.read_csv(uploaded_order)
+            import_df = pd.read_csv(uploaded_order, dtype={'code': str})
             
             # Validate required columns
             required_cols = ['code', 'quantity']
@@ -421,155 +634,347 @@ with tab2:
                 if db.is_order_used(order_id):
                     st.error(f"❌ Order **{order_id}** was already redeemed. Cannot use the same order twice.")
                 else:
-                    st.success(f"Order file loaded: {len(import_df)} products")
-                    st.info(f"📋 Order ID: **{order_id}**")
-                    
-                    # Preview
-                    preview_cols = ['code', 'name', 'quantity'] if 'name' in import_df.columns else ['code', 'quantity']
-                    st.dataframe(import_df[preview_cols], hide_index=True)
+                    # What gets received: the stored order if there is one, else the validated file
+                    stored_order = supply_orders.get_order(order_id)
+                    try:
+                        file_lines = supply_orders.lines_from_records(
+                            import_df.astype(object).where(import_df.notna(), None).to_dict('records'))
+                    except ValueError as e:
+                        file_lines = None
+                        st.error(f"⚠️ {e}")
+                    differences = (supply_orders.order_differences(stored_order, file_lines)
+                                   if stored_order and file_lines is not None else [])
                     
-                    total_items = int(import_df['quantity'].sum())
-                    st.metric("Total Items to Add", total_items)
-                    
-                    if st.button("✅ Confirm & Add Stock", type="primary", key="confirm_import_order"):
-                        # Mark order as used FIRST to prevent race conditions
-                        if db.mark_order_used(order_id, total_items):
-                            added_count = 0
-                            for _, row in import_df.iterrows():
-                                code = row['code']
-                                qty = int(row['quantity'])
-                                if db.update_product(code, stock_delta=qty):
-                                    added_count += 1
-                            st.success(f"✅ Stock updated! Order **{order_id}** processed ({added_count} products).")
-                            st.balloons()
-                            st.rerun()
-                        else:
-                            st.error(f"❌ Order **{order_id}** was already redeemed (concurrent access prevented).")
+                    if differences:
+                        # Edited after it was generated: refuse rather than receive something else
+                        st.error(f"❌ This file does not match stored order **{order_id}**. "
+                                 "Receive it from 📦 Order History instead.")
+                        st.dataframe(
+                            pd.DataFrame(differences, columns=['code', 'stored', 'file']),
+                            column_config={"code": "Code", "stored": "Qty (pedido)", "file": "Qty (archivo)"},
+                            hide_index=True
+                        )
+                    elif file_lines is not None:
+                        lines = stored_order['lines'] if stored_order else file_lines
+                        st.success(f"Order file loaded: {len(lines)} products")
+                        st.info(f"📋 Order ID: **{order_id}**")
+                        
+                        # Preview
+                        st.dataframe(pd.DataFrame(lines)[['code', 'name', 'quantity']], hide_index=True)
+                        
+                        total_items = sum(line['quantity'] for line in lines)
+                        st.metric("Total Items to Add", total_items)
+                        
+                        if st.button("✅ Confirm & Add Stock", type="primary", key="confirm_import_order"):
+                            try:
+                                if stored_order is None:
+                                    # Generated before orders were stored: record it from the file
+                                    supply_orders.create_order(file_lines, order_id=order_id,
+                                                               csv_file=uploaded_order.name)
+                                added_count = supply_orders.receive_order(order_id)
+                                st.success(f"✅ Stock updated! Order **{order_id}** processed ({added_count} products).")
+                                st.balloons()
+                                st.rerun()
+                            except ValueError:
+                                st.error(f"❌ Order **{order_id}** was already redeemed (concurrent access prevented).")
         except Exception as e:
             st.error(f"Error reading CSV: {e}")
 
 # ==========================================
 # INTERFACE C: Point of Sale (POS)
 # ==========================================
-with tab3:
+with tab3, timer("ui.tab.pos"):
     st.header("Point of Sale")
     
     # Layout: Grid + Sidebar Cart
     pos_col1, pos_col2 = st.columns([3, 1])
     
+    # Keep this till's holds alive while it has a cart; drop other tills' expired ones
+    if st.session_state.cart:
+        reservations.touch(st.session_state.till_id)
+    reservations.sweep_expired()
+    held_elsewhere = reservations.held_by_others(st.session_state.till_id)
+
     with pos_col1:
-        # Search
+        # Facets (in-stock counts) + search
+        pos_brand, pos_category = facet_filters("pos", in_stock_only=True)
         search_query = st.text_input("Search Product", placeholder="Name, Brand, or Code...")
         
         if all_products:
             # Filter: only show products with stock > 0 and matching search
-            filtered_prods = [
-                p for p in all_products 
-                if p['stock_quantity'] > 0 and (
-                    search_query.lower() in p['name'].lower() 
-                    or search_query.lower() in str(p['brand']).lower() 
-                    or search_query.lower() in str(p['code']).lower()
-                )
-            ]
+            with timer("ui.pos.filter"):
+                if pos_brand or pos_category:
+                    pos_products = db.get_products(pos_brand, pos_category, in_stock_only=True)
+                else:
+                    pos_products = all_products
+                filtered_prods = [
+                    p for p in search_index.filter_products(pos_products, search_query)
+                    if p['stock_quantity'] > 0
+                ]
             
-            for prod in filtered_prods:
-                sale_price = logic.calculate_sale_price(prod['cost_price'])
+            with timer("ui.pos.product_list"):
+                for prod in filtered_prods:
+                    sale_price = logic.calculate_sale_price(prod['cost_price'])
                 
-                # Calculate available quantity (stock - already in cart)
-                in_cart_qty = sum(item['quantity'] for item in st.session_state.cart if item['code'] == prod['code'])
-                available_qty = prod['stock_quantity'] - in_cart_qty
+                    # Calculate available quantity (stock - other tills' holds - already in cart)
+                    in_cart_qty = st.session_state.cart.quantity(prod['code'])
+                    available_qty = prod['stock_quantity'] - held_elsewhere.get(prod['code'], 0) - in_cart_qty
                 
-                # Skip if no stock available
-                if available_qty <= 0:
-                    continue
+                    # Skip if no stock available
+                    if available_qty <= 0:
+                        continue
                 
-                st.markdown("---")
-                prod_col1, prod_col2, prod_col3 = st.columns([1, 2, 1])
+                    st.markdown("---")
+                    prod_col1, prod_col2, prod_col3 = st.columns([1, 2, 1])
                 
-                with prod_col1:
-                    # Product Image
-                    image_shown = False
-                    db_rel_path = prod.get('image_path')
-                    
-                    if db_rel_path:
-                        db_rel_path = db_rel_path.replace('\\', '/')
-                        abs_path = os.path.join(config.BASE_DIR, db_rel_path)
-                        if os.path.exists(abs_path):
-                            st.image(abs_path, width=150)
-                            image_shown = True
-                    
-                    if not image_shown:
-                        safe_code = prod['code'].replace('/', '-')
-                        fallback_abs_path = os.path.join(config.STATIC_DIR, f"{safe_code}.jpg")
-                        if os.path.exists(fallback_abs_path):
-                            st.image(fallback_abs_path, width=150)
-                            image_shown = True
-                    
-                    if not image_shown:
-                        st.image("https://placehold.co/150x150?text=No+Image", width=150)
+                    with prod_col1:
+                        # Product Image
+                        st.image(resolve_image(prod), width=150)
                 
-                with prod_col2:
-                    st.markdown(f"**{prod['name']}**")
-                    st.markdown(f"**Marca:** {prod.get('brand', 'N/A')}")
-                    st.markdown(f"**Descripción:** {prod.get('description', 'Sin descripción')[:100]}")
-                    st.markdown(f"**Precio de Venta:** :blue[${sale_price:.2f}]")
-                    st.caption(f"Stock disponible: {available_qty}")
+                    with prod_col2:
+                        st.markdown(f"**{prod['name']}**")
+                        st.markdown(f"**Marca:** {prod.get('brand', 'N/A')}")
+                        st.markdown(f"**Descripción:** {prod.get('description', 'Sin descripción')[:100]}")
+                        st.markdown(f"**Precio de Venta:** :blue[${sale_price:.2f}]")
+                        st.caption(f"Stock disponible: {available_qty}")
                 
-                with prod_col3:
-                    qty_key = f"qty_{prod['code']}"
-                    add_qty = st.number_input(
-                        "Cantidad", 
-                        min_value=1, 
-                        max_value=available_qty, 
-                        value=1, 
-                        key=qty_key
-                    )
+                    with prod_col3:
+                        qty_key = f"qty_{prod['code']}"
+                        add_qty = st.number_input(
+                            "Cantidad", 
+                            min_value=1, 
+                            max_value=available_qty, 
+                            value=1, 
+                            key=qty_key
+                        )
                     
-                    btn_key = f"add_{prod['code']}"
-                    if st.button("🛒 Agregar al Carrito", key=btn_key, type="primary"):
-                        # Add item to cart
-                        existing = next((item for item in st.session_state.cart if item['code'] == prod['code']), None)
-                        if existing:
-                            existing['quantity'] += add_qty
-                        else:
-                            st.session_state.cart.append({
-                                'code': prod['code'],
-                                'name': prod['name'],
-                                'brand': prod['brand'],
-                                'sale_price': sale_price,
-                                'quantity': add_qty
-                            })
-                        st.toast(f"Agregado {add_qty}x {prod['name']} al carrito")
-                        st.rerun()
+                        btn_key = f"add_{prod['code']}"
+                        if st.button("🛒 Agregar al Carrito", key=btn_key, type="primary"):
+                            # Hold the stock first - another till may have taken it since this rerun
+                            ok, can_hold = reservations.reserve(st.session_state.till_id, prod['code'], in_cart_qty + add_qty)
+                            if not ok:
+                                st.error(f"Stock insuficiente: solo quedan {can_hold - in_cart_qty} disponibles")
+                            else:
+                                st.session_state.cart.add({
+                                    'code': prod['code'],
+                                    'name': prod['name'],
+                                    'brand': prod['brand'],
+                                    'sale_price': sale_price,
+                                    'quantity': add_qty
+                                })
+                                st.toast(f"Agregado {add_qty}x {prod['name']} al carrito")
+                                st.rerun()
 
     with pos_col2:
         st.subheader("🛒 Current Cart")
         
         if st.session_state.cart:
-            total_sale = 0
-            for idx, item in enumerate(st.session_state.cart):
+            for item in st.session_state.cart.lines():
                 col_c1, col_c2 = st.columns([3, 1])
                 with col_c1:
                     st.text(f"{item['name']}\n${item['sale_price']} x {item['quantity']}")
                 with col_c2:
-                     if st.button("❌", key=f"del_{idx}"):
-                         st.session_state.cart.pop(idx)
+                     # Keyed by code: stays on the same line when others are removed
+                     if st.button("❌", key=f"del_{item['code']}"):
+                         st.session_state.cart.remove(item['code'])
+                         reservations.release(st.session_state.till_id, item['code'])
                          st.rerun()
                 
-                total_sale += item['sale_price'] * item['quantity']
                 st.divider()
             
-            st.metric("Total", f"${total_sale:.2f}")
+            st.metric("Total", f"${st.session_state.cart.total_amount:.2f}")
             
             if st.button("Finalize Sale", type="primary"):
-                log_file = logic.process_sale_transaction(st.session_state.cart)
-                st.session_state.last_log = log_file
-                st.session_state.cart = [] # Clear cart
-                st.success("Sale Completed!")
-                st.rerun()
+                try:
+                    log_file = logic.process_sale_transaction(st.session_state.cart, till_id=st.session_state.till_id)
+                except ValueError as e:
+                    # Another till sold the stock after our hold expired - cart kept as is
+                    st.error(str(e))
+                else:
+                    st.session_state.last_log = log_file
+                    st.session_state.cart.clear() # Clear cart
+                    st.success("Sale Completed!")
+                    st.rerun()
         else:
             st.info("Cart is empty")
 
         if st.session_state.last_log:
-            st.success(f"Log generated: {st.session_state.last_log}")
+            st.success(f"Sale recorded: {st.session_state.last_log}")
 
+# ==========================================
+# INTERFACE D: Sales Reports
+# ==========================================
+with tab4, timer("ui.tab.reports"):
+    st.header("Sales Reports")
+    st.caption("Aggregates are updated at each sale; only new sales are folded in when this tab opens.")
+    
+    # Incremental: processes only sales newer than the last refresh
+    reports.refresh_sales_summary()
+    
+    rep_col1, rep_col2, rep_col3 = st.columns(3)
+    with rep_col1:
+        report_period = st.selectbox(
+            "Periodo",
+            options=["daily", "weekly", "monthly"],
+            format_func=lambda x: {"daily": "Diario", "weekly": "Semanal", "monthly": "Mensual"}[x],
+            key="report_period"
+        )
+    with rep_col2:
+        report_start = st.date_input("Desde", value=None, key="report_start")
+    with rep_col3:
+        report_end = st.date_input("Hasta", value=None, key="report_end")
+    
+    sales_report = reports.get_sales_report(report_period, report_start, report_end)
+    if sales_report:
+        sales_df = pd.DataFrame(sales_report)
+        
+        met_col1, met_col2, met_col3 = st.columns(3)
+        met_col1.metric("💰 Ventas", f"${sales_df['revenue'].sum():,.2f}")
+        met_col2.metric("📈 Margen", f"${sales_df['margin'].sum():,.2f}")
+        met_col3.metric("🧾 Tickets", int(sales_df['tickets'].sum()))
+        
+        st.bar_chart(sales_df, x="period", y=["revenue", "margin"])
+        st.dataframe(
+            sales_df,
+            column_config={
+                "period": "Period",
+                "tickets": "Tickets",
+                "units": "Units",
+                "revenue": st.column_config.NumberColumn("Revenue", format="$%.2f"),
+                "cost": st.column_config.NumberColumn("Cost", format="$%.2f"),
+                "margin": st.column_config.NumberColumn("Margin", format="$%.2f")
+            },
+            hide_index=True,
+            width="stretch"
+        )
+        
+        st.subheader("Margin per SKU")
+        margin_df = pd.DataFrame(reports.get_margin_by_sku(report_start, report_end))
+        st.dataframe(
+            margin_df,
+            column_config={
+                "code": "Code",
+                "name": "Product Name",
+                "brand": "Brand",
+                "units": "Units",
+                "revenue": st.column_config.NumberColumn("Revenue", format="$%.2f"),
+                "cost": st.column_config.NumberColumn("Cost", format="$%.2f"),
+                "margin": st.column_config.NumberColumn("Margin", format="$%.2f"),
+                "margin_pct": st.column_config.NumberColumn("Margin %", format="%.1f%%")
+            },
+            hide_index=True,
+            width="stretch"
+        )
+        
+        st.subheader("Stock Turnover")
+        turnover_days = st.number_input("Ventana (días)", min_value=1, value=30, key="turnover_days")
+        turnover = reports.get_stock_turnover(int(turnover_days))
+        if turnover:
+            st.dataframe(
+                pd.DataFrame(turnover),
+                column_config={
+                    "code": "Code",
+                    "name": "Product Name",
+                    "brand": "Brand",
+                    "units_sold": "Units Sold",
+                    "stock_quantity": "Stock",
+                    "turnover": st.column_config.NumberColumn("Turnover", format="%.2f"),
+                    "days_of_cover": st.column_config.NumberColumn("Days of Cover", format="%.1f")
+                },
+                hide_index=True,
+                width="stretch"
+            )
+        else:
+            st.caption("No hay ventas en la ventana seleccionada.")
+    else:
+        st.info("No hay ventas registradas en el periodo seleccionado.")
+
+    st.subheader("Price Increases")
+    price_imports = db.get_price_imports(limit=24)
+    if price_imports:
+        price_import = st.selectbox("Importación", options=price_imports, key="price_import")
+        price_changes = db.get_price_changes(price_import)
+        if price_changes:
+            st.dataframe(
+                pd.DataFrame(price_changes),
+                column_config={
+                    "code": "Code",
+                    "name": "Product Name",
+                    "brand": "Brand",
+                    "previous_price": st.column_config.NumberColumn("Before", format="$%.2f"),
+                    "cost_price": st.column_config.NumberColumn("Now", format="$%.2f"),
+                    "change": st.column_config.NumberColumn("Change", format="$%.2f"),
+                    "change_pct": st.column_config.NumberColumn("Change %", format="%.1f%%")
+                },
+                hide_index=True,
+                width="stretch"
+            )
+        else:
+            st.caption("Sin aumentos de precio en esta importación.")
+    else:
+        st.caption("Todavía no hay historial de precios.")
+
+# ==========================================
+# INTERFACE E: Diagnostics (hidden, ?diag=1)
+# ==========================================
+if show_diagnostics:
+    with tabs[4]:
+        st.header("Diagnostics")
+        st.caption("Timings collected in this server process since the last reset. Tabs above are measured before this one renders.")
+        
+        # Reflect the process state (another session or STOCK_PROFILE may have changed it)
+        st.session_state.diag_timing = instrumentation.is_enabled()
+        st.toggle("⏱️ Medir tiempos", key="diag_timing", on_change=toggle_timings,
+                  help="Applies to every session of this server; switch it off when done")
+        
+        perf = instrumentation.snapshot()
+        if perf['timers']:
+            perf_df = pd.DataFrame([
+                {
+                    'name': name,
+                    'count': stat['count'],
+                    'total_ms': stat['total_ms'],
+                    'avg_ms': stat['avg_ms'],
+                    'min_ms': stat['min_ms'],
+                    'max_ms': stat['max_ms']
+                }
+                for name, stat in perf['timers'].items()
+            ]).sort_values('total_ms', ascending=False)
+            st.dataframe(
+                perf_df,
+                column_config={
+                    "name": "Timer",
+                    "count": "Calls",
+                    "total_ms": st.column_config.NumberColumn("Total (ms)", format="%.1f"),
+                    "avg_ms": st.column_config.NumberColumn("Avg (ms)", format="%.2f"),
+                    "min_ms": st.column_config.NumberColumn("Min (ms)", format="%.2f"),
+                    "max_ms": st.column_config.NumberColumn("Max (ms)", format="%.2f")
+                },
+                hide_index=True,
+                width="stretch"
+            )
+            
+            hist_name = st.selectbox("Histogram", options=list(perf_df['name']), key="diag_hist")
+            hist_df = pd.DataFrame({
+                'bucket': perf['bucket_labels'],
+                'calls': perf['timers'][hist_name]['buckets']
+            })
+            st.bar_chart(hist_df, x="bucket", y="calls")
+        else:
+            st.info("No timings recorded yet.")
+        
+        if perf['counters']:
+            st.json(perf['counters'])
+        
+        diag_col1, diag_col2 = st.columns(2)
+        with diag_col1:
+            st.download_button(
+                "⬇️ Export JSON",
+                data=instrumentation.export_json(),
+                file_name=f"diagnostics_{time.strftime('%Y%m%d-%H%M%S')}.json",
+                mime="application/json"
+            )
+        with diag_col2:
+            if st.button("🔄 Reset Timings"):
+                instrumentation.reset()
+                st.rerun()
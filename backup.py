@@ -0,0 +1,300 @@
+import os
+import sys
+import gzip
+import time
+import shutil
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+import config
+import database
+from instrumentation import timed
+
+# ==============================================================================
+# ONLINE BACKUPS
+# ==============================================================================
+# Snapshots of the live DB taken with SQLite's online backup API while the
+# tills keep selling. Copying products.db with the file manager can catch a
+# write half-done; the backup API copies a consistent image instead.
+#
+# The copy runs PAGES_PER_STEP pages at a time with a short pause in between,
+# so a sale never waits more than one step for the lock. With the default
+# rollback journal a sale committed mid-copy makes SQLite restart the copy
+# from the first page: each restart retries with larger steps, and after
+# MAX_RESTARTS the DB is copied in one step instead of chasing the writers
+# forever. A DB in WAL mode (PRAGMA journal_mode=WAL) never restarts.
+#
+# Snapshots are checked (PRAGMA quick_check), optionally gzipped, and rotated
+# (newest KEEP kept) in config.BACKUP_DIR:
+#
+#     python backup.py create [--keep 7] [--no-compress]
+#     python backup.py list
+#     python backup.py restore backups/products-20251104-210000.db.gz
+#     python backup.py schedule --every 6        # loop, one backup every 6 hours
+#
+# The app also takes one in the background when the newest snapshot is older
+# than config.BACKUP_INTERVAL_HOURS.
+
+PAGES_PER_STEP = 256          # ~1 MB per step with 4 KB pages
+STEP_PAUSE_SECONDS = 0.005    # let waiting writers in between steps
+MAX_RESTARTS = 3              # then copy in one step
+TIMESTAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _prefix():
+    """products.db -> 'products-': snapshots of different DBs never mix."""
+    return os.path.splitext(os.path.basename(database.DB_NAME))[0] + "-"
+
+
+def list_backups(backup_dir=None):
+    """Snapshots of the current DB, newest first: dicts with path, created, size_mb."""
+    backup_dir = backup_dir or config.BACKUP_DIR
+    if not os.path.isdir(backup_dir):
+        return []
+    prefix = _prefix()
+    backups = []
+    for name in os.listdir(backup_dir):
+        if not name.startswith(prefix) or not (name.endswith(".db") or name.endswith(".db.gz")):
+            continue
+        stamp = name[len(prefix):].split(".")[0]
+        try:
+            created = datetime.strptime(stamp, TIMESTAMP_FORMAT)
+        except ValueError:
+            continue
+        path = os.path.join(backup_dir, name)
+        backups.append({'path': path, 'created': created, 'size_mb': os.path.getsize(path) / 1e6})
+    backups.sort(key=lambda b: b['created'], reverse=True)
+    return backups
+
+
+def _copy_online(src, dst, pages, pause):
+    """src.backup(dst) in steps; returns how many times writers forced a restart."""
+    if src.execute('PRAGMA journal_mode').fetchone()[0] == "wal":
+        # WAL: an open read transaction pins a consistent snapshot while the
+        # tills keep committing, so the copy never restarts
+        src.isolation_level = None
+        src.execute('BEGIN')
+        src.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        try:
+            src.backup(dst, pages=pages, progress=lambda *a: pause and time.sleep(pause))
+        finally:
+            src.execute('COMMIT')
+        return 0
+
+    # Rollback journal: a sale committed between two steps sends the copy back
+    # to page 1. Each restart retries with 4x larger steps (a shorter copy is
+    # less likely to be hit again); the last attempt copies in one step.
+    for restarts in range(MAX_RESTARTS + 1):
+        step_pages = pages * 4 ** restarts if restarts < MAX_RESTARTS and pages > 0 else -1
+        remaining_seen = []
+
+        def progress(status, remaining, total):
+            if remaining_seen and remaining >= remaining_seen[-1]:
+                raise _Restarted()
+            remaining_seen.append(remaining)
+            if pause:
+                time.sleep(pause)
+
+        try:
+            src.backup(dst, pages=step_pages, progress=progress)
+            return restarts
+        except _Restarted:
+            continue
+    return restarts
+
+
+def _check(path):
+    conn = sqlite3.connect(path)
+    try:
+        result = conn.execute('PRAGMA quick_check').fetchone()[0]
+    finally:
+        conn.close()
+    if result != "ok":
+        raise sqlite3.DatabaseError(f"{path} failed quick_check: {result}")
+
+
+def _gzip(path):
+    with open(path, "rb") as f_in, gzip.open(path + ".gz.part", "wb", compresslevel=6) as f_out:
+        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+    os.replace(path + ".gz.part", path + ".gz")
+    os.remove(path)
+    return path + ".gz"
+
+
+def rotate(keep, backup_dir=None):
+    """Delete all but the newest `keep` snapshots. Returns the deleted paths."""
+    removed = []
+    for old in list_backups(backup_dir)[keep:]:
+        os.remove(old['path'])
+        removed.append(old['path'])
+    return removed
+
+
+@timed("backup.create")
+def create_backup(backup_dir=None, keep=None, compress=True,
+                  pages=PAGES_PER_STEP, pause=STEP_PAUSE_SECONDS):
+    """
+    Snapshot the live DB into backup_dir (default config.BACKUP_DIR) and
+    rotate to the newest `keep` (default config.BACKUP_KEEP). Returns the
+    snapshot path.
+    """
+    backup_dir = backup_dir or config.BACKUP_DIR
+    keep = config.BACKUP_KEEP if keep is None else keep
+    os.makedirs(backup_dir, exist_ok=True)
+
+    path = os.path.join(backup_dir, _prefix() + datetime.now().strftime(TIMESTAMP_FORMAT) + ".db")
+    while os.path.exists(path) or os.path.exists(path + ".gz"):
+        # Snapshot names have one-second resolution
+        time.sleep(0.2)
+        path = os.path.join(backup_dir, _prefix() + datetime.now().strftime(TIMESTAMP_FORMAT) + ".db")
+    start = time.perf_counter()
+    src = database.get_connection()
+    dst = sqlite3.connect(path + ".part")
+    try:
+        restarts = _copy_online(src, dst, pages, pause)
+    finally:
+        dst.close()
+        src.close()
+    copy_seconds = time.perf_counter() - start
+
+    try:
+        _check(path + ".part")
+    except sqlite3.DatabaseError:
+        os.remove(path + ".part")
+        raise
+    os.replace(path + ".part", path)
+    if compress:
+        path = _gzip(path)
+
+    removed = rotate(keep, backup_dir) if keep else []
+    print(f"[INFO] Backup {os.path.basename(path)}: {os.path.getsize(path) / 1e6:.1f} MB, "
+          f"copy {copy_seconds:.2f}s ({restarts} restarts), {len(removed)} old snapshots removed")
+    return path
+
+
+@timed("backup.restore")
+def restore_backup(path):
+    """
+    Replace the live DB contents with a snapshot (.db or .db.gz). The current
+    DB is backed up first, so a restore can itself be undone.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    staged = path
+    if path.endswith(".gz"):
+        staged = os.path.join(os.path.dirname(os.path.abspath(path)), ".restore.db")
+        with gzip.open(path, "rb") as f_in, open(staged, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+    try:
+        _check(staged)
+        safety = create_backup(keep=0)
+        print(f"[INFO] Current DB saved as {safety}")
+
+        src = sqlite3.connect(staged)
+        dst = sqlite3.connect(database.DB_NAME, timeout=30)
+        try:
+            # One step: the tills wait for the lock instead of seeing a half-restored DB
+            src.backup(dst, pages=-1)
+        finally:
+            dst.close()
+            src.close()
+    finally:
+        if staged != path and os.path.exists(staged):
+            os.remove(staged)
+
+    # An older snapshot may predate the latest migrations
+    database._schema_checked_for = None
+    database.ensure_schema()
+    import search_index
+    search_index.drop_index()
+    print(f"[INFO] Restored {database.DB_NAME} from {path}")
+
+
+def backup_due(interval_hours=None, backup_dir=None):
+    """True if the newest snapshot is older than interval_hours (never with 0/None)."""
+    interval_hours = config.BACKUP_INTERVAL_HOURS if interval_hours is None else interval_hours
+    if not interval_hours:
+        return False
+    backups = list_backups(backup_dir)
+    if not backups:
+        return True
+    return (datetime.now() - backups[0]['created']).total_seconds() >= interval_hours * 3600
+
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def start_background_backup(force=False):
+    """
+    Take a snapshot in a daemon thread if one is due (or force=True) and
+    none is running. Returns True if a backup was started.
+    """
+    global _background
+    with _background_lock:
+        if _background is not None and _background.is_alive():
+            return False
+        if not force and not backup_due():
+            return False
+
+        def run():
+            try:
+                create_backup()
+            except Exception as e:
+                print(f"[WARN] Background backup failed: {e}")
+
+        _background = threading.Thread(target=run, name="db-backup", daemon=True)
+        _background.start()
+        return True
+
+
+def run_scheduled(interval_hours, keep=None, compress=True):
+    """Backup every interval_hours until interrupted (for a service / scheduled task)."""
+    print(f"[INFO] Backing up {database.DB_NAME} every {interval_hours}h into {config.BACKUP_DIR}")
+    while True:
+        if backup_due(interval_hours):
+            try:
+                create_backup(keep=keep, compress=compress)
+            except Exception as e:
+                print(f"[WARN] Backup failed: {e}")
+        time.sleep(60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online backups of the stock database")
+    sub = parser.add_subparsers(dest="command", required=True)
+    create = sub.add_parser("create", help="Take a snapshot now")
+    create.add_argument("--keep", type=int, default=config.BACKUP_KEEP, help="Snapshots to keep (0: all)")
+    create.add_argument("--no-compress", action="store_true")
+    sub.add_parser("list", help="List snapshots, newest first")
+    restore = sub.add_parser("restore", help="Replace the DB with a snapshot")
+    restore.add_argument("path")
+    schedule = sub.add_parser("schedule", help="Keep taking snapshots")
+    schedule.add_argument("--every", type=float, default=config.BACKUP_INTERVAL_HOURS or 24, metavar="HOURS")
+    schedule.add_argument("--keep", type=int, default=config.BACKUP_KEEP)
+    schedule.add_argument("--no-compress", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        create_backup(keep=args.keep, compress=not args.no_compress)
+    elif args.command == "list":
+        for b in list_backups():
+            print(f"{b['created']:%Y-%m-%d %H:%M:%S}  {b['size_mb']:8.1f} MB  {b['path']}")
+    elif args.command == "restore":
+        restore_backup(args.path)
+    elif args.command == "schedule":
+        try:
+            run_scheduled(args.every, keep=args.keep, compress=not args.no_compress)
+        except KeyboardInterrupt:
+            return 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
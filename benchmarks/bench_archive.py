@@ -0,0 +1,164 @@
+"""
+Sales archive compaction: DB size, sales scans and logs/ before and after
+sales_archive.run on a multi-year synthetic history.
+
+    python benchmarks/bench_archive.py
+    python benchmarks/bench_archive.py --sales 500000 --years 4 --retention-days 365
+
+Also times the incremental_vacuum steps (each one holds the write lock)
+and the one-time conversion of a DB created without auto_vacuum, and
+checks that the monthly report is identical before and after.
+Runs against a scratch DB, never products.db.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+
+from common import BENCH_DIR, ROOT_DIR, Quiet, measure, result, write_report
+
+WORK_DIR = tempfile.mkdtemp(prefix="stock_archive_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "archive.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+import database  # noqa: E402
+import reports  # noqa: E402
+import sales_archive  # noqa: E402
+
+
+def scan_sales(db_path):
+    """A full pass over sales_log, as any ad-hoc sales query does."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("SELECT COUNT(*), SUM(total_amount), SUM(LENGTH(items_json)) FROM sales_log").fetchone()
+    conn.close()
+
+
+def write_legacy_logs(log_dir, carts, days):
+    """One venta_*.log per sale, spread over `days` days (the pre-journal layout)."""
+    now = time.time()
+    for n, cart in enumerate(carts, 1):
+        ts = time.strftime("%Y%m%d-%H%M%S", time.localtime(now - (len(carts) - n) * days * 86400.0 / len(carts)))
+        with open(os.path.join(log_dir, f"venta_{n}_{ts}.log"), "w", encoding="utf-8") as f:
+            f.write("\n".join(f"{i['name']}, {i['brand']}, {i['code']}, {i['quantity']}, {i['sale_price']}"
+                              for i in cart))
+
+
+def write_journals(log_dir, carts, days):
+    """One ventas_YYYYMMDD.jsonl per day over `days` days (the sales_journal layout)."""
+    now = time.time()
+    per_day = max(1, len(carts) // days)
+    for day in range(days):
+        stamp = time.strftime("%Y%m%d", time.localtime(now - (days - day) * 86400.0))
+        with open(os.path.join(log_dir, f"ventas_{stamp}.jsonl"), "w", encoding="utf-8") as f:
+            for cart in carts[day * per_day:(day + 1) * per_day]:
+                f.write(json.dumps({'items': cart}) + "\n")
+
+
+def journal_count(log_dir):
+    return sum(1 for name in os.listdir(log_dir) if name.startswith("ventas_"))
+
+
+def dir_stats(path):
+    files = [os.path.join(root, f) for root, _, names in os.walk(path) for f in names]
+    return len(files), sum(os.path.getsize(f) for f in files) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sales archive compaction benchmark")
+    parser.add_argument("--skus", type=int, default=10000)
+    parser.add_argument("--sales", type=int, default=300000)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--retention-days", type=int, default=365)
+    parser.add_argument("--log-files", type=int, default=20000, help="Legacy venta_*.log files in logs/")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/archive_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    try:
+        db_path = os.environ["STOCK_DB_PATH"]
+        log_dir = os.environ["STOCK_LOG_DIR"]
+        os.makedirs(log_dir, exist_ok=True)
+        days = int(args.years * 365)
+        with Quiet():
+            database.init_db()
+        products = synthetic.make_catalog(args.skus)
+        synthetic.load_catalog(db_path, products)
+        carts = synthetic.make_carts(products, args.sales)
+        synthetic.load_sales(db_path, carts, days=days)
+        write_legacy_logs(log_dir, carts[-args.log_files:], days)
+        write_journals(log_dir, carts, days)
+        journals_before = journal_count(log_dir)
+        with Quiet():
+            reports.refresh_sales_summary()
+            report_before = reports.get_sales_report("monthly")
+        size_before = os.path.getsize(db_path) / 1e6
+        files_before, logs_mb_before = dir_stats(log_dir)
+        print(f"\n== {args.sales} sales over {args.years} years, {size_before:.0f} MB DB, "
+              f"{files_before} log files; keep {args.retention_days} days ==")
+
+        scan_before = measure(lambda: scan_sales(db_path), repeat=3)
+        results = [result("sales_scan_before", args.sales, 1, scan_before, db_mb=size_before)]
+
+        # Archive, then reclaim with per-step timings
+        start = time.perf_counter()
+        with Quiet():
+            moved = sales_archive.archive_sales(args.retention_days)
+        archive_s = time.perf_counter() - start
+        results.append(result("archive_sales", sum(moved.values()), max(len(moved), 1), [archive_s],
+                              months=len(moved)))
+
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        steps = []
+        while conn.execute('PRAGMA freelist_count').fetchone()[0]:
+            start = time.perf_counter()
+            conn.executescript(f'PRAGMA incremental_vacuum({sales_archive.VACUUM_STEP_PAGES})')
+            steps.append(time.perf_counter() - start)
+        conn.close()
+        size_after = os.path.getsize(db_path) / 1e6
+        max_step_ms = max(steps) * 1000 if steps else 0.0
+        results.append(result("incremental_vacuum", len(steps), max(len(steps), 1), [sum(steps)],
+                              max_step_ms=max_step_ms, db_mb=size_after))
+        print(f"      longest step (write lock held) {max_step_ms:.1f} ms")
+
+        start = time.perf_counter()
+        with Quiet():
+            packed = sales_archive.pack_logs(args.retention_days)
+        files_after, logs_mb_after = dir_stats(log_dir)
+        journals_after = journal_count(log_dir)
+        results.append(result("pack_logs", packed, max(packed, 1), [time.perf_counter() - start],
+                              files_before=files_before, files_after=files_after,
+                              journals_before=journals_before, journals_after=journals_after,
+                              logs_mb_before=logs_mb_before, logs_mb_after=logs_mb_after))
+
+        scan_after = measure(lambda: scan_sales(db_path), repeat=3)
+        with Quiet():
+            report_after = reports.get_sales_report("monthly")
+        results.append(result("sales_scan_after", args.sales - sum(moved.values()), 1, scan_after,
+                              db_mb=size_after, report_unchanged=report_before == report_after))
+        print(f"      DB {size_before:.0f} -> {size_after:.0f} MB, logs/ {files_before} -> {files_after} files "
+              f"({logs_mb_before:.0f} -> {logs_mb_after:.0f} MB, {journals_before} -> {journals_after} journals), "
+              f"report unchanged: {report_before == report_after}")
+
+        # A DB from before auto_vacuum=INCREMENTAL: one full VACUUM, once
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        conn.execute('PRAGMA auto_vacuum = NONE')
+        conn.execute('VACUUM')
+        conn.close()
+        start = time.perf_counter()
+        with Quiet():
+            sales_archive.reclaim_space()
+        results.append(result("convert_to_incremental", 1, 1, [time.perf_counter() - start]))
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    write_report("archive", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+POS latency while an online backup runs: sales are rung up in a loop (as
+the Streamlit tills do, same process) and timed with no backup, with a
+one-step backup, and with the stepped backup backup.create_backup uses.
+
+    python benchmarks/bench_backup.py
+    python benchmarks/bench_backup.py --skus 50000 --sales 500000 --sale-interval 0.5
+    python benchmarks/bench_backup.py --wal
+
+Reports, per mode, the latency (p50/p95/max) of the sales that overlapped a
+backup, the backup time, the copy restarts forced by those sales, and the
+snapshot size raw and gzipped. Runs against a scratch DB, never products.db.
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+import statistics
+
+from common import BENCH_DIR, ROOT_DIR, Quiet, result, write_report
+
+WORK_DIR = tempfile.mkdtemp(prefix="stock_backup_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "backup.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+os.environ["STOCK_BACKUP_DIR"] = os.path.join(WORK_DIR, "backups")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+import database  # noqa: E402
+import logic  # noqa: E402
+import reports  # noqa: E402
+import backup  # noqa: E402
+
+
+class Till(threading.Thread):
+    """Rings up a one-item sale every `interval` seconds, timing each one."""
+
+    def __init__(self, products, interval):
+        super().__init__(daemon=True)
+        self.products = [p for p in products if p['stock_quantity'] > 0]
+        self.interval = interval
+        self.samples = []           # (start time, latency in s)
+        self.stop = threading.Event()
+
+    def run(self):
+        rng = random.Random(1)
+        while not self.stop.is_set():
+            p = rng.choice(self.products)
+            cart = [{'code': p['code'], 'name': p['name'], 'brand': p['brand'], 'quantity': 1,
+                     'sale_price': round(p['cost_price'] * 1.51, 2), 'cost_price': p['cost_price']}]
+            start = time.perf_counter()
+            logic.process_sale_transaction(cart)
+            self.samples.append((start, time.perf_counter() - start))
+            time.sleep(self.interval)
+
+    def latencies_ms(self, windows):
+        """Latencies of the sales that overlapped any of the (start, end) windows."""
+        return sorted(lat * 1000 for t, lat in self.samples
+                      if any(t <= end and t + lat >= start for start, end in windows))
+
+
+def summary(ms):
+    if not ms:
+        return {'sales': 0}
+    return {'sales': len(ms), 'p50_ms': statistics.median(ms),
+            'p95_ms': ms[max(0, int(len(ms) * 0.95) - 1)], 'max_ms': ms[-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online backup impact on POS latency")
+    parser.add_argument("--skus", type=int, default=50000)
+    parser.add_argument("--sales", type=int, default=200000, help="Sales history loaded first (DB size)")
+    parser.add_argument("--sale-interval", type=float, default=0.2, help="Seconds between sales")
+    parser.add_argument("--baseline-seconds", type=float, default=5.0)
+    parser.add_argument("--rounds", type=int, default=10, help="Backups taken per mode")
+    parser.add_argument("--wal", action="store_true", help="Put the scratch DB in WAL mode first")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/backup_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    try:
+        db_path = os.environ["STOCK_DB_PATH"]
+        with Quiet():
+            database.init_db()
+        products = synthetic.make_catalog(args.skus)
+        synthetic.load_catalog(db_path, products)
+        synthetic.load_sales(db_path, synthetic.make_carts(products, args.sales))
+        with Quiet():
+            reports.refresh_sales_summary()
+        conn = sqlite3.connect(db_path)
+        journal = conn.execute(f"PRAGMA journal_mode={'WAL' if args.wal else 'DELETE'}").fetchone()[0]
+        conn.close()
+        print(f"\n== {args.skus} SKUs, {args.sales} sales, {os.path.getsize(db_path) / 1e6:.0f} MB DB "
+              f"({journal} journal), a sale every {args.sale_interval}s ==")
+
+        modes = [
+            ("backup_one_step", {'pages': -1, 'pause': 0, 'compress': False}),
+            ("backup_stepped", {'compress': False}),
+            ("backup_stepped_gzip", {'compress': True}),
+        ]
+        measured = []
+        with Quiet():
+            till = Till(products, args.sale_interval)
+            till.start()
+            time.sleep(1.0)  # warm up
+            start = time.perf_counter()
+            time.sleep(args.baseline_seconds)
+            measured.append(("no_backup", [(start, time.perf_counter())], {}))
+
+            # Count the restarts forced by the till
+            copy_online = backup._copy_online
+            restarts = []
+            backup._copy_online = lambda *a: restarts.append(copy_online(*a)) or restarts[-1]
+            for name, options in modes:
+                windows, sizes = [], []
+                del restarts[:]
+                for _ in range(args.rounds):
+                    start = time.perf_counter()
+                    path = backup.create_backup(keep=0, **options)
+                    windows.append((start, time.perf_counter()))
+                    sizes.append(os.path.getsize(path) / 1e6)
+                    time.sleep(args.sale_interval * 3)
+                measured.append((name, windows, {'restarts': sum(restarts), 'snapshot_mb': sizes[-1]}))
+            backup._copy_online = copy_online
+            till.stop.set()
+            till.join()
+
+        results = []
+        for name, windows, extra in measured:
+            extra.update(summary(till.latencies_ms(windows)))
+            times = [end - start for start, end in windows]
+            results.append(result(name, extra['sales'], len(windows), times, **extra))
+            print("      " + ", ".join(f"{k} {v:.1f}" if isinstance(v, float) else f"{k} {v}"
+                                       for k, v in extra.items()))
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    write_report("backup", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Session carts: the list-of-dicts cart / supply order (linear next() on add,
+sum() over the cart per POS product row, pop by index) vs. cart.Cart.
+
+    python benchmarks/bench_cart.py
+    python benchmarks/bench_cart.py --cart-lines 100 500 --products 200 --order-lines 300 800
+
+Times, per size, what one Streamlit rerun does with the cart: the in-cart
+quantity of every listed product plus the cart total, building it line by
+line, and removing lines. Checks both structures end with the same totals.
+Pure Python, no DB.
+"""
+import sys
+import random
+import argparse
+
+from common import BENCH_DIR, ROOT_DIR, measure, result, write_report
+
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import cart  # noqa: E402
+
+
+def make_lines(count, price_key, rng):
+    return [{'code': f"SKU{n:06d}", 'name': f"Producto {n}", 'quantity': rng.randint(1, 5),
+             price_key: round(rng.uniform(1, 500), 2)} for n in range(count)]
+
+
+# --- The list-based code paths app.py had ---
+
+def list_add(items, line):
+    existing = next((item for item in items if item['code'] == line['code']), None)
+    if existing:
+        existing['quantity'] += line['quantity']
+    else:
+        items.append(dict(line))
+
+
+def list_rerun(items, codes, price_key):
+    in_cart = [sum(item['quantity'] for item in items if item['code'] == code) for code in codes]
+    return in_cart, sum(item[price_key] * item['quantity'] for item in items)
+
+
+def list_remove(items, code):
+    idx = next(i for i, item in enumerate(items) if item['code'] == code)
+    items.pop(idx)
+
+
+def cart_rerun(c, codes):
+    return [c.quantity(code) for code in codes], c.total_amount
+
+
+def bench_size(lines, products, price_key, adds, rng):
+    """Results for one cart size: build (with repeats), rerun, remove."""
+    # Every line added twice: the second add hits an existing code
+    sequence = lines + [dict(line, quantity=1) for line in rng.sample(lines, min(adds, len(lines)))]
+    codes = [line['code'] for line in rng.sample(lines, min(products, len(lines)))]
+    codes += [f"OTHER{n}" for n in range(products - len(codes))]
+    removals = [line['code'] for line in rng.sample(lines, len(lines) // 2)]
+    size, out = len(lines), []
+
+    items, c = [], cart.Cart(price_key)
+
+    def build_list():
+        del items[:]
+        for line in sequence:
+            list_add(items, line)
+
+    def build_cart():
+        c.clear()
+        for line in sequence:
+            c.add(line)
+
+    out.append(result(f"{price_key}_build_list", size, len(sequence), measure(build_list, repeat=3)))
+    out.append(result(f"{price_key}_build_cart", size, len(sequence), measure(build_cart, repeat=3)))
+
+    list_total = list_rerun(items, codes, price_key)[1]
+    same = abs(list_total - c.total_amount) < 0.005 and c.total_items == sum(i['quantity'] for i in items)
+    out.append(result(f"{price_key}_rerun_list", size, len(codes),
+                      measure(lambda: list_rerun(items, codes, price_key), repeat=5)))
+    out.append(result(f"{price_key}_rerun_cart", size, len(codes),
+                      measure(lambda: cart_rerun(c, codes), repeat=5), same_totals=same))
+
+    out.append(result(f"{price_key}_remove_list", size, len(removals),
+                      measure(lambda: [list_remove(items, code) for code in removals])))
+    out.append(result(f"{price_key}_remove_cart", size, len(removals),
+                      measure(lambda: [c.remove(code) for code in removals])))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session cart structure benchmark")
+    parser.add_argument("--cart-lines", type=int, nargs="+", default=[20, 100, 500],
+                        help="POS cart sizes (lines)")
+    parser.add_argument("--products", type=int, default=200, help="POS product rows per rerun")
+    parser.add_argument("--order-lines", type=int, nargs="+", default=[200, 500, 1000],
+                        help="Supply order sizes (lines)")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/cart_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    results = []
+    for size in args.cart_lines:
+        print(f"\n== POS cart, {size} lines, {args.products} product rows per rerun ==")
+        results += bench_size(make_lines(size, 'sale_price', rng), args.products, 'sale_price', size, rng)
+    for size in args.order_lines:
+        # The Restocking tab shows the whole order: one row per line
+        print(f"\n== Supply order, {size} lines ==")
+        results += bench_size(make_lines(size, 'cost_price', rng), size, 'cost_price', size, rng)
+    if not all(r.get('same_totals', True) for r in results):
+        print("[WARN] Totals differ between the list and the Cart")
+
+    write_report("cart", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
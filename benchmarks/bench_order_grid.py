@@ -0,0 +1,94 @@
+"""
+Data behind the bulk order grid: one page from database.get_products_page
+(what the Restocking grid loads per rerun) vs. loading the whole catalog and
+slicing it in Python (what the per-card Stock grid does).
+
+    python benchmarks/bench_order_grid.py
+    python benchmarks/bench_order_grid.py --skus 10000 100000 --page-size 50
+
+Per catalog size: first page, a deep page, a brand facet page and a
+substring search page, with their row counts. Runs against a scratch DB,
+never products.db.
+"""
+import os
+import sys
+import random
+import shutil
+import argparse
+import tempfile
+
+from common import BENCH_DIR, ROOT_DIR, Quiet, measure, result, write_report
+
+WORK_DIR = tempfile.mkdtemp(prefix="stock_grid_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "grid.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+import database  # noqa: E402
+
+
+def full_catalog_page(page, page_size, brand=None, search=None):
+    """The old way: every product in memory, filtered and sliced in Python."""
+    products = database.get_all_products()
+    if brand:
+        products = [p for p in products if p['brand'] == brand]
+    if search:
+        needle = search.lower()
+        products = [p for p in products
+                    if any(needle in str(p[k] or '').lower() for k in ('code', 'name', 'brand'))]
+    products.sort(key=lambda p: (p['stock_quantity'], p['code']))
+    return products[(page - 1) * page_size:page * page_size], len(products)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk order grid page query benchmark")
+    parser.add_argument("--skus", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/order_grid_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    results = []
+    try:
+        db_path = os.environ["STOCK_DB_PATH"]
+        for size in args.skus:
+            if os.path.exists(db_path):
+                os.remove(db_path)
+            with Quiet():
+                database.init_db()
+            products = synthetic.make_catalog(size)
+            synthetic.load_catalog(db_path, products)
+            rng = random.Random(5)
+            brand = rng.choice(products)['brand']
+            search = rng.choice(products)['name'].split()[0][:5]
+            deep = max(1, size // args.page_size // 2)
+            print(f"\n== {size} SKUs, {args.page_size} rows per page ==")
+
+            cases = [
+                ("first_page", {'page': 1}),
+                ("deep_page", {'page': deep}),
+                ("brand_page", {'page': 1, 'brand': brand}),
+                ("search_page", {'page': 1, 'search': search}),
+            ]
+            for name, kw in cases:
+                rows, total = database.get_products_page(page_size=args.page_size, **kw)
+                old_rows, old_total = full_catalog_page(page_size=args.page_size, **kw)
+                same = ([r['code'] for r in rows] == [r['code'] for r in old_rows] and total == old_total)
+                old = measure(lambda: full_catalog_page(page_size=args.page_size, **kw), repeat=args.repeat)
+                new = measure(lambda: database.get_products_page(page_size=args.page_size, **kw),
+                              repeat=args.repeat)
+                results.append(result(f"{name}_full_catalog", size, 1, old, rows_loaded=size))
+                results.append(result(f"{name}_sql_page", size, 1, new, rows_loaded=len(rows),
+                                      matches=total, same_rows=same))
+            if not all(r.get('same_rows', True) for r in results):
+                print("[WARN] Page query and full-catalog slice returned different rows")
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    write_report("order_grid", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
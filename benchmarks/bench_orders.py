@@ -0,0 +1,132 @@
+"""
+Supply order lookups with many order_*.csv files in logs/: find an order by
+ID and list the pending ones by globbing and parsing the CSVs (the only way
+before supply_orders) vs. querying the supply_orders tables.
+
+    python benchmarks/bench_orders.py
+    python benchmarks/bench_orders.py --orders 20000 --lines 40
+
+Also times the one-time backfill (supply_orders.import_order_csvs) and
+receiving an order by ID. Runs against a scratch DB, never products.db.
+"""
+import os
+import csv
+import sys
+import glob
+import random
+import shutil
+import argparse
+import tempfile
+
+from common import BENCH_DIR, ROOT_DIR, Quiet, measure, result, write_report
+
+WORK_DIR = tempfile.mkdtemp(prefix="stock_orders_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "orders.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+import database  # noqa: E402
+import supply_orders  # noqa: E402
+
+
+def write_order_files(log_dir, products, count, lines, used_share):
+    """`count` order CSVs as the app wrote them; returns (ids, used ids)."""
+    rng = random.Random(7)
+    ids, used = [], []
+    for n in range(count):
+        order_id = f"ORD-{n:08X}"
+        day, second = divmod(n, 86400)
+        name = f"order_2024{1 + day // 28 % 12:02d}{1 + day % 28:02d}-{second // 3600:02d}{second // 60 % 60:02d}{second % 60:02d}.csv"
+        with open(os.path.join(log_dir, name), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(supply_orders.CSV_COLUMNS)
+            for p in rng.sample(products, lines):
+                qty = rng.randint(1, 50)
+                writer.writerow([p['code'], p['name'], qty, p['cost_price'], qty * p['cost_price'], order_id])
+        ids.append(order_id)
+        if rng.random() < used_share:
+            used.append(order_id)
+    return ids, used
+
+
+def find_by_glob(log_dir, order_id):
+    for path in glob.glob(os.path.join(log_dir, "order_*.csv")):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        if rows and rows[0].get('order_id') == order_id:
+            return rows
+    return None
+
+
+def pending_by_glob(log_dir, used):
+    pending = []
+    for path in glob.glob(os.path.join(log_dir, "order_*.csv")):
+        with open(path, newline="", encoding="utf-8") as f:
+            first = next(csv.DictReader(f), None)
+        if first and first['order_id'] not in used:
+            pending.append(first['order_id'])
+    return pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supply order lookup benchmark")
+    parser.add_argument("--skus", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--lines", type=int, default=25, help="Products per order")
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--used-share", type=float, default=0.9, help="Share of orders already redeemed")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/orders_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    try:
+        db_path = os.environ["STOCK_DB_PATH"]
+        log_dir = os.environ["STOCK_LOG_DIR"]
+        os.makedirs(log_dir, exist_ok=True)
+        with Quiet():
+            database.init_db()
+        products = synthetic.make_catalog(args.skus)
+        synthetic.load_catalog(db_path, products)
+        ids, used = write_order_files(log_dir, products, args.orders, args.lines, args.used_share)
+        conn = database.get_connection()
+        conn.executemany('INSERT INTO used_orders (order_id, total_items) VALUES (?, 0)', [(i,) for i in used])
+        conn.commit()
+        conn.close()
+        print(f"\n== {args.orders} order files x {args.lines} lines, {len(used)} redeemed ==")
+
+        results = []
+        backfill = measure(supply_orders.import_order_csvs)
+        results.append(result("import_order_csvs", args.orders, args.orders, backfill))
+
+        rng = random.Random(3)
+        targets = [rng.choice(ids) for _ in range(args.lookups)]
+        glob_times = measure(lambda: [find_by_glob(log_dir, t) for t in targets])
+        db_times = measure(lambda: [supply_orders.get_order(t) for t in targets], repeat=5)
+        results.append(result("find_order_glob", args.orders, args.lookups, glob_times))
+        results.append(result("find_order_db", args.orders, args.lookups, db_times))
+
+        used_set = set(used)
+        glob_pending = measure(lambda: pending_by_glob(log_dir, used_set))
+        db_pending = measure(lambda: supply_orders.list_orders(supply_orders.STATUS_PENDING, limit=args.orders),
+                             repeat=5)
+        same = (sorted(pending_by_glob(log_dir, used_set)) ==
+                sorted(o['order_id'] for o in supply_orders.list_orders(supply_orders.STATUS_PENDING,
+                                                                        limit=args.orders)))
+        results.append(result("list_pending_glob", args.orders, 1, glob_pending))
+        results.append(result("list_pending_db", args.orders, 1, db_pending, same_orders=same))
+
+        pending = [o['order_id'] for o in supply_orders.list_orders(supply_orders.STATUS_PENDING,
+                                                                    limit=args.lookups)]
+        receive = [measure(lambda: supply_orders.receive_order(order_id))[0] for order_id in pending]
+        if receive:
+            results.append(result("receive_order", args.lines, len(receive), [sum(receive)]))
+        print(f"      pending list identical: {same}")
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    write_report("orders", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Memory of Phase 1 on a large synthetic supplier PDF, per backend and mode.
+
+    python benchmarks/bench_pdf_memory.py
+    python benchmarks/bench_pdf_memory.py --pages 600 --backends pymupdf
+
+Each run parses the PDF in its own process, consuming iter_pdf_products()
+page by page, and samples the resident memory after every page: with the
+per-page caches released the curve should stay flat instead of growing
+with the page count. Page cache off; never touches products.db.
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from common import BENCH_DIR, ROOT_DIR, result, write_report
+
+WORK_DIR = tempfile.mkdtemp(prefix="stock_pdfmem_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "pdfmem.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+os.environ["STOCK_PDF_CACHE_PATH"] = os.path.join(WORK_DIR, "pdf_cache.db")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+import pdf_backends  # noqa: E402
+
+ROWS_PER_PAGE = 40
+
+# Child: stream the pages, print one JSON line with the RSS curve
+CHILD = """
+import sys, json, time, contextlib, io
+sys.path.insert(0, {root!r})
+import logic
+from instrumentation import rss_mb, peak_rss_mb
+curve, rows = [], 0
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    for page_no, page_count, products in logic.iter_pdf_products({pdf!r}, use_cache=False,
+                                                                 backend={backend!r}, low_memory={low_memory!r}):
+        rows += len(products)
+        curve.append(rss_mb())
+print(json.dumps({{'elapsed': time.perf_counter() - start, 'rows': rows,
+                   'curve': curve, 'peak': peak_rss_mb()}}))
+"""
+
+
+def run_child(pdf_path, backend, low_memory):
+    code = CHILD.format(root=ROOT_DIR, pdf=pdf_path, backend=backend, low_memory=low_memory)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{backend} failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phase 1 memory on a large PDF")
+    parser.add_argument("--pages", type=int, default=300, help="Pages in the generated PDF")
+    parser.add_argument("--backends", nargs="+", choices=sorted(pdf_backends.BACKENDS),
+                        default=sorted(pdf_backends.BACKENDS))
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/pdfmem_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    try:
+        pdf_path = os.path.join(WORK_DIR, "catalog.pdf")
+        products = synthetic.make_catalog(args.pages * ROWS_PER_PAGE, seed=99)
+        synthetic.write_catalog_pdf(pdf_path, products, ROWS_PER_PAGE)
+        print(f"\n== {args.pages} pages, {len(products)} rows "
+              f"({os.path.getsize(pdf_path) / 1e6:.1f} MB PDF) ==")
+
+        results = []
+        for backend in args.backends:
+            for low_memory in (False, True):
+                run = run_child(pdf_path, backend, low_memory)
+                curve = run['curve']
+                # Growth over the last 90% of the pages: the first pages warm up fonts etc.
+                warm = curve[len(curve) // 10]
+                growth = (curve[-1] - warm) * 100.0 / max(len(curve) - len(curve) // 10, 1)
+                name = f"phase1_{backend}{'_low_memory' if low_memory else ''}"
+                results.append(result(name, len(products), args.pages, [run['elapsed']], unit="page",
+                                      rows_parsed=run['rows'], peak_rss_mb=run['peak'],
+                                      rss_first_mb=curve[0], rss_last_mb=curve[-1],
+                                      growth_mb_per_100_pages=growth,
+                                      rss_curve_mb=curve[::max(1, len(curve) // 20)]))
+                print(f"      RSS {curve[0]:.0f} -> {curve[-1]:.0f} MB (peak {run['peak']:.0f}), "
+                      f"{growth:+.1f} MB per 100 pages")
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    write_report("pdfmem", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
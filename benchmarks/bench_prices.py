@@ -0,0 +1,130 @@
+"""
+Price parsing accuracy and throughput on a large synthetic fixture.
+
+    python benchmarks/bench_prices.py
+    python benchmarks/bench_prices.py --tables 10000 --rows 40
+
+The fixture is a list of tables (one price column each, like the supplier
+PDF pages). Most tables use the AR format, some US; values are chosen so a
+good share of the strings is ambiguous ("1.200", "12,500"). Compared:
+  legacy   - the per-row parser that used to live inside process_data_pdf
+  prices   - prices.parse_price_column with per-table format detection
+  pandas   - the same column logic with pandas string ops, for reference
+"""
+import sys
+import random
+import argparse
+
+from common import ROOT_DIR, measure, result, write_report
+
+sys.path.insert(0, ROOT_DIR)
+
+import prices  # noqa: E402
+
+
+def legacy_parse_price_str(s):
+    """The former nested parser from logic.process_data_pdf, verbatim logic."""
+    if not s: return None
+    s_clean = s.replace('$', '').strip()
+    if not s_clean: return None
+    s_clean = s_clean.replace(' ', '')
+    try_ar = s_clean.replace('.', '').replace(',', '.')
+    try:
+        return float(try_ar)
+    except:  # noqa: E722
+        pass
+    try:
+        return float(s_clean)
+    except:  # noqa: E722
+        return None
+
+
+def format_price(value, fmt, decimals, symbol):
+    s = f"{value:,.{decimals}f}"
+    if fmt == prices.AR:
+        s = s.replace(",", "X").replace(".", ",").replace("X", ".")
+    return f"$ {s}" if symbol else s
+
+
+def make_fixture(n_tables, rows, us_share, seed=7):
+    """List of (format, [(price_string, true_value or None)]) tables."""
+    rng = random.Random(seed)
+    tables = []
+    for _ in range(n_tables):
+        fmt = prices.US if rng.random() < us_share else prices.AR
+        decimals = rng.choice([0, 2, 2, 2])
+        symbol = rng.random() < 0.7
+        column = [("Precio", None)]
+        for _ in range(rows):
+            roll = rng.random()
+            if roll < 0.02:
+                column.append((None, None))
+                continue
+            if roll < 0.25:
+                # Round thousands: "1.200" / "12,500" style ambiguity
+                value = float(rng.randint(1, 99) * 100)
+            elif roll < 0.35:
+                value = rng.uniform(0.5, 9.99)
+            else:
+                value = rng.uniform(10, 250000)
+            value = round(value, decimals)
+            column.append((format_price(value, fmt, decimals, symbol), value))
+        tables.append((fmt, column))
+    return tables
+
+
+def accuracy(tables, parse_table):
+    correct = total = 0
+    for _, column in tables:
+        parsed = parse_table([s for s, _ in column])
+        for (_, truth), got in zip(column, parsed):
+            if truth is None:
+                continue
+            total += 1
+            correct += got is not None and abs(got - truth) < 1e-6
+    return correct / total if total else 1.0
+
+
+def parse_legacy(column):
+    return [legacy_parse_price_str(s) for s in column]
+
+
+def parse_pandas(column):
+    import pandas as pd
+    series = pd.Series(column, dtype="string").str.replace(r"[$\s]", "", regex=True)
+    fmt = prices.detect_format(column)
+    if fmt == prices.AR:
+        series = series.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    else:
+        series = series.str.replace(",", "", regex=False)
+    return pd.to_numeric(series, errors="coerce").tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Price parser accuracy and throughput")
+    parser.add_argument("--tables", type=int, default=5000, help="Tables (price columns) in the fixture")
+    parser.add_argument("--rows", type=int, default=40, help="Rows per table")
+    parser.add_argument("--us-share", type=float, default=0.15, help="Fraction of US-format tables")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/prices_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    tables = make_fixture(args.tables, args.rows, args.us_share)
+    columns = [[s for s, _ in column] for _, column in tables]
+    n_strings = sum(len(c) for c in columns)
+    print(f"\n== {n_strings} price strings in {len(columns)} tables ==")
+
+    results = []
+    for name, parse_table in (("legacy", parse_legacy),
+                              ("prices", prices.parse_price_column),
+                              ("pandas", parse_pandas)):
+        acc = accuracy(tables, parse_table)
+        times = measure(lambda: [parse_table(c) for c in columns], args.repeat)
+        results.append(result(f"parse_{name}", n_strings, n_strings, times, accuracy=acc))
+        print(f"      accuracy {acc * 100:.2f}%")
+
+    write_report("prices", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
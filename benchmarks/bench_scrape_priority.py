@@ -0,0 +1,99 @@
+"""
+Value of the Phase 2 priority queue: how much of what the shop sells gets
+an image within a limited scraping run, PDF order vs priority order.
+
+    python benchmarks/bench_scrape_priority.py
+    python benchmarks/bench_scrape_priority.py --skus 20000 --fetch-seconds 1.5
+
+No network: a run of B seconds is modelled as B / --fetch-seconds fetches
+(search request + 1 s courtesy delay + download), taken in each order.
+Reports, per budget, the share of the last 30 days' units sold and of the
+in-stock SKUs whose image would have been fetched.
+"""
+import os
+import sys
+import time
+import heapq
+import random
+import shutil
+import argparse
+import tempfile
+
+from common import BENCH_DIR, ROOT_DIR, Quiet, result, write_report
+
+WORK_DIR = tempfile.mkdtemp(prefix="stock_scrape_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "scrape.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+import database  # noqa: E402
+import logic  # noqa: E402
+import reports  # noqa: E402
+
+BUDGETS_MIN = [5, 15, 30, 60]
+
+
+def coverage(order, products, units, in_stock, n_fetches):
+    """(share of units sold, share of in-stock SKUs) covered by the first n_fetches of order."""
+    fetched = {products[i]['code'] for i in order[:n_fetches]}
+    total_units = sum(units.values()) or 1
+    sold = sum(u for code, u in units.items() if code in fetched) / total_units
+    stocked = len(fetched & in_stock) / float(len(in_stock) or 1)
+    return sold, stocked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phase 2 priority scheduling benchmark")
+    parser.add_argument("--skus", type=int, default=10000)
+    parser.add_argument("--sales", type=int, default=3000, help="Sales over the last 30 days")
+    parser.add_argument("--fetch-seconds", type=float, default=1.5, help="Average time per image fetch")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/scrape_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    try:
+        db_path = os.environ["STOCK_DB_PATH"]
+        database.init_db()
+        products = synthetic.make_catalog(args.skus)
+        synthetic.load_catalog(db_path, products)
+        # Skewed demand: a few hundred best sellers get most of the sales
+        rng = random.Random(5)
+        in_stock_products = [p for p in products if p['stock_quantity'] > 0]
+        best_sellers = rng.sample(in_stock_products, max(1, len(in_stock_products) // 20))
+        carts = (synthetic.make_carts(best_sellers, args.sales * 4 // 5, seed=8)
+                 + synthetic.make_carts(products, args.sales // 5, seed=9))
+        synthetic.load_sales(db_path, carts, days=30)
+
+        with Quiet():
+            reports.refresh_sales_summary()
+        units = {code: v * logic.SCRAPE_VELOCITY_DAYS
+                 for code, v in reports.get_sales_velocity(logic.SCRAPE_VELOCITY_DAYS).items()}
+        in_stock = {p['code'] for p in in_stock_products}
+
+        start = time.perf_counter()
+        queue = logic.build_scrape_queue(products)
+        priority_order = [heapq.heappop(queue)[1] for _ in range(len(queue))]
+        elapsed = time.perf_counter() - start
+        pdf_order = list(range(len(products)))
+
+        print(f"\n== {args.skus} SKUs, {len(carts)} sales, {args.fetch_seconds}s per fetch ==")
+        results = [result("build_scrape_queue", args.skus, args.skus, [elapsed])]
+        print(f"  {'budget':>8} {'fetches':>8} | {'sold: pdf':>10} {'priority':>9} | {'stock: pdf':>10} {'priority':>9}")
+        for minutes in BUDGETS_MIN:
+            n_fetches = int(minutes * 60 / args.fetch_seconds)
+            pdf_sold, pdf_stock = coverage(pdf_order, products, units, in_stock, n_fetches)
+            pri_sold, pri_stock = coverage(priority_order, products, units, in_stock, n_fetches)
+            print(f"  {minutes:>6}m {n_fetches:>8} | {pdf_sold:>10.1%} {pri_sold:>9.1%} | "
+                  f"{pdf_stock:>10.1%} {pri_stock:>9.1%}")
+            results.append({'benchmark': f"coverage_{minutes}min", 'fetches': n_fetches,
+                            'units_sold_pdf_order': pdf_sold, 'units_sold_priority': pri_sold,
+                            'in_stock_pdf_order': pdf_stock, 'in_stock_priority': pri_stock})
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    write_report("scrape", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+CPU and memory per Phase 2 request: full vs strained HTML parsing of a
+search results page, and in-memory vs streamed image downloads.
+
+    python benchmarks/bench_scraper.py
+    python benchmarks/bench_scraper.py --products 48 --image-mb 8
+
+Runs against a local HTTP server, no network needed. Peak memory is the
+tracemalloc peak of Python allocations during the operation.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import ROOT_DIR, result, write_report
+
+WORK_DIR = tempfile.mkdtemp(prefix="stock_scraper_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "scraper.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+sys.path.insert(0, ROOT_DIR)
+
+import logic  # noqa: E402
+
+
+def search_page(n_products):
+    """PrestaShop-like search results: heavy header/menu/scripts, n product cards."""
+    nav = "".join(f'<li class="category"><a href="/c/{i}">Categoria {i}</a>'
+                  f'<ul>{"".join(f"<li><a href=/c/{i}/{j}>Sub {j}</a></li>" for j in range(10))}</ul></li>'
+                  for i in range(60))
+    script = "<script>" + "var prestashop = {};" * 3000 + "</script>"
+    cards = "".join(
+        f'<article class="product-miniature js-product-miniature" data-id-product="{i}">'
+        f'<div class="thumbnail-container"><a href="/p/{i}" class="thumbnail product-thumbnail">'
+        f'<img src="http://127.0.0.1/img{i}.jpg" alt="Producto {i}" loading="lazy"></a>'
+        f'<div class="product-description"><h2 class="h3 product-title"><a href="/p/{i}">Producto {i}</a></h2>'
+        f'<div class="product-price-and-shipping"><span class="price">$ {i},00</span></div></div>'
+        f'</div></article>' for i in range(n_products))
+    footer = "".join(f'<div class="footer-block"><a href="/f/{i}">Link {i}</a></div>' for i in range(200))
+    return (f'<html><head><title>Buscar</title>{script}</head><body><header><img src="/logo.png">'
+            f'<nav><ul>{nav}</ul></nav></header><section id="products">{cards}</section>'
+            f'<footer>{footer}</footer></body></html>')
+
+
+def legacy_find_image_url(html):
+    """The pre-strainer lookup: full tree, then the three selectors."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    img_tag = soup.select_one("article.product-miniature div.thumbnail-container img")
+    if not img_tag:
+        img_tag = soup.select_one(".product_img_link img")
+    if not img_tag:
+        img_tag = soup.select_one(".product-image img")
+    return (img_tag.get('src') or img_tag.get('data-src')) if img_tag else None
+
+
+def legacy_download(session, url, path):
+    img_data = session.get(url, headers=logic.HEADERS, timeout=10).content
+    with open(path, "wb") as f:
+        f.write(img_data)
+
+
+def profile(func, repeat=1):
+    """(wall times, tracemalloc peak MB) of func(); timed runs are untraced."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return times, peak / 1e6
+
+
+def start_server(image_bytes):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/image.jpg":
+                body, ctype = image_bytes, "image/jpeg"
+            elif self.path == "/page.html":
+                body, ctype = b"<html>not found</html>", "text/html"
+            elif self.path == "/unsized.jpg":
+                # No Content-Length: the cap has to be enforced while streaming
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for _ in range(len(image_bytes) * 4 // 65536):
+                    self.wfile.write(image_bytes[:65536])
+                return
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    class Server(ThreadingHTTPServer):
+        def handle_error(self, request, client_address):
+            pass  # rejected downloads hang up mid-body on purpose
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraper parsing/download benchmark")
+    parser.add_argument("--products", type=int, default=24, help="Product cards on the search page")
+    parser.add_argument("--image-mb", type=float, default=4.0, help="Size of the served image")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/scraper_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    import requests
+
+    results = []
+    try:
+        html = search_page(args.products)
+        print(f"\n== search page: {len(html) / 1e3:.0f} kB, {args.products} products ==")
+        assert legacy_find_image_url(html) == logic.find_image_url(html)
+        for name, func in [("html_parse_full", legacy_find_image_url), ("html_parse_strained", logic.find_image_url)]:
+            times, peak = profile(lambda: func(html), args.repeat)
+            results.append(result(name, len(html), 1, times, peak_mb=peak))
+            print(f"      peak {peak:.1f} MB")
+
+        image = os.urandom(int(args.image_mb * 1e6))
+        server, base = start_server(image)
+        target = os.path.join(WORK_DIR, "image.jpg")
+        print(f"\n== image download: {args.image_mb} MB ==")
+        with requests.Session() as session:
+            for name, func in [
+                ("download_in_memory", lambda: legacy_download(session, base + "/image.jpg", target)),
+                ("download_streamed", lambda: logic.download_image(session, base + "/image.jpg", target,
+                                                                   max_bytes=len(image) + 1)),
+            ]:
+                times, peak = profile(func, args.repeat)
+                results.append(result(name, len(image), 1, times, peak_mb=peak))
+                print(f"      peak {peak:.1f} MB")
+
+            # Rejections: nothing (not even a .part) may be left behind
+            os.remove(target)
+            checks = {
+                "not_an_image": logic.download_image(session, base + "/page.html", target),
+                "declared_too_large": logic.download_image(session, base + "/image.jpg", target,
+                                                           max_bytes=len(image) // 2),
+                "streamed_too_large": logic.download_image(session, base + "/unsized.jpg", target,
+                                                           max_bytes=len(image)),
+            }
+            leftovers = os.listdir(WORK_DIR)
+            for case, reason in checks.items():
+                print(f"  {case:<28} -> {reason}")
+            print(f"  files left behind: {[f for f in leftovers if f.startswith('image')] or 'none'}")
+            results.append({'benchmark': 'download_rejections', 'reasons': checks,
+                            'leftover_files': [f for f in leftovers if f.startswith('image')]})
+        server.shutdown()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    write_report("scraper", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
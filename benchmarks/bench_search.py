@@ -0,0 +1,188 @@
+"""
+Typo-tolerant product search at catalog scale: trigram index vs a naive
+Levenshtein scan (and the old substring filter) on misspelt queries.
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --skus 100000 --queries 200 --naive-queries 3
+
+Queries are "name brand [detail]" of a random product with one typo per
+word (dropped, doubled, swapped or replaced letter). A result counts as
+relevant when it has the same name and brand (and detail, if asked for);
+precision is measured over the first --limit results. The naive scan is
+slow by design, so it only runs the first --naive-queries queries.
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+
+from common import BENCH_DIR, ROOT_DIR, Quiet, result, write_report
+
+WORK_DIR = tempfile.mkdtemp(prefix="stock_search_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "search.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+import database  # noqa: E402
+import search_index  # noqa: E402
+
+
+def typo(word, rng):
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(["drop", "double", "swap", "replace"])
+    if kind == "drop":
+        return word[:i] + word[i + 1:]
+    if kind == "double":
+        return word[:i] + word[i] + word[i:]
+    if kind == "swap":
+        return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+    return word[:i] + rng.choice("aeiourst") + word[i + 1:]
+
+
+def make_queries(products, n, seed=3):
+    """(query, relevance predicate) pairs built from random products."""
+    rng = random.Random(seed)
+    queries = []
+    for p in rng.sample(products, n):
+        detail = rng.choice(p['description'].split()) if rng.random() < 0.5 else None
+        words = [p['name'], p['brand'].lower()] + ([detail] if detail else [])
+        query = " ".join(typo(w, rng) for w in words)
+
+        def relevant(q, name=p['name'], brand=p['brand'], detail=detail):
+            return (q['name'] == name and q['brand'] == brand
+                    and (detail is None or detail in q['description'].split()))
+        queries.append((query, relevant))
+    return queries
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def naive_search(products, query, limit):
+    """Every query word within 1-2 edits of some word of the product; fewest edits first."""
+    q_words = search_index.normalize(query).split()
+    scored = []
+    for p in products:
+        words = search_index._product_text(p['code'], p['name'], p['brand'], p['description']).split()
+        total = 0
+        for qw in q_words:
+            best = min(levenshtein(qw, w) for w in words)
+            if best > (1 if len(qw) <= 5 else 2):
+                break
+            total += best
+        else:
+            scored.append((total, p['code']))
+    scored.sort()
+    return [code for _, code in scored[:limit]]
+
+
+def substring_search(products, query, limit):
+    """What the app did before: the raw query as a substring of name/brand/code/description."""
+    q = query.lower()
+    return [p['code'] for p in products
+            if q in p['name'].lower() or q in p['brand'].lower()
+            or q in p['code'].lower() or q in p['description'].lower()][:limit]
+
+
+def run_queries(name, search, queries, by_code, limit):
+    times, precisions, found = [], [], 0
+    for query, relevant in queries:
+        start = time.perf_counter()
+        codes = search(query)[:limit]
+        times.append(time.perf_counter() - start)
+        hits = sum(1 for code in codes if relevant(by_code[code]))
+        precisions.append(hits / float(len(codes)) if codes else 0.0)
+        found += bool(hits)
+    ms = sorted(t * 1000 for t in times)
+    entry = result(name, len(by_code), len(queries), [sum(times)],
+                   p50_ms=statistics.median(ms), p95_ms=ms[int(len(ms) * 0.95) - 1] if len(ms) > 1 else ms[0],
+                   max_ms=ms[-1], precision_at_limit=statistics.mean(precisions),
+                   queries_with_a_hit=found / float(len(queries)))
+    print(f"      p50 {entry['p50_ms']:.1f} ms, max {entry['max_ms']:.1f} ms, "
+          f"precision@{limit} {entry['precision_at_limit']:.0%}, queries with a hit {entry['queries_with_a_hit']:.0%}")
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trigram search benchmark")
+    parser.add_argument("--skus", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--naive-queries", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=20, help="Results looked at per query")
+    parser.add_argument("--updates", type=int, default=200, help="Products edited before the incremental refresh")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/search_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    try:
+        db_path = os.environ["STOCK_DB_PATH"]
+        with Quiet():
+            database.init_db()
+        products = synthetic.make_catalog(args.skus)
+        synthetic.load_catalog(db_path, products)
+        by_code = {p['code']: p for p in products}
+        queries = make_queries(products, args.queries)
+        print(f"\n== {args.skus} SKUs, {args.queries} misspelt queries, e.g. {queries[0][0]!r} ==")
+
+        start = time.perf_counter()
+        index = search_index.get_index()
+        elapsed = time.perf_counter() - start
+        # Size: a second, traced build (tracemalloc slows the build down)
+        tracemalloc.start()
+        probe = search_index.TrigramIndex()
+        conn = sqlite3.connect(db_path)
+        probe.rebuild(conn.cursor())
+        conn.close()
+        size_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+        del probe
+        results = [result("index_build", args.skus, args.skus, [elapsed], index_mb=size_mb,
+                          trigrams=len(index.postings))]
+        print(f"      {len(index.postings)} trigrams, {size_mb:.0f} MB")
+
+        # Incremental refresh: edit some names, next search picks them up
+        conn = sqlite3.connect(db_path)
+        edited = random.Random(4).sample(products, args.updates)
+        conn.executemany("UPDATE products SET name = name || ' Pro' WHERE code = ?",
+                         [(p['code'],) for p in edited])
+        conn.commit()
+        conn.close()
+        start = time.perf_counter()
+        search_index.get_index()
+        elapsed = time.perf_counter() - start
+        results.append(result("index_refresh", args.updates, args.updates, [elapsed]))
+        start = time.perf_counter()
+        search_index.get_index()
+        results.append(result("index_refresh_unchanged", 1, 1, [time.perf_counter() - start]))
+
+        limit = args.limit
+        results.append(run_queries("trigram_search", lambda q: search_index.search(q, limit),
+                                   queries, by_code, limit))
+        results.append(run_queries("substring_scan", lambda q: substring_search(products, q, limit),
+                                   queries, by_code, limit))
+        results.append(run_queries("levenshtein_scan", lambda q: naive_search(products, q, limit),
+                                   queries[:args.naive_queries], by_code, limit))
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    write_report("search", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Round-trip benchmark for data_export.py: export + import of a large catalog
+and its sales history in every format, with the peak memory of each step.
+
+    python benchmarks/bench_transfer.py
+    python benchmarks/bench_transfer.py --skus 100000 --sales 200000 --formats parquet csv
+
+Each export/import runs in its own process so peak RSS belongs to that step
+alone. Uses scratch DBs, never products.db.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from common import BENCH_DIR, ROOT_DIR, result, write_report
+
+WORK_DIR = tempfile.mkdtemp(prefix="stock_transfer_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "source.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+import database  # noqa: E402
+
+# Child: run one data_export command and report its own peak RSS.
+# VmHWM rather than ru_maxrss: on Linux ru_maxrss survives exec, so the child
+# would inherit the parent's peak (the in-memory synthetic catalog).
+CHILD = """
+import sys, resource
+sys.path.insert(0, {root!r})
+sys.argv = ['data_export.py'] + {argv!r}
+import data_export
+data_export.main()
+try:
+    with open('/proc/self/status') as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print('MAXRSS_KB', peak_kb)
+"""
+
+
+def run_step(argv, db_path):
+    env = dict(os.environ, STOCK_DB_PATH=db_path)
+    code = CHILD.format(root=ROOT_DIR, argv=argv)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{argv} failed:\n{proc.stderr[-2000:]}")
+    rss_kb = int(proc.stdout.strip().splitlines()[-1].split()[1])
+    return elapsed, rss_kb / 1024.0
+
+
+def dir_size(path):
+    return sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export/import round-trip benchmark")
+    parser.add_argument("--skus", type=int, default=100000)
+    parser.add_argument("--sales", type=int, default=200000)
+    parser.add_argument("--formats", nargs="+", default=["parquet", "arrow", "csv"])
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/transfer_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    try:
+        source = os.environ["STOCK_DB_PATH"]
+        database.init_db()
+        products = synthetic.make_catalog(args.skus)
+        synthetic.load_catalog(source, products)
+        synthetic.load_sales(source, synthetic.make_carts(products, args.sales))
+        rows = args.skus + args.sales
+        print(f"\n== {args.skus} SKUs + {args.sales} sales "
+              f"(products.db {os.path.getsize(source) / 1e6:.1f} MB) ==")
+
+        results = []
+        for fmt in args.formats:
+            out_dir = os.path.join(WORK_DIR, fmt)
+            target = os.path.join(WORK_DIR, f"target_{fmt}.db")
+            t_exp, rss_exp = run_step(["export", out_dir, "--format", fmt], source)
+            t_imp, rss_imp = run_step(["import", out_dir, "--replace"], target)
+            size_mb = dir_size(out_dir) / 1e6
+            results.append(result(f"export_{fmt}", args.skus, rows, [t_exp], peak_rss_mb=rss_exp, size_mb=size_mb))
+            results.append(result(f"import_{fmt}", args.skus, rows, [t_imp], peak_rss_mb=rss_imp))
+            print(f"      {size_mb:.1f} MB on disk | peak RSS export {rss_exp:.0f} MB, import {rss_imp:.0f} MB")
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    write_report("transfer", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import statistics
+from datetime import datetime
+
+# Shared helpers for the benchmark scripts: timing, result rows and the JSON
+# report format read by compare.py.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+
+class Quiet:
+    """Silence the per-row prints in database/logic while timing."""
+
+    def __enter__(self):
+        self._stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        return self
+
+    def __exit__(self, *exc):
+        sys.stdout.close()
+        sys.stdout = self._stdout
+        return False
+
+
+def measure(func, repeat=1):
+    """Run func `repeat` times; return list of wall times in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with Quiet():
+            func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def result(name, size, ops, times, **extra):
+    best = min(times)
+    entry = {
+        'benchmark': name,
+        'size': size,
+        'ops': ops,
+        'repeat': len(times),
+        'best_s': best,
+        'median_s': statistics.median(times),
+        'per_op_ms': best * 1000.0 / ops if ops else None,
+    }
+    entry.update(extra)
+    print(f"  {name:<28} size={size:<7} ops={ops:<6} best={best * 1000:9.1f} ms"
+          f"  per_op={entry['per_op_ms']:.3f} ms")
+    return entry
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def write_report(prefix, args, results, output=None):
+    """Write results as JSON (default: benchmarks/results/<prefix>_<commit>_<ts>.json)."""
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'args': vars(args),
+        'results': results,
+    }
+    if not output:
+        out_dir = os.path.join(BENCH_DIR, "results")
+        os.makedirs(out_dir, exist_ok=True)
+        output = os.path.join(out_dir, f"{prefix}_{commit or 'nogit'}_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    return output
@@ -0,0 +1,50 @@
+"""
+Compare two benchmark result files (older first):
+
+    python benchmarks/compare.py results/bench_abc123.json results/bench_def456.json
+
+Prints best-time ratios per (benchmark, size); ratios above --threshold are
+flagged as regressions and make the exit code 1.
+"""
+import sys
+import json
+import argparse
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return report, {(r['benchmark'], r['size']): r for r in report['results']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio treated as a regression")
+    args = parser.parse_args()
+
+    base_report, base = load(args.baseline)
+    cand_report, cand = load(args.candidate)
+    print(f"baseline:  {base_report.get('commit')} ({base_report.get('timestamp')})")
+    print(f"candidate: {cand_report.get('commit')} ({cand_report.get('timestamp')})\n")
+
+    regressions = 0
+    for key in sorted(set(base) & set(cand)):
+        old_s = base[key]['best_s']
+        new_s = cand[key]['best_s']
+        ratio = new_s / old_s if old_s else float('inf')
+        flag = ""
+        if ratio > args.threshold:
+            flag = "  <-- REGRESSION"
+            regressions += 1
+        print(f"{key[0]:<28} {key[1]:>7}  {old_s * 1000:9.1f} ms -> {new_s * 1000:9.1f} ms  x{ratio:.2f}{flag}")
+
+    for key in sorted(set(base) ^ set(cand)):
+        print(f"{key[0]:<28} {key[1]:>7}  only in {'baseline' if key in base else 'candidate'}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
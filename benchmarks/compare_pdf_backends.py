@@ -0,0 +1,87 @@
+"""
+Parity and speed of the Phase 1 extraction backends on a real supplier PDF.
+
+    python benchmarks/compare_pdf_backends.py
+    python benchmarks/compare_pdf_backends.py other_list.pdf --max-diff 0.01
+
+Parses the PDF with every backend in pdf_backends.BACKENDS (page cache off)
+and compares each one field by field against the default backend. Exits 1
+when a backend misses products or more than --max-diff of the fields differ.
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+from common import ROOT_DIR, measure, result, write_report
+
+# Point the app at a scratch workspace BEFORE importing any project module
+WORK_DIR = tempfile.mkdtemp(prefix="stock_backends_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "backends.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+os.environ["STOCK_PDF_CACHE_PATH"] = os.path.join(WORK_DIR, "pdf_cache.db")
+sys.path.insert(0, ROOT_DIR)
+
+import logic  # noqa: E402
+import pdf_backends  # noqa: E402
+
+DEFAULT_PDF = os.path.join(ROOT_DIR, "LISTA NSM NOVIEMBRE 2025.pdf")
+FIELDS = ['name', 'brand', 'category', 'description', 'cost_price']
+
+
+def compare(reference, candidate):
+    """(missing codes, extra codes, [(code, field, ref, got)]) keyed by product code."""
+    ref = {p['code']: p for p in reference}
+    got = {p['code']: p for p in candidate}
+    missing = [c for c in ref if c not in got]
+    extra = [c for c in got if c not in ref]
+    diffs = [(c, f, ref[c][f], got[c][f])
+             for c in ref if c in got for f in FIELDS if ref[c][f] != got[c][f]]
+    return missing, extra, diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Phase 1 PDF backends")
+    parser.add_argument("pdf", nargs="?", default=DEFAULT_PDF, help="Supplier PDF")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--max-diff", type=float, default=0.005, help="Max fraction of differing fields")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/backends_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    try:
+        outputs = {}
+        results = []
+        print(f"\n== {os.path.basename(args.pdf)} ==")
+        for backend in [pdf_backends.DEFAULT_BACKEND] + sorted(set(pdf_backends.BACKENDS) - {pdf_backends.DEFAULT_BACKEND}):
+            parsed = []
+            times = measure(lambda: parsed.append(logic.process_data_pdf(args.pdf, use_cache=False, backend=backend)),
+                            args.repeat)
+            outputs[backend] = parsed[-1]
+            results.append(result(f"phase1_{backend}", len(parsed[-1]), len(parsed[-1]), times))
+
+        ok = True
+        reference = outputs[pdf_backends.DEFAULT_BACKEND]
+        for backend, products in outputs.items():
+            if backend == pdf_backends.DEFAULT_BACKEND:
+                continue
+            missing, extra, diffs = compare(reference, products)
+            diff_rate = len(diffs) / float(max(len(reference) * len(FIELDS), 1))
+            print(f"\n{backend} vs {pdf_backends.DEFAULT_BACKEND}: {len(missing)} missing, {len(extra)} extra, "
+                  f"{len(diffs)} differing fields ({diff_rate * 100:.2f}%)")
+            for code, field, ref_value, value in diffs[:20]:
+                print(f"  {code:<12} {field:<12} {ref_value!r} -> {value!r}")
+            results.append({'benchmark': f"parity_{backend}", 'missing': missing, 'extra': extra,
+                            'differing_fields': len(diffs), 'diff_rate': diff_rate})
+            if missing or diff_rate > args.max_diff:
+                ok = False
+
+        write_report("backends", args, results, args.output)
+        print("OK" if ok else "[ERROR] Backends disagree beyond --max-diff")
+        return 0 if ok else 1
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
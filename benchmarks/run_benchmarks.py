@@ -0,0 +1,194 @@
+"""
+Benchmark suite for the main operations on synthetic catalogs.
+
+    python benchmarks/run_benchmarks.py                       # 1k, 10k, 100k SKUs
+    python benchmarks/run_benchmarks.py --sizes 1000 --output results.json
+    python benchmarks/compare.py old.json new.json
+
+Everything runs against a throwaway DB and logs directory, never products.db.
+"""
+import os
+import sys
+import random
+import shutil
+import argparse
+import tempfile
+
+from common import BENCH_DIR, ROOT_DIR, measure, result, write_report
+
+# Point the app at a scratch workspace BEFORE importing any project module
+WORK_DIR = tempfile.mkdtemp(prefix="stock_bench_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "bench.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+os.environ["STOCK_PDF_CACHE_PATH"] = os.path.join(WORK_DIR, "pdf_cache.db")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic  # noqa: E402
+import database  # noqa: E402
+import logic  # noqa: E402
+import pdf_backends  # noqa: E402
+import sales_journal  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+SEARCH_TERMS = ["asiento", "kalf", "000123", "29er", "zzz-no-match"]
+
+
+def fresh_db(size_label):
+    path = os.path.join(WORK_DIR, f"bench_{size_label}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    database.DB_NAME = path
+    database.init_db()
+    return path
+
+
+def search_filter(products, query):
+    """Same predicate as the Stock tab search filter in app.py."""
+    q = query.lower()
+    return [
+        p for p in products
+        if q in p['name'].lower()
+        or q in str(p.get('brand', '')).lower()
+        or q in str(p['code']).lower()
+        or q in str(p.get('description', '')).lower()
+    ]
+
+
+def bench_size(size, args):
+    print(f"\n== {size} SKUs ==")
+    results = []
+    products = synthetic.make_catalog(size)
+
+    db_path = fresh_db(size)
+    synthetic.load_catalog(db_path, products)
+
+    # get_all_products
+    times = measure(database.get_all_products, args.repeat)
+    results.append(result("get_all_products", size, 1, times))
+
+    # search filtering over the full list, as the UI does on every rerun
+    all_products = database.get_all_products()
+    times = measure(lambda: [search_filter(all_products, t) for t in SEARCH_TERMS], args.repeat)
+    results.append(result("search_filter", size, len(SEARCH_TERMS), times))
+
+    # facet counts + narrowing to one brand, as the Stock tab does per rerun
+    brand = products[0]['brand']
+
+    def facet_narrow():
+        database.get_facet_counts('brand')
+        database.get_facet_counts('category', brand=brand)
+        return database.get_products(brand=brand)
+    times = measure(facet_narrow, args.repeat)
+    results.append(result("facet_narrow_brand", size, 1, times))
+
+    # price history: 12 monthly imports repricing ~10% of the catalog each
+    rng = random.Random(3)
+    current = {p['code']: p['cost_price'] for p in products}
+    for month in range(1, 13):
+        repriced = [{'code': c, 'cost_price': round(v * rng.uniform(1.01, 1.3), 2) if rng.random() < 0.1 else v}
+                    for c, v in current.items()]
+        effective_date = f"2025-{month:02d}-01 09:00:00"
+        times = measure(lambda: database.record_price_changes(repriced, effective_date))
+        current = {p['code']: p['cost_price'] for p in repriced}
+        conn = database.get_connection()
+        conn.executemany('UPDATE products SET cost_price = ? WHERE code = ?',
+                         [(v, c) for c, v in current.items()])
+        conn.commit()
+        conn.close()
+    results.append(result("price_history_record", size, size, times))
+    times = measure(lambda: database.get_price_changes(limit=50), args.repeat)
+    results.append(result("price_changes_latest", size, 1, times))
+    sample_codes = [p['code'] for p in products[::max(1, size // 100)]]
+    times = measure(lambda: [database.get_price_as_of(c, "2025-06-15") for c in sample_codes], args.repeat)
+    results.append(result("price_as_of", size, len(sample_codes), times))
+
+    # add_product bulk load (one call per row, as ETL Phase 3 does)
+    n_add = min(size, args.add_limit)
+    fresh_db(f"{size}_add")
+
+    def add_all():
+        for p in products[:n_add]:
+            database.add_product(p['code'], p['name'], p['category'], p['brand'],
+                                 p['cost_price'], p['image_path'], description=p['description'])
+    times = measure(add_all)
+    results.append(result("add_product_bulk_insert", size, n_add, times))
+    times = measure(add_all)
+    results.append(result("add_product_bulk_update", size, n_add, times))
+    database.DB_NAME = db_path
+
+    # process_sale_transaction
+    carts = synthetic.make_carts(products, args.sales)
+    synthetic.write_sales_csv(os.path.join(WORK_DIR, f"sales_{size}.csv"), carts)
+
+    def sell_all():
+        for cart in carts:
+            logic.process_sale_transaction(cart)
+        sales_journal.get_journal().flush()
+    times = measure(sell_all)
+    results.append(result("process_sale_transaction", size, len(carts), times))
+
+    # order redemption (same steps as "Confirm & Add Stock")
+    import pandas as pd
+    order_path = os.path.join(WORK_DIR, f"order_{size}.csv")
+    order_id = f"ORD-BENCH{size}"
+    synthetic.write_order_csv(order_path, products, args.order_lines, order_id)
+
+    def redeem():
+        import_df = pd.read_csv(order_path)
+        oid = import_df['order_id'].iloc[0]
+        if database.is_order_used(oid):
+            raise RuntimeError("order already used")
+        database.mark_order_used(oid, int(import_df['quantity'].sum()))
+        for _, row in import_df.iterrows():
+            database.update_product(row['code'], stock_delta=int(row['quantity']))
+    times = measure(redeem)
+    results.append(result("order_redemption", size, args.order_lines, times))
+
+    return results
+
+
+def bench_pdf(args):
+    print(f"\n== process_data_pdf ({args.pdf_pages} pages) ==")
+    rows_per_page = 40
+    products = synthetic.make_catalog(args.pdf_pages * rows_per_page, seed=99)
+    pdf_path = os.path.join(WORK_DIR, "catalog.pdf")
+    synthetic.write_catalog_pdf(pdf_path, products, rows_per_page)
+
+    results = []
+    for backend in sorted(pdf_backends.BACKENDS):
+        # Cache off: this measures parsing, not the page cache
+        parsed = []
+        times = measure(lambda: parsed.append(len(logic.process_data_pdf(pdf_path, use_cache=False, backend=backend))))
+        name = "process_data_pdf" if backend == pdf_backends.DEFAULT_BACKEND else f"process_data_pdf_{backend}"
+        results.append(result(name, len(products), args.pdf_pages, times,
+                              unit="page", rows_parsed=parsed[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run synthetic-catalog benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Catalog sizes (SKUs)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions for read benchmarks")
+    parser.add_argument("--add-limit", type=int, default=2000, help="Max rows for the add_product load")
+    parser.add_argument("--sales", type=int, default=200, help="Sales per catalog size")
+    parser.add_argument("--order-lines", type=int, default=100, help="Lines in the redeemed order")
+    parser.add_argument("--pdf-pages", type=int, default=20, help="Pages in the generated PDF (0 to skip)")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/bench_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    results = []
+    try:
+        for size in args.sizes:
+            results.extend(bench_size(size, args))
+        if args.pdf_pages > 0:
+            results.extend(bench_pdf(args))
+    finally:
+        sales_journal.get_journal().close()
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    write_report("bench", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
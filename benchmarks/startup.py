@@ -0,0 +1,116 @@
+"""
+Startup benchmark: import cost of the app modules and first-connection schema work.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --modules database logic --repeat 5 --top 15
+
+Each import is measured in a fresh interpreter with `python -X importtime`;
+the heaviest imports from the report are listed so regressions are easy to
+trace. Uses a scratch DB, never products.db.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from common import ROOT_DIR, result, write_report
+
+DEFAULT_MODULES = ["config", "database", "logic", "reports", "sales_journal", "etl_runner"]
+
+
+def parse_importtime(stderr):
+    """Return list of (self_us, cumulative_us, name, depth) from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        raw_name = parts[2].rstrip()
+        name = raw_name.lstrip()
+        depth = (len(raw_name) - len(name) - 1) // 2
+        rows.append((int(parts[0]), int(parts[1]), name, depth))
+    return rows
+
+
+def import_time(module, env):
+    """Import `module` in a fresh interpreter. Returns (wall_s, importtime rows)."""
+    code = f"import sys; sys.path.insert(0, {ROOT_DIR!r}); import {module}"
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return wall, parse_importtime(proc.stderr)
+
+
+def schema_times(work_dir, env, repeat):
+    """First get_connection() on a new DB (full init) vs an up-to-date one (version check)."""
+    code = (
+        "import sys, time; sys.path.insert(0, %r); import database; "
+        "t = time.perf_counter(); database.get_connection().close(); "
+        "print(time.perf_counter() - t)" % ROOT_DIR
+    )
+    db_path = env["STOCK_DB_PATH"]
+    new_db, existing_db = [], []
+    for _ in range(repeat):
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        new_db.append(float(out.strip().splitlines()[-1]))
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        existing_db.append(float(out.strip().splitlines()[-1]))
+    return new_db, existing_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and schema startup cost")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest imports to list per module")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/startup_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="stock_startup_")
+    env = dict(os.environ)
+    env["STOCK_DB_PATH"] = os.path.join(work_dir, "startup.db")
+    env["STOCK_LOG_DIR"] = os.path.join(work_dir, "logs")
+
+    results = []
+    try:
+        print("\n== import time (fresh interpreter, -X importtime) ==")
+        for module in args.modules:
+            walls, cumulative = [], []
+            rows = []
+            for _ in range(args.repeat):
+                wall, rows = import_time(module, env)
+                walls.append(wall)
+                top_level = [r for r in rows if r[2] == module]
+                cumulative.append(top_level[-1][1] / 1e6 if top_level else 0.0)
+            heaviest = sorted(rows, key=lambda r: r[0], reverse=True)[:args.top]
+            results.append(result(f"import_{module}", 0, 1, cumulative,
+                                  process_wall_s=min(walls),
+                                  heaviest_self_us=[{'module': r[2], 'self_us': r[0], 'cumulative_us': r[1]}
+                                                    for r in heaviest]))
+            for r in heaviest[:5]:
+                print(f"      {r[0] / 1000:8.1f} ms self  {r[1] / 1000:8.1f} ms cum  {r[2]}")
+
+        print("\n== first connection schema work ==")
+        new_db, existing_db = schema_times(work_dir, env, args.repeat)
+        results.append(result("schema_new_db", 0, 1, new_db))
+        results.append(result("schema_existing_db", 0, 1, existing_db))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    write_report("startup", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Stress test for POS stock reservations: several tills (processes) competing
+for a small, scarce catalog through reservations.reserve / commit_sale.
+
+    python benchmarks/stress_reservations.py
+    python benchmarks/stress_reservations.py --tills 8 --products 10 --stock 3 --duration 10
+
+Checks at the end that no stock went negative and that the stock taken
+matches the units recorded in sales_log. Exits 1 on any inconsistency.
+Runs against a scratch DB, never products.db.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+from common import ROOT_DIR, result, write_report
+
+# Point the app at a scratch workspace BEFORE importing any project module
+WORK_DIR = tempfile.mkdtemp(prefix="stock_stress_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "stress.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+sys.path.insert(0, ROOT_DIR)
+
+import database  # noqa: E402
+import logic  # noqa: E402
+import reservations  # noqa: E402
+import sales_journal  # noqa: E402
+
+
+def load_products(n_products, stock):
+    conn = database.get_connection()
+    conn.executemany(
+        'INSERT INTO products (code, name, brand, cost_price, stock_quantity) VALUES (?, ?, ?, ?, ?)',
+        [(f"S{i:04d}", f"Producto {i}", "STRESS", 100.0, stock) for i in range(n_products)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def till(till_no, args, stats_queue):
+    """One POS session: add random items, then check out or abandon the cart."""
+    rng = random.Random(args.seed + till_no)
+    till_id = f"till-{till_no}"
+    codes = [f"S{i:04d}" for i in range(args.products)]
+    stats = {'reserve_ok': 0, 'reserve_refused': 0, 'sales': 0, 'units_sold': 0,
+             'checkout_refused': 0, 'abandoned': 0, 'latencies_ms': []}
+    deadline = time.time() + args.duration
+    while time.time() < deadline:
+        cart = {}
+        for _ in range(rng.randint(1, 3)):
+            code = rng.choice(codes)
+            wanted = cart.get(code, 0) + rng.randint(1, 2)
+            start = time.perf_counter()
+            ok, _ = reservations.reserve(till_id, code, wanted, ttl=args.ttl)
+            stats['latencies_ms'].append((time.perf_counter() - start) * 1000.0)
+            if ok:
+                cart[code] = wanted
+                stats['reserve_ok'] += 1
+            else:
+                stats['reserve_refused'] += 1
+        if not cart:
+            continue
+        if rng.random() < args.abandon:
+            # Walk away without releasing: the holds must expire on their own
+            stats['abandoned'] += 1
+            till_id = f"till-{till_no}-{stats['abandoned']}"
+            continue
+        items = [{'code': c, 'name': c, 'brand': 'STRESS', 'sale_price': 150.0, 'quantity': q}
+                 for c, q in cart.items()]
+        try:
+            logic.process_sale_transaction(items, till_id=till_id)
+        except ValueError:
+            stats['checkout_refused'] += 1
+            reservations.release(till_id)
+            continue
+        stats['sales'] += 1
+        stats['units_sold'] += sum(cart.values())
+    sales_journal.get_journal().flush()
+    stats_queue.put(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent tills against the reservation system")
+    parser.add_argument("--tills", type=int, default=6, help="Concurrent POS sessions (processes)")
+    parser.add_argument("--products", type=int, default=20, help="Products in the catalog")
+    parser.add_argument("--stock", type=int, default=5, help="Initial stock per product")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds each till runs")
+    parser.add_argument("--abandon", type=float, default=0.2, help="Fraction of carts abandoned")
+    parser.add_argument("--ttl", type=float, default=0.5, help="Reservation lifetime in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/stress_<commit>_<ts>.json)")
+    args = parser.parse_args()
+
+    try:
+        load_products(args.products, args.stock)
+        stats_queue = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=till, args=(n, args, stats_queue)) for n in range(args.tills)]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        all_stats = [stats_queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        removed = reservations.sweep_expired(force=True)
+        conn = database.get_connection()
+        negative = conn.execute('SELECT COUNT(*) FROM products WHERE stock_quantity < 0').fetchone()[0]
+        remaining = conn.execute('SELECT SUM(stock_quantity) FROM products').fetchone()[0]
+        logged_units = sum(item['quantity']
+                           for (items_json,) in conn.execute('SELECT items_json FROM sales_log')
+                           for item in json.loads(items_json))
+        conn.close()
+
+        totals = {key: sum(s[key] for s in all_stats) for key in all_stats[0] if key != 'latencies_ms'}
+        latencies = sorted(ms for s in all_stats for ms in s['latencies_ms'])
+        taken = args.products * args.stock - remaining
+        print(f"\n{args.tills} tills x {args.duration}s: {totals}")
+        print(f"Stock taken: {taken} | units in sales_log: {logged_units} | "
+              f"negative rows: {negative} | expired holds swept: {removed}")
+
+        results = [result("reserve", args.products, len(latencies), [sum(latencies) / 1000.0],
+                          p50_ms=latencies[len(latencies) // 2],
+                          p99_ms=latencies[int(len(latencies) * 0.99)]),
+                   result("stress_run", args.products, totals['sales'], [elapsed], **totals,
+                          stock_taken=taken, logged_units=logged_units, negative_rows=negative)]
+        write_report("stress", args, results, args.output)
+
+        ok = negative == 0 and taken == logged_units == totals['units_sold']
+        print("OK" if ok else "[ERROR] Stock and sales are inconsistent")
+        return 0 if ok else 1
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
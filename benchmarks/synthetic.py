@@ -0,0 +1,155 @@
+import csv
+import json
+import random
+import sqlite3
+
+# ==============================================================================
+# SYNTHETIC DATA
+# ==============================================================================
+# Deterministic (seeded) catalogs, sales and order files shaped like the real
+# ones: products rows as in database.init_db, POS cart items as built in
+# app.py, order CSVs as written by "Generate Order File", and a supplier PDF
+# with the 4-column layout process_data_pdf expects.
+
+NAMES = ["Asiento", "Cubierta", "Camara", "Pedal", "Cadena", "Freno", "Manubrio",
+         "Puño", "Rayo", "Llanta", "Piñon", "Funda", "Par", "Inflador", "Luz"]
+TYPES = ["MTB", "RUTA", "NENA", "BMX", "FREESTYLE", "URBANA", "PLAYERA"]
+BRANDS = ["KALF", "SHIMANO", "VENZO", "TOPMEGA", "KENDA", "SUNRACE", "GW", "OWEN"]
+DETAILS = ["14/16", "26x1.95", "29er", "negro", "rojo", "c/valvula", "acero",
+           "aluminio", "9v", "21v", "700x25", "c/luz", "reforzado"]
+
+
+def make_catalog(n, seed=42):
+    """List of n product dicts with the products table columns."""
+    rng = random.Random(seed)
+    products = []
+    for i in range(n):
+        name = rng.choice(NAMES)
+        products.append({
+            'code': f"{rng.choice('ABCDEFGHKMNPRSTW')} {i:06d}",
+            'name': name,
+            'category': rng.choice(TYPES),
+            'brand': rng.choice(BRANDS),
+            'description': " ".join(rng.sample(DETAILS, 2)),
+            'image_path': f"static/{i:06d}.jpg" if rng.random() < 0.7 else None,
+            'cost_price': round(rng.uniform(50, 50000), 2),
+            'stock_quantity': rng.choice([0, 0, 1, 2, 5, 10, 25, 100]),
+        })
+    return products
+
+
+def load_catalog(db_path, products):
+    """Bulk insert a catalog (one transaction) - setup, not the thing measured."""
+    conn = sqlite3.connect(db_path)
+    conn.executemany('''
+        INSERT INTO products (code, name, category, brand, description, image_path, cost_price, stock_quantity)
+        VALUES (:code, :name, :category, :brand, :description, :image_path, :cost_price, :stock_quantity)
+    ''', products)
+    conn.commit()
+    conn.close()
+
+
+def make_carts(products, n_sales, max_lines=4, seed=7):
+    """n_sales POS carts (lists of cart item dicts) over in-stock products."""
+    rng = random.Random(seed)
+    in_stock = [p for p in products if p['stock_quantity'] > 0] or products
+    carts = []
+    for _ in range(n_sales):
+        cart = []
+        for p in rng.sample(in_stock, min(len(in_stock), rng.randint(1, max_lines))):
+            cart.append({
+                'code': p['code'],
+                'name': p['name'],
+                'brand': p['brand'],
+                'sale_price': round(p['cost_price'] * 1.51, 2),
+                'quantity': 1,
+            })
+        carts.append(cart)
+    return carts
+
+
+def load_sales(db_path, carts, days=365, seed=11):
+    """
+    Bulk insert carts as sales_log rows spread over the last `days` days,
+    items_json as process_sale_transaction logs it - setup, not measured.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for cart in carts:
+        items = [dict(item, cost_price=round(item['sale_price'] / 1.51, 2)) for item in cart]
+        total = sum(item['quantity'] * item['sale_price'] for item in cart)
+        rows.append((rng.randint(0, days * 86400), total, json.dumps(items)))
+    # Oldest first, as the tills write them: ids follow the timestamps
+    rows.sort(key=lambda row: -row[0])
+    rows = [(f"-{offset} seconds", total, items) for offset, total, items in rows]
+    conn = sqlite3.connect(db_path)
+    conn.executemany('''
+        INSERT INTO sales_log (sale_timestamp, total_amount, items_json)
+        VALUES (datetime('now', ?), ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+def write_sales_csv(path, carts):
+    """Flat CSV of sale lines (sale_number, code, name, brand, quantity, sale_price)."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(['sale_number', 'code', 'name', 'brand', 'quantity', 'sale_price'])
+        for n, cart in enumerate(carts, 1):
+            for item in cart:
+                writer.writerow([n, item['code'], item['name'], item['brand'], item['quantity'], item['sale_price']])
+
+
+def write_order_csv(path, products, n_lines, order_id, seed=11):
+    """Order CSV in the layout written by the Restocking tab."""
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(['code', 'name', 'quantity', 'cost_price', 'total', 'order_id'])
+        for p in rng.sample(products, min(n_lines, len(products))):
+            qty = rng.randint(1, 20)
+            writer.writerow([p['code'], p['name'], qty, p['cost_price'], qty * p['cost_price'], order_id])
+
+
+def format_ar_price(value):
+    """1234.5 -> '$ 1.234,50' (supplier list format)."""
+    s = f"{value:,.2f}"
+    return "$ " + s.replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def write_catalog_pdf(path, products, rows_per_page=40):
+    """
+    Supplier-style PDF: ruled 4-column table (Código | Contenido | Xbulto | Precio),
+    brand set in bold uppercase inside the content cell.
+    """
+    import pymupdf
+
+    doc = pymupdf.open()
+    col_x = [30, 110, 460, 500, 570]
+    row_h = 18
+    top = 40
+    for start in range(0, len(products), rows_per_page):
+        page = doc.new_page(width=600, height=top + row_h * (rows_per_page + 2))
+        rows = [None] + products[start:start + rows_per_page]
+        for r, p in enumerate(rows):
+            y0 = top + r * row_h
+            for c in range(4):
+                page.draw_rect(pymupdf.Rect(col_x[c], y0, col_x[c + 1], y0 + row_h), color=(0, 0, 0), width=0.5)
+            baseline = y0 + 12
+            if p is None:
+                for c, label in enumerate(["Código", "Contenido", "Xbulto", "Precio"]):
+                    page.insert_text((col_x[c] + 2, baseline), label, fontname="hebo", fontsize=8)
+                continue
+            page.insert_text((col_x[0] + 2, baseline), p['code'], fontname="helv", fontsize=8)
+            x = col_x[1] + 2
+            head = f"{p['name']} {p['category']}"
+            page.insert_text((x, baseline), head, fontname="helv", fontsize=8)
+            x += pymupdf.get_text_length(head, fontname="helv", fontsize=8) + 4
+            page.insert_text((x, baseline), p['brand'], fontname="hebo", fontsize=8)
+            x += pymupdf.get_text_length(p['brand'], fontname="hebo", fontsize=8) + 4
+            page.insert_text((x, baseline), p['description'], fontname="helv", fontsize=8)
+            page.insert_text((col_x[2] + 2, baseline), "1", fontname="helv", fontsize=8)
+            page.insert_text((col_x[3] + 2, baseline), format_ar_price(p['cost_price']), fontname="helv", fontsize=8)
+    doc.save(path)
+    doc.close()
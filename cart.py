@@ -0,0 +1,93 @@
+# ==============================================================================
+# CARTS (POS CART / SUPPLY ORDER)
+# ==============================================================================
+# The POS cart and the supply order being built in Restocking live in
+# st.session_state. Both are lists of lines keyed by product code: a Cart keeps
+# them in a dict (insertion order = the order products were added), so adding,
+# looking up or removing a code is O(1), and keeps the item count and the
+# amount up to date as lines change instead of re-summing on every rerun.
+#
+# Iterating a Cart yields the line dicts, so it can be passed as is wherever a
+# list of lines was (logic.process_sale_transaction, supply_orders.create_order).
+# Change quantities through the Cart, not by editing the dicts, or the totals
+# go stale.
+
+
+class Cart:
+    """Ordered code -> line dict, with running totals on price_key x quantity."""
+
+    def __init__(self, price_key, lines=()):
+        self.price_key = price_key
+        self._lines = {}
+        self.total_items = 0
+        self.total_amount = 0.0
+        for line in lines:
+            self.add(line)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def __contains__(self, code):
+        return code in self._lines
+
+    def get(self, code):
+        return self._lines.get(code)
+
+    def quantity(self, code):
+        """Units of `code` in the cart (0 if absent)."""
+        line = self._lines.get(code)
+        return line['quantity'] if line else 0
+
+    def lines(self):
+        """The lines as a list, in the order they were added."""
+        return list(self._lines.values())
+
+    def _account(self, line, delta):
+        self.total_items += delta
+        self.total_amount += delta * (line.get(self.price_key) or 0.0)
+
+    def add(self, line, quantity=None):
+        """
+        Add `quantity` (default: line['quantity']) units of line['code'];
+        summed into the existing line if the code is already in the cart.
+        Returns the cart's line.
+        """
+        quantity = int(line['quantity'] if quantity is None else quantity)
+        existing = self._lines.get(line['code'])
+        if existing is None:
+            existing = dict(line, quantity=0)
+            self._lines[line['code']] = existing
+        existing['quantity'] += quantity
+        self._account(existing, quantity)
+        return existing
+
+    def set_quantity(self, code, quantity):
+        """Set a line's quantity; 0 or less removes it. Returns the line (None if removed)."""
+        if quantity <= 0:
+            self.remove(code)
+            return None
+        line = self._lines[code]
+        self._account(line, int(quantity) - line['quantity'])
+        line['quantity'] = int(quantity)
+        return line
+
+    def remove(self, code):
+        """Drop a line; returns it (None if the code was not in the cart)."""
+        line = self._lines.pop(code, None)
+        if line is not None:
+            self._account(line, -line['quantity'])
+            if not self._lines:
+                # No float residue once the cart is empty
+                self.total_amount = 0.0
+        return line
+
+    def clear(self):
+        self._lines.clear()
+        self.total_items = 0
+        self.total_amount = 0.0
@@ -1,10 +1,11 @@
 import os
+import re
 
 # Base directory of the project (where this file resides)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Database Path
-DB_PATH = os.path.join(BASE_DIR, "products.db")
+# Database Path (STOCK_DB_PATH overrides it, e.g. for benchmarks)
+DB_PATH = os.environ.get("STOCK_DB_PATH", os.path.join(BASE_DIR, "products.db"))
 
 # Static Assets Directory
 # Streamlit serves this at /app/static/filename if enabled, 
@@ -12,8 +13,42 @@ DB_PATH = os.path.join(BASE_DIR, "products.db")
 STATIC_DIR_NAME = "static"
 STATIC_DIR = os.path.join(BASE_DIR, STATIC_DIR_NAME)
 
-# Logs Directory
-LOG_DIR = os.path.join(BASE_DIR, "logs")
+# Product image file names: static/<code>.jpg, with the characters Windows
+# does not allow in a file name (: * ? " < > | \ /) replaced by '-'. The ETL,
+# the crawler (scrap.py), image_reconcile.py and the UI all use
+# image_filename(), so the same code always maps to the same file
+UNSAFE_FILENAME_CHARS = re.compile(r'[:*?"<>|/\\]')
+
+
+def image_filename(code):
+    """static/ file name for a product code ('A/B' -> 'A-B.jpg')."""
+    return f"{UNSAFE_FILENAME_CHARS.sub('-', str(code))}.jpg"
+
+
+# Logs Directory (STOCK_LOG_DIR overrides it)
+LOG_DIR = os.environ.get("STOCK_LOG_DIR", os.path.join(BASE_DIR, "logs"))
+
+# Phase 1 page cache (STOCK_PDF_CACHE_PATH overrides it). Disposable: deleting
+# the file only means the next import re-parses the PDF
+PDF_CACHE_PATH = os.environ.get("STOCK_PDF_CACHE_PATH", os.path.join(BASE_DIR, "cache", "pdf_pages.db"))
+
+# Phase 1 low-memory mode for large supplier PDFs (STOCK_PDF_LOW_MEMORY=1, or
+# etl_runner.py --low-memory): parser caches are flushed after every page
+PDF_LOW_MEMORY = os.environ.get("STOCK_PDF_LOW_MEMORY", "") not in ("", "0")
+
+# Phase 2 time budget in seconds (STOCK_SCRAPE_BUDGET, or etl_runner.py
+# --scrape-budget); images left over are fetched, by priority, on the next run
+SCRAPE_BUDGET = float(os.environ["STOCK_SCRAPE_BUDGET"]) if os.environ.get("STOCK_SCRAPE_BUDGET") else None
+
+# Online backups (backup.py): snapshot folder, how many to keep, and how old
+# the newest one may get before the app takes another (0 = never)
+BACKUP_DIR = os.environ.get("STOCK_BACKUP_DIR", os.path.join(os.path.dirname(DB_PATH), "backups"))
+BACKUP_KEEP = int(os.environ.get("STOCK_BACKUP_KEEP", "7"))
+BACKUP_INTERVAL_HOURS = float(os.environ.get("STOCK_BACKUP_INTERVAL_HOURS", "24"))
+
+# Sales older than this many days are moved to the monthly archive, and old
+# per-sale / per-order files in logs/ are packed (sales_archive.py)
+SALES_RETENTION_DAYS = int(os.environ.get("STOCK_SALES_RETENTION_DAYS", "365"))
 
 # Ensure directories exist
 for d in [STATIC_DIR, LOG_DIR]:
@@ -0,0 +1,374 @@
+import os
+import sys
+import csv
+import json
+import argparse
+from datetime import datetime
+
+import database
+import reports
+from database import get_connection
+from instrumentation import timed
+
+# ==============================================================================
+# CATALOG / SALES EXPORT AND IMPORT
+# ==============================================================================
+# Moves the catalog and the sales history between databases without copying
+# products.db: backups, a second shop PC, seeding a test environment.
+# One file per table plus manifest.json, in Parquet (default), Arrow IPC or
+# CSV. Rows are streamed from SQLite in CHUNK_ROWS batches and loaded back
+# with executemany inside one transaction, so memory stays bounded by the
+# chunk size whatever the catalog size. Archived sales (sales_archive.py) are
+# exported as part of sales_log. Report aggregates are not exported; they are
+# rebuilt after an import.
+#
+#     python data_export.py export backup/ [--format parquet|arrow|csv]
+#     python data_export.py import backup/ [--replace]
+
+CHUNK_ROWS = 50000
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+
+# table -> (columns with their types, conflict handling on import)
+# Types: "int", "float", "text". Later tables go at the end.
+TABLES = {
+    "products": {
+        "columns": [("id", "int"), ("code", "text"), ("name", "text"), ("category", "text"),
+                    ("brand", "text"), ("description", "text"), ("image_path", "text"),
+                    ("cost_price", "float"), ("stock_quantity", "int"), ("has_image", "int")],
+        # Same SKU: the imported row wins, the local id is kept
+        "on_conflict": "ON CONFLICT(code) DO UPDATE SET name = excluded.name, "
+                       "category = excluded.category, brand = excluded.brand, "
+                       "description = excluded.description, image_path = excluded.image_path, "
+                       "cost_price = excluded.cost_price, stock_quantity = excluded.stock_quantity, "
+                       "has_image = excluded.has_image",
+        "skip_id_on_merge": True,
+    },
+    "sales_log": {
+        "columns": [("id", "int"), ("sale_timestamp", "text"), ("total_amount", "float"),
+                    ("items_json", "text")],
+        # Merged by content, see _merge_sales (sale ids are per-PC sale numbers)
+        "on_conflict": "",
+        "skip_id_on_merge": False,
+    },
+    "used_orders": {
+        "columns": [("id", "int"), ("order_id", "text"), ("redeemed_at", "text"),
+                    ("total_items", "int")],
+        "on_conflict": "ON CONFLICT(order_id) DO NOTHING",
+        "skip_id_on_merge": True,
+    },
+    "price_history": {
+        "columns": [("id", "int"), ("code", "text"), ("effective_date", "text"),
+                    ("cost_price", "float"), ("previous_price", "float")],
+        "on_conflict": "ON CONFLICT(code, effective_date) DO NOTHING",
+        "skip_id_on_merge": True,
+    },
+    "supply_orders": {
+        "columns": [("id", "int"), ("order_id", "text"), ("status", "text"), ("created_at", "text"),
+                    ("received_at", "text"), ("total_items", "int"), ("total_cost", "float"),
+                    ("csv_file", "text")],
+        "on_conflict": "ON CONFLICT(order_id) DO NOTHING",
+        "skip_id_on_merge": True,
+    },
+    "supply_order_lines": {
+        "columns": [("id", "int"), ("order_id", "text"), ("code", "text"), ("name", "text"),
+                    ("quantity", "int"), ("cost_price", "float")],
+        "on_conflict": "ON CONFLICT(order_id, code) DO NOTHING",
+        "skip_id_on_merge": True,
+    },
+}
+
+
+def _have_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def default_format():
+    return "parquet" if _have_pyarrow() else "csv"
+
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+    types = {"int": pa.int64(), "float": pa.float64(), "text": pa.string()}
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def _iter_chunks(cursor, table, columns):
+    """Rows of `table` in CHUNK_ROWS lists, in id order."""
+    if table == "sales_log":
+        # Archived months first (older ids): the export holds the whole history
+        import sales_archive
+        archive_cursor = cursor.connection.cursor()
+        for month_sales in sales_archive.iter_archived_months(archive_cursor):
+            rows = [(sale_id, ts, total, items_json) for sale_id, ts, _, total, items_json in month_sales]
+            for start in range(0, len(rows), CHUNK_ROWS):
+                yield rows[start:start + CHUNK_ROWS]
+    names = ", ".join(name for name, _ in columns)
+    cursor.execute(f'SELECT {names} FROM {table} ORDER BY id')
+    while True:
+        rows = cursor.fetchmany(CHUNK_ROWS)
+        if not rows:
+            return
+        yield rows
+
+
+def _write_table(cursor, table, columns, path, fmt):
+    """Stream one table to `path`. Returns the row count."""
+    count = 0
+    if fmt == "csv":
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow([name for name, _ in columns])
+            for rows in _iter_chunks(cursor, table, columns):
+                writer.writerows(rows)
+                count += len(rows)
+        return count
+
+    import pyarrow as pa
+    schema = _arrow_schema(columns)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(path, schema, compression="zstd")
+    else:
+        import pyarrow.ipc as ipc
+        writer = ipc.new_file(path, schema)
+    try:
+        for rows in _iter_chunks(cursor, table, columns):
+            # Column-wise build: one pyarrow array per column, no per-row dicts
+            arrays = [pa.array(list(col), type=field.type) for col, field in zip(zip(*rows), schema)]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            count += len(rows)
+    finally:
+        writer.close()
+    return count
+
+
+@timed("transfer.export_data")
+def export_data(output_dir, fmt=None, tables=None):
+    """
+    Export the given tables (default: all of TABLES) to output_dir.
+    Returns the manifest dict (also written as manifest.json).
+    """
+    fmt = fmt or default_format()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Use one of {list(FORMATS)}")
+    if fmt != "csv" and not _have_pyarrow():
+        print(f"[WARN] pyarrow not installed, exporting CSV instead of {fmt}")
+        fmt = "csv"
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = {
+        'format': fmt,
+        'schema_version': database.SCHEMA_VERSION,
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'tables': {},
+    }
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        for table in tables or TABLES:
+            columns = TABLES[table]["columns"]
+            filename = table + FORMATS[fmt]
+            rows = _write_table(cursor, table, columns, os.path.join(output_dir, filename), fmt)
+            manifest['tables'][table] = {'file': filename, 'rows': rows}
+            print(f"[INFO] Exported {rows} rows from {table} to {filename}")
+    finally:
+        conn.close()
+
+    with open(os.path.join(output_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _not_null_columns(cursor, table):
+    """Names of the NOT NULL columns of a table in the current DB."""
+    return {row[1] for row in cursor.execute(f'PRAGMA table_info({table})') if row[3]}
+
+
+def _read_chunks(path, columns, fmt, not_null=()):
+    """Rows (tuples in `columns` order) of an exported file, CHUNK_ROWS at a time."""
+    names = [name for name, _ in columns]
+    if fmt == "csv":
+        # CSV has no NULL: NULL is written as an empty field, so an empty
+        # field is read back as NULL, except in NOT NULL text columns
+        casts = {
+            "int": lambda v: int(v) if v else None,
+            "float": lambda v: float(v) if v else None,
+            "text": lambda v: v if v else None,
+        }
+        converters = [str if kind == "text" and name in not_null else casts[kind] for name, kind in columns]
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            index = [header.index(name) for name in names]
+            chunk = []
+            for record in reader:
+                chunk.append(tuple(conv(record[i]) for conv, i in zip(converters, index)))
+                if len(chunk) >= CHUNK_ROWS:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        return
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=CHUNK_ROWS, columns=names)
+    else:
+        import pyarrow.ipc as ipc
+        reader = ipc.open_file(path)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    for batch in batches:
+        batch = batch.select(names)
+        yield list(zip(*(column.to_pylist() for column in batch.columns)))
+
+
+def _sale_key(sale_timestamp, total_amount, items_json):
+    return (sale_timestamp, total_amount, hash(items_json))
+
+
+def _merge_sales(cursor, chunks):
+    """
+    Merge exported sales into sales_log. Sale ids are each PC's own sale
+    numbers, so an id that exists here (live or archived) is only the same
+    sale if the content matches: those are skipped, and so are sales found
+    under another number (renumbered by an earlier merge); the others get a
+    new id.
+    Returns (inserted, renumbered, skipped).
+    """
+    import sales_archive
+    archived = {}
+    for month_sales in sales_archive.iter_archived_months(cursor.connection.cursor()):
+        for sale_id, ts, _, total, items_json in month_sales:
+            archived[sale_id] = _sale_key(ts, total, items_json)
+    archived_keys = set(archived.values())
+
+    def stored_elsewhere(ts, total, items_json):
+        """Same sale already here under another number (renumbered by an earlier merge)?"""
+        key = _sale_key(ts, total, items_json)
+        if key in archived_keys:
+            return True
+        cursor.execute('SELECT total_amount, items_json FROM sales_log WHERE sale_timestamp = ?', (ts,))
+        return any(_sale_key(ts, *row) == key for row in cursor.fetchall())
+
+    inserted = renumbered = skipped = 0
+    for rows in chunks:
+        ids = [row[0] for row in rows]
+        live = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor.execute(f"SELECT id, sale_timestamp, total_amount, items_json FROM sales_log "
+                           f"WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            live.update((row[0], _sale_key(*row[1:])) for row in cursor.fetchall())
+        keep_id, new_id = [], []
+        for sale_id, ts, total, items_json in rows:
+            local = live.get(sale_id) or archived.get(sale_id)
+            if local is None:
+                keep_id.append((sale_id, ts, total, items_json))
+            elif local == _sale_key(ts, total, items_json) or stored_elsewhere(ts, total, items_json):
+                skipped += 1
+            else:
+                new_id.append((ts, total, items_json))
+        cursor.executemany('INSERT INTO sales_log (id, sale_timestamp, total_amount, items_json) '
+                           'VALUES (?, ?, ?, ?)', keep_id)
+        cursor.executemany('INSERT INTO sales_log (sale_timestamp, total_amount, items_json) '
+                           'VALUES (?, ?, ?)', new_id)
+        inserted += len(keep_id) + len(new_id)
+        renumbered += len(new_id)
+    return inserted, renumbered, skipped
+
+
+@timed("transfer.import_data")
+def import_data(input_dir, replace=False):
+    """
+    Load an export_data() directory into the current DB.
+    replace=True empties the exported tables first (exact copy, ids kept);
+    otherwise rows are merged: products by code, sales by content (see
+    _merge_sales), orders by order_id, price history by (code, effective_date),
+    order lines by (order_id, code).
+    Returns {table: rows read}.
+    """
+    with open(os.path.join(input_dir, "manifest.json"), encoding='utf-8') as f:
+        manifest = json.load(f)
+    fmt = manifest['format']
+    if manifest.get('schema_version', 0) > database.SCHEMA_VERSION:
+        raise ValueError(f"Export is from a newer schema (v{manifest['schema_version']}); "
+                         f"update this installation first (v{database.SCHEMA_VERSION})")
+
+    counts = {}
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        for table, info in manifest['tables'].items():
+            if table not in TABLES:
+                print(f"[WARN] Skipping unknown table {table} in export")
+                continue
+            spec = TABLES[table]
+            columns = spec["columns"]
+            if replace:
+                cursor.execute(f'DELETE FROM {table}')
+                if table == "sales_log":
+                    # The export carries the archived sales too
+                    cursor.execute('DELETE FROM sales_archive')
+                insert_columns, conflict = columns, ""
+            elif spec["skip_id_on_merge"]:
+                insert_columns, conflict = columns[1:], spec["on_conflict"]
+            else:
+                insert_columns, conflict = columns, spec["on_conflict"]
+            offset = len(columns) - len(insert_columns)
+            names = ", ".join(name for name, _ in insert_columns)
+            placeholders = ", ".join("?" * len(insert_columns))
+            sql = f'INSERT INTO {table} ({names}) VALUES ({placeholders}) {conflict}'
+
+            counts[table] = 0
+            chunks = _read_chunks(os.path.join(input_dir, info['file']), columns, fmt,
+                                  _not_null_columns(cursor, table))
+            if table == "sales_log" and not replace:
+                inserted, renumbered, skipped = _merge_sales(cursor, chunks)
+                counts[table] = inserted + skipped
+                print(f"[INFO] Imported {inserted} sales ({renumbered} with a new sale number, "
+                      f"{skipped} already here skipped)")
+                continue
+            for rows in chunks:
+                cursor.executemany(sql, [row[offset:] for row in rows] if offset else rows)
+                counts[table] += len(rows)
+            print(f"[INFO] Imported {counts[table]} rows into {table}")
+
+        # One transaction for the whole import: all or nothing
+        conn.commit()
+    finally:
+        conn.close()
+
+    if 'sales_log' in counts:
+        # Aggregates are derived data: rebuild them from the archive and the imported sales
+        reports.rebuild_sales_summary()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export/import the catalog and sales history")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="Write tables to a directory")
+    exp.add_argument("output_dir")
+    exp.add_argument("--format", choices=sorted(FORMATS), help="Default: parquet (csv without pyarrow)")
+    exp.add_argument("--tables", nargs="+", choices=list(TABLES), help="Default: all")
+    imp = sub.add_parser("import", help="Load a directory written by export")
+    imp.add_argument("input_dir")
+    imp.add_argument("--replace", action="store_true", help="Empty the tables first instead of merging")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        manifest = export_data(args.output_dir, args.format, args.tables)
+        total = sum(t['rows'] for t in manifest['tables'].values())
+        print(f"{total} rows exported to {args.output_dir} ({manifest['format']})")
+    else:
+        counts = import_data(args.input_dir, replace=args.replace)
+        print(f"{sum(counts.values())} rows imported from {args.input_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
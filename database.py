@@ -1,16 +1,27 @@
 import sqlite3
-import os
 from datetime import datetime
 import config
+from instrumentation import timed
 
 DB_NAME = config.DB_PATH
 
-def init_db():
-    """Initialize the database with necessary tables."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
+# ==============================================================================
+# SCHEMA MIGRATIONS
+# ==============================================================================
+# The schema version is stored in the DB file itself (PRAGMA user_version).
+# Each migration runs once per DB, in its own transaction together with the
+# user_version bump, so an interrupted upgrade never leaves a half-migrated
+# file. Migrations are idempotent (IF NOT EXISTS / column checks) because DBs
+# created before versioning already have some of these objects.
+# To change the schema append a new migration - never edit a released one.
+
+def _add_column(cursor, table, column, definition):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists."""
+    existing_columns = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+    if column not in existing_columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
 
+def _migration_base_tables(cursor):
     # Products table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS products (
@@ -25,7 +36,7 @@ def init_db():
             stock_quantity INTEGER DEFAULT 0
         )
     ''')
-    
+
     # Sales log table (for local db tracking, separate from text log file)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS sales_log (
@@ -45,21 +56,264 @@ def init_db():
             total_items INTEGER
         )
     ''')
-    
-    conn.commit()
+
+def _migration_report_tables(cursor):
+    # Sales summary - materialized per-day/per-SKU aggregates for reports
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_summary (
+            day TEXT NOT NULL,
+            code TEXT NOT NULL,
+            name TEXT,
+            brand TEXT,
+            units INTEGER DEFAULT 0,
+            revenue REAL DEFAULT 0.0,
+            cost REAL DEFAULT 0.0,
+            PRIMARY KEY (day, code)
+        )
+    ''')
+
+    # Sales daily - ticket count and revenue per day
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_daily (
+            day TEXT PRIMARY KEY,
+            tickets INTEGER DEFAULT 0,
+            revenue REAL DEFAULT 0.0
+        )
+    ''')
+
+    # Report state - high-water marks for incremental refreshes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_state (
+            name TEXT PRIMARY KEY,
+            value INTEGER DEFAULT 0
+        )
+    ''')
+
+def _migration_has_image(cursor):
+    # NULL = not verified yet (see image_reconcile.py), 0 = missing/broken, 1 = ok
+    _add_column(cursor, 'products', 'has_image', 'INTEGER')
+
+def _migration_hot_query_indexes(cursor):
+    # In-stock / low-stock filtering (POS list, reorder suggestions)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_stock ON products (stock_quantity)')
+    # Brand and category facets: (facet, stock_quantity) covers both the facet
+    # counts and the in-stock counts of the POS without touching the table
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_brand_stock ON products (brand, stock_quantity)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category_stock ON products (category, stock_quantity)')
+    # Date-range scans over the sales history
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_log_timestamp ON sales_log (sale_timestamp)')
+
+def _migration_facet_indexes(cursor):
+    # Only for DBs migrated to v4 before it built the covering indexes: their
+    # single-column brand/category indexes are a prefix of these and are
+    # redundant. On a DB migrated from scratch every statement is a no-op
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_brand_stock ON products (brand, stock_quantity)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category_stock ON products (category, stock_quantity)')
+    cursor.execute('DROP INDEX IF EXISTS idx_products_brand')
+    cursor.execute('DROP INDEX IF EXISTS idx_products_category')
+
+def _migration_stock_reservations(cursor):
+    # Short-lived stock holds per POS till (see reservations.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_reservations (
+            session_id TEXT NOT NULL,
+            code TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (session_id, code)
+        )
+    ''')
+    # Availability checks sum the live holds of one product
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reservations_code ON stock_reservations (code, expires_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reservations_expiry ON stock_reservations (expires_at)')
+
+def _migration_price_history(cursor):
+    # Append-only cost price log: one row per SKU per import where the price
+    # changed (previous_price NULL = first time seen). effective_date is the
+    # local time of the import, shared by every row written by that import.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            code TEXT NOT NULL,
+            effective_date TEXT NOT NULL,
+            cost_price REAL NOT NULL,
+            previous_price REAL
+        )
+    ''')
+    # "Price as of X": one seek per SKU. At most one price per SKU per import
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_price_history_code_date ON price_history (code, effective_date)')
+    # "Changes of import X" and the list of imports
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_price_history_date ON price_history (effective_date)')
+    # Baseline: today's prices, so as-of lookups work before the next import
+    cursor.execute('''
+        INSERT INTO price_history (code, effective_date, cost_price)
+        SELECT code, datetime('now', 'localtime'), cost_price FROM products
+        WHERE cost_price IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM price_history h WHERE h.code = products.code)
+    ''')
+
+def _migration_product_changes(cursor):
+    # Change log of the searchable product columns, filled by triggers so
+    # every writer (app, ETL runner, imports) is covered. The in-memory
+    # search index (search_index.py) replays it to stay current.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS product_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_products_insert_search AFTER INSERT ON products
+        BEGIN
+            INSERT INTO product_changes (product_id) VALUES (NEW.id);
+        END
+    ''')
+    # Stock and price updates do not touch the index
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_products_update_search AFTER UPDATE ON products
+        WHEN OLD.code IS NOT NEW.code OR OLD.name IS NOT NEW.name
+          OR OLD.brand IS NOT NEW.brand OR OLD.description IS NOT NEW.description
+        BEGIN
+            INSERT INTO product_changes (product_id) VALUES (NEW.id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_products_delete_search AFTER DELETE ON products
+        BEGIN
+            INSERT INTO product_changes (product_id) VALUES (OLD.id);
+        END
+    ''')
+
+def _migration_sales_archive(cursor):
+    # Old sales moved out of sales_log, one row per month (see sales_archive.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_archive (
+            month TEXT PRIMARY KEY,
+            first_id INTEGER,
+            last_id INTEGER,
+            sales INTEGER,
+            total_amount REAL,
+            data BLOB NOT NULL,
+            archived_at TEXT
+        )
+    ''')
+
+def _migration_supply_orders(cursor):
+    # Generated supply orders and their lines (see supply_orders.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS supply_orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id TEXT UNIQUE NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            created_at TEXT NOT NULL,
+            received_at TEXT,
+            total_items INTEGER,
+            total_cost REAL,
+            csv_file TEXT
+        )
+    ''')
+    # Pending / received lists, newest first
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_supply_orders_status_date ON supply_orders (status, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_supply_orders_date ON supply_orders (created_at)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS supply_order_lines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id TEXT NOT NULL,
+            code TEXT NOT NULL,
+            name TEXT,
+            quantity INTEGER NOT NULL,
+            cost_price REAL,
+            UNIQUE (order_id, code)
+        )
+    ''')
+
+# (version, description, migration) - versions are consecutive, starting at 1
+MIGRATIONS = [
+    (1, "base tables", _migration_base_tables),
+    (2, "report tables", _migration_report_tables),
+    (3, "products.has_image", _migration_has_image),
+    (4, "indexes on stock, brand, category and sale date", _migration_hot_query_indexes),
+    (5, "covering indexes for brand/category facets (older v4 DBs)", _migration_facet_indexes),
+    (6, "stock reservations", _migration_stock_reservations),
+    (7, "cost price history", _migration_price_history),
+    (8, "product change log for the search index", _migration_product_changes),
+    (9, "monthly sales archive", _migration_sales_archive),
+    (10, "supply orders", _migration_supply_orders),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# DB file whose schema has been checked by this process
+_schema_checked_for = None
+
+def get_schema_version():
+    """Current PRAGMA user_version of the DB file (0 = never migrated)."""
+    conn = sqlite3.connect(DB_NAME)
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
     conn.close()
+    return version
+
+@timed("db.init_db")
+def init_db():
+    """Create the database or bring it up to SCHEMA_VERSION by applying pending migrations."""
+    global _schema_checked_for
+    # Autocommit mode, so the explicit BEGIN/COMMIT below wrap the DDL too
+    conn = sqlite3.connect(DB_NAME, isolation_level=None)
+    cursor = conn.cursor()
+    try:
+        if not cursor.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchone():
+            # New file: let freed pages be reclaimed in small steps
+            # (PRAGMA incremental_vacuum); only possible before the first table
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        for version, description, migration in MIGRATIONS:
+            if cursor.execute('PRAGMA user_version').fetchone()[0] >= version:
+                continue
+            # IMMEDIATE takes the write lock up front; re-check the version under
+            # it in case another process (ETL runner, second tab) got there first
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                if cursor.execute('PRAGMA user_version').fetchone()[0] >= version:
+                    cursor.execute('COMMIT')
+                    continue
+                migration(cursor)
+                cursor.execute(f'PRAGMA user_version = {version}')
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+            print(f"[INFO] Database migrated to v{version}: {description}")
+    finally:
+        conn.close()
+    _schema_checked_for = DB_NAME
+
+@timed("db.ensure_schema")
+def ensure_schema():
+    """Run init_db() only if this DB is behind SCHEMA_VERSION (one cheap PRAGMA otherwise)."""
+    global _schema_checked_for
+    if get_schema_version() < SCHEMA_VERSION:
+        init_db()
+    _schema_checked_for = DB_NAME
 
 def get_connection():
+    # Schema is checked lazily on the first connection instead of at import time
+    if _schema_checked_for != DB_NAME:
+        ensure_schema()
     return sqlite3.connect(DB_NAME)
 
-def add_product(code, name, category, brand, cost_price, image_path=None, stock_quantity=0, description=None):
-    """Add a single product or update if exists (upsert). Preserves existing stock_quantity."""
+@timed("db.add_product")
+def add_product(code, name, category, brand, cost_price, image_path=None, stock_quantity=0, description=None,
+                image_verified=False):
+    """
+    Add a single product or update if exists (upsert). Preserves existing stock_quantity.
+    image_verified: image_path was downloaded and validated just now (has_image = 1);
+    an unverified new path leaves has_image NULL for image_reconcile / the UI to decide.
+    """
     conn = get_connection()
     cursor = conn.cursor()
     try:
         # Use INSERT OR REPLACE with special handling to preserve stock_quantity
         # First check if product exists to preserve its stock
-        cursor.execute('SELECT stock_quantity, image_path FROM products WHERE code = ?', (code,))
+        cursor.execute('SELECT stock_quantity, image_path, has_image FROM products WHERE code = ?', (code,))
         existing = cursor.fetchone()
         
         if existing:
@@ -68,21 +322,30 @@ def add_product(code, name, category, brand, cost_price, image_path=None, stock_
             existing_image = existing[1]
             final_image = image_path if image_path else existing_image
             
+            # A freshly downloaded image is known good; a different, unchecked
+            # path resets the flag; the same path keeps it
+            if image_verified and image_path:
+                has_image = 1
+            elif final_image != existing_image:
+                has_image = None
+            else:
+                has_image = existing[2]
             cursor.execute('''
-                UPDATE products SET 
-                    name = ?, category = ?, brand = ?, description = ?, 
-                    cost_price = ?, image_path = ?
+                UPDATE products SET
+                    name = ?, category = ?, brand = ?, description = ?,
+                    cost_price = ?, image_path = ?, has_image = ?
                 WHERE code = ?
-            ''', (name, category, brand, description, cost_price, final_image, code))
+            ''', (name, category, brand, description, cost_price, final_image, has_image, code))
             conn.commit()
             print(f"Product {code} updated with new price: {cost_price}")
             return True
         else:
             # New product - insert with provided stock_quantity (default 0)
             cursor.execute('''
-                INSERT INTO products (code, name, category, brand, description, cost_price, image_path, stock_quantity)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (code, name, category, brand, description, cost_price, image_path, stock_quantity))
+                INSERT INTO products (code, name, category, brand, description, cost_price, image_path, stock_quantity, has_image)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (code, name, category, brand, description, cost_price, image_path, stock_quantity,
+                  (1 if image_verified else None) if image_path else 0))
             conn.commit()
             print(f"Product {code} added as new product.")
             return True
@@ -92,6 +355,7 @@ def add_product(code, name, category, brand, cost_price, image_path=None, stock_
     finally:
         conn.close()
 
+@timed("db.update_product")
 def update_product(code, cost_price=None, stock_delta=None):
     """Update product details. stock_delta adds/subtracts from current stock."""
     conn = get_connection()
@@ -106,6 +370,7 @@ def update_product(code, cost_price=None, stock_delta=None):
     conn.commit()
     conn.close()
 
+@timed("db.get_all_products")
 def get_all_products():
     """Retrieve all products as a list of dicts."""
     conn = get_connection()
@@ -116,19 +381,251 @@ def get_all_products():
     conn.close()
     return [dict(row) for row in rows]
 
+@timed("db.get_image_status")
+def get_image_status():
+    """{code: (stock_quantity, has_image)} for the whole catalog; has_image is False
+    when there is no image path or the file was found missing/broken."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT code, stock_quantity,
+               image_path IS NOT NULL AND COALESCE(has_image, 1) = 1
+        FROM products
+    ''')
+    status = {code: (stock, bool(has_image)) for code, stock, has_image in cursor.fetchall()}
+    conn.close()
+    return status
+
+# Columns that can be used as facets (also guards the f-string SQL below)
+FACET_COLUMNS = ('brand', 'category')
 
+def _facet_where(brand=None, category=None, in_stock_only=False):
+    """WHERE fragment and params for the facet selection."""
+    clauses = []
+    params = []
+    if brand is not None:
+        clauses.append('brand = ?')
+        params.append(brand)
+    if category is not None:
+        clauses.append('category = ?')
+        params.append(category)
+    if in_stock_only:
+        clauses.append('stock_quantity > 0')
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+@timed("db.get_facet_counts")
+def get_facet_counts(column, brand=None, category=None, in_stock_only=False):
+    """
+    Product count per value of `column` ('brand' or 'category'), largest first.
+    The selection on the *other* facet narrows the counts; the selection on
+    `column` itself is ignored so every option keeps its count.
+    Served from the (facet, stock_quantity) indexes - no table scan.
+    """
+    if column not in FACET_COLUMNS:
+        raise ValueError(f"Unknown facet '{column}'. Use one of {list(FACET_COLUMNS)}")
+    if column == 'brand':
+        brand = None
+    else:
+        category = None
+    where, params = _facet_where(brand, category, in_stock_only)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT {column}, COUNT(*) AS n FROM products {where}
+        GROUP BY {column} ORDER BY n DESC, {column}
+    ''', params)
+    rows = cursor.fetchall()
+    conn.close()
+    return [(value, count) for value, count in rows if value]
+
+@timed("db.get_products")
+def get_products(brand=None, category=None, in_stock_only=False):
+    """Products matching the facet selection, as a list of dicts (indexed lookup)."""
+    where, params = _facet_where(brand, category, in_stock_only)
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT * FROM products {where}', params)
+    rows = cursor.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+@timed("db.get_products_page")
+def get_products_page(brand=None, category=None, search=None, page=1, page_size=50):
+    """
+    One page of products for the bulk order grid, lowest stock first:
+    (list of dicts with code, name, brand, stock_quantity, cost_price, total matches).
+    `search` is a plain substring of the code, name or brand.
+    """
+    where, params = _facet_where(brand, category)
+    if search:
+        clause = "(code LIKE ? OR name LIKE ? OR brand LIKE ?)"
+        where = f"{where} AND {clause}" if where else f"WHERE {clause}"
+        params += [f"%{search}%"] * 3
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT COUNT(*) FROM products {where}', params)
+    total = cursor.fetchone()[0]
+    cursor.execute(f'''
+        SELECT code, name, brand, stock_quantity, cost_price FROM products {where}
+        ORDER BY stock_quantity, code LIMIT ? OFFSET ?
+    ''', params + [page_size, (max(page, 1) - 1) * page_size])
+    rows = cursor.fetchall()
+    conn.close()
+    return [dict(row) for row in rows], total
+
+
+@timed("db.clear_all_products")
 def clear_all_products():
-    """Delete all records from products and sales_log tables."""
+    """Delete all records from products, sales (live and archived), the report tables, stock holds and price history."""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('DELETE FROM products')
     cursor.execute('DELETE FROM sales_log')
+    cursor.execute('DELETE FROM sales_archive')
     # Reset auto-increment counters
     cursor.execute("DELETE FROM sqlite_sequence WHERE name='products'")
     cursor.execute("DELETE FROM sqlite_sequence WHERE name='sales_log'")
+    # Reports are derived from sales_log, so they go too
+    cursor.execute('DELETE FROM sales_summary')
+    cursor.execute('DELETE FROM sales_daily')
+    cursor.execute('DELETE FROM report_state')
+    # Holds and price history of products that no longer exist
+    cursor.execute('DELETE FROM stock_reservations')
+    cursor.execute('DELETE FROM price_history')
     conn.commit()
     conn.close()
 
+# ==============================================================================
+# COST PRICE HISTORY
+# ==============================================================================
+
+PRICE_EPSILON = 0.005  # half a cent: smaller differences are rounding, not a new price
+
+def _now_local():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+@timed("db.record_price_changes")
+def record_price_changes(products, effective_date=None):
+    """
+    Append a price_history row for every product whose cost_price differs
+    from the catalog's (or that is not in the catalog yet).
+    Call it BEFORE the products are upserted. One transaction for the batch.
+    Returns the number of rows written.
+    """
+    effective_date = effective_date or _now_local()
+    # Last occurrence wins, as with the upserts that follow
+    new_prices = {p['code']: p['cost_price'] for p in products if p.get('cost_price') is not None}
+    if not new_prices:
+        return 0
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        current = {}
+        codes = list(new_prices)
+        for start in range(0, len(codes), 500):
+            chunk = codes[start:start + 500]
+            cursor.execute(
+                f"SELECT code, cost_price FROM products WHERE code IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            current.update(cursor.fetchall())
+
+        rows = []
+        for code, price in new_prices.items():
+            old = current.get(code)
+            if old is None or abs(old - price) > PRICE_EPSILON:
+                rows.append((code, effective_date, price, old))
+        cursor.executemany('''
+            INSERT INTO price_history (code, effective_date, cost_price, previous_price)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(code, effective_date) DO UPDATE SET cost_price = excluded.cost_price
+        ''', rows)
+        conn.commit()
+        return len(rows)
+    finally:
+        conn.close()
+
+@timed("db.get_price_imports")
+def get_price_imports(limit=None):
+    """Dates of the imports that changed prices, newest first."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    sql = 'SELECT DISTINCT effective_date FROM price_history ORDER BY effective_date DESC'
+    if limit:
+        sql += f' LIMIT {int(limit)}'
+    dates = [row[0] for row in cursor.execute(sql)]
+    conn.close()
+    return dates
+
+@timed("db.get_price_changes")
+def get_price_changes(effective_date=None, limit=50, increases_only=True):
+    """
+    Price changes written by one import (default: the latest), biggest
+    relative increase first. Products seen for the first time are left out.
+    """
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    if effective_date is None:
+        cursor.execute('SELECT MAX(effective_date) FROM price_history')
+        effective_date = cursor.fetchone()[0]
+    direction = 'AND h.cost_price > h.previous_price' if increases_only else ''
+    cursor.execute(f'''
+        SELECT h.code, p.name, p.brand, h.previous_price, h.cost_price,
+               h.cost_price - h.previous_price AS change,
+               (h.cost_price - h.previous_price) * 100.0 / h.previous_price AS change_pct
+        FROM price_history h
+        LEFT JOIN products p ON p.code = h.code
+        WHERE h.effective_date = ? AND h.previous_price > 0 {direction}
+        ORDER BY change_pct DESC
+        LIMIT ?
+    ''', (effective_date, limit))
+    rows = cursor.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+@timed("db.get_price_as_of")
+def get_price_as_of(code, as_of):
+    """
+    Cost price of `code` in effect at `as_of` ('YYYY-MM-DD' means the end of
+    that day; 'YYYY-MM-DD HH:MM:SS' and date objects work too).
+    None if the product had no price yet.
+    """
+    as_of = str(as_of)
+    if len(as_of) == 10:
+        as_of += ' 23:59:59'
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT cost_price FROM price_history
+        WHERE code = ? AND effective_date <= ?
+        ORDER BY effective_date DESC LIMIT 1
+    ''', (code, as_of))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+@timed("db.get_price_history")
+def get_price_history(code):
+    """All recorded prices of one product, oldest first."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT effective_date, cost_price, previous_price FROM price_history
+        WHERE code = ? ORDER BY effective_date
+    ''', (code,))
+    rows = cursor.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+@timed("db.get_product")
 def get_product(code):
     """Retrieve a single product by code."""
     conn = get_connection()
@@ -141,6 +638,7 @@ def get_product(code):
         return dict(row)
     return None
 
+@timed("db.get_next_sale_number")
 def get_next_sale_number():
     """Get the next sale ID for logging purposes."""
     conn = get_connection()
@@ -152,6 +650,7 @@ def get_next_sale_number():
         return row[0] + 1
     return 1 # Start at 1 if no sales yet (or if table empty/reset)
 
+@timed("db.log_sale_db")
 def log_sale_db(total_amount, items_json):
     """Log sale to internal DB."""
     conn = get_connection()
@@ -162,6 +661,7 @@ def log_sale_db(total_amount, items_json):
     conn.close()
     return sale_id
 
+@timed("db.is_order_used")
 def is_order_used(order_id):
     """Check if an order ID has already been redeemed."""
     conn = get_connection()
@@ -171,6 +671,7 @@ def is_order_used(order_id):
     conn.close()
     return row is not None
 
+@timed("db.mark_order_used")
 def mark_order_used(order_id, total_items):
     """Mark an order ID as redeemed to prevent duplicate use."""
     conn = get_connection()
@@ -185,9 +686,9 @@ def mark_order_used(order_id, total_items):
     finally:
         conn.close()
 
-# Initialize DB on import if not exists
-if not os.path.exists(DB_NAME):
-    init_db()
-else:
-    # Ensure new tables exist in existing DB
+
+if __name__ == "__main__":
+    # Manual upgrade: python database.py
+    before = get_schema_version()
     init_db()
+    print(f"{DB_NAME}: schema v{before} -> v{get_schema_version()}")
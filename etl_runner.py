@@ -2,6 +2,10 @@ import sys
 import os
 import argparse
 import logic
+import pdf_backends
+import config
+import instrumentation
+from datetime import datetime
 
 # Force unbuffered stdout so Streamlit receives updates immediately
 sys.stdout.reconfigure(line_buffering=True)
@@ -16,9 +20,19 @@ def update_progress(current, total):
 def main():
     parser = argparse.ArgumentParser(description="Run ETL Pipeline")
     parser.add_argument("pdf_path", help="Path to the PDF file")
+    parser.add_argument("--profile", action="store_true", help="Record phase timings and save them as JSON in logs/")
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse every PDF page, ignoring the Phase 1 page cache")
+    parser.add_argument("--backend", choices=sorted(pdf_backends.BACKENDS), default=pdf_backends.DEFAULT_BACKEND,
+                        help="Phase 1 PDF extraction backend")
+    parser.add_argument("--low-memory", action="store_true", default=config.PDF_LOW_MEMORY,
+                        help="Flush PDF parser caches after every page (large lists on small machines)")
+    parser.add_argument("--scrape-budget", type=float, default=config.SCRAPE_BUDGET, metavar="SECONDS",
+                        help="Stop image scraping after this long; best sellers and in-stock items go first")
     args = parser.parse_args()
     
     pdf_path = args.pdf_path
+    if args.profile:
+        instrumentation.enable()
     
     if not os.path.exists(pdf_path):
         print(f"ERROR: File not found: {pdf_path}")
@@ -26,7 +40,13 @@ def main():
         
     try:
         print("STATUS:Starting ETL...")
-        count = logic.run_etl_pipeline(pdf_path, progress_callback=update_progress)
+        count = logic.run_etl_pipeline(pdf_path, progress_callback=update_progress, use_cache=not args.no_cache,
+                                       backend=args.backend, low_memory=args.low_memory,
+                                       scrape_budget=args.scrape_budget)
+        if args.profile:
+            profile_path = os.path.join(config.LOG_DIR, f"etl_profile_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+            instrumentation.export_json(profile_path)
+            print(f"STATUS:Profile saved to {profile_path}")
         print(f"RESULT:SUCCESS:{count}")
     except Exception as e:
         print(f"RESULT:ERROR:{str(e)}")
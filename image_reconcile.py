@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import argparse
+
+import config
+from database import get_connection
+from instrumentation import timed
+
+# ==============================================================================
+# IMAGE RECONCILIATION
+# ==============================================================================
+# Replaces the one-off fix_db_paths_robust.py / update_db_paths.py scripts.
+# One pass over static/ validates every image file. Each product then gets the
+# first valid candidate of:
+#   1. its current image_path, normalized (backslashes, old downloads/ prefix)
+#   2. static/<config.image_filename(code)>      (ETL naming)
+#   3. the crawler manifest (static/manifest.json, SKU -> hash file); older
+#      manifests are keyed by the SKU with unsafe characters replaced by '_'
+# The result is written back in bulk through a temp table join, together with
+# has_image (1 = valid file, 0 = none), so the UI never has to hit the
+# filesystem when rendering.
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+EXTENSION_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".webp": "WEBP", ".gif": "GIF"}
+
+
+def validate_image(path, size):
+    """Return (ok, reason). ok means non-empty, decodable and an allowed format."""
+    if size == 0:
+        return False, "empty file"
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            fmt = img.format
+            img.verify()
+    except Exception as e:
+        return False, f"not decodable ({e.__class__.__name__})"
+    if fmt not in ALLOWED_FORMATS:
+        return False, f"unsupported format {fmt}"
+    ext_format = EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower())
+    if ext_format and ext_format != fmt:
+        # Browsers sniff the content, so this still renders - just report it
+        return True, f"extension says {ext_format}, content is {fmt}"
+    return True, None
+
+
+@timed("images.scan_static_dir")
+def scan_static_dir(static_dir=config.STATIC_DIR):
+    """Validate every file in static_dir once. Returns {filename: (ok, reason)}."""
+    results = {}
+    if not os.path.isdir(static_dir):
+        return results
+    with os.scandir(static_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name.endswith((".part", ".tmp", ".json")):
+                continue
+            results[entry.name] = validate_image(entry.path, entry.stat().st_size)
+    return results
+
+
+def load_manifest(static_dir=config.STATIC_DIR):
+    """SKU -> hash filename from the scrap.py crawler, if it shares static/."""
+    path = os.path.join(static_dir, "manifest.json")
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("skus", {})
+    except ValueError:
+        print(f"[WARN] Ignoring unreadable manifest {path}")
+        return {}
+
+
+def image_basename(image_path):
+    """File name part of a stored path ('static\\x.jpg', 'downloads/x.jpg' -> 'x.jpg')."""
+    return os.path.basename(image_path.replace('\\', '/'))
+
+
+def candidate_filenames(code, image_path, manifest):
+    """Filenames under static/ that could hold this product's image, best first."""
+    candidates = []
+    if image_path:
+        candidates.append(image_basename(image_path))
+    candidates.append(config.image_filename(code))
+    # Older scrap.py manifests keyed the SKU with unsafe characters as '_'
+    for key in (code, config.UNSAFE_FILENAME_CHARS.sub('_', code)):
+        if key in manifest:
+            candidates.append(manifest[key])
+            break
+    return candidates
+
+
+@timed("images.reconcile")
+def reconcile(dry_run=False, static_dir=config.STATIC_DIR):
+    """
+    Point every product at a valid image (or none) and set has_image.
+    Returns a summary dict.
+    """
+    files = scan_static_dir(static_dir)
+    manifest = load_manifest(static_dir)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT code, image_path, has_image FROM products')
+    rows = cursor.fetchall()
+
+    updates = []
+    summary = {'products': len(rows), 'files': len(files),
+               'invalid_files': 0, 'with_image': 0, 'without_image': 0, 'changed': 0,
+               'problems': []}
+    for name, (ok, reason) in files.items():
+        if not ok:
+            summary['invalid_files'] += 1
+        if reason:
+            summary['problems'].append(f"{name}: {reason}")
+
+    for code, image_path, has_image in rows:
+        new_path = None
+        for filename in candidate_filenames(code, image_path, manifest):
+            ok, _ = files.get(filename, (False, None))
+            if ok:
+                new_path = f"{config.STATIC_DIR_NAME}/{filename}"
+                break
+        new_flag = 1 if new_path else 0
+        summary['with_image' if new_flag else 'without_image'] += 1
+        final_path = new_path
+        if not final_path and image_path:
+            # Keep the (normalized) path so the image is picked up if the file shows up later
+            final_path = f"{config.STATIC_DIR_NAME}/{image_basename(image_path)}"
+        if final_path != image_path or new_flag != has_image:
+            updates.append((code, final_path, new_flag))
+
+    summary['changed'] = len(updates)
+    if dry_run or not updates:
+        conn.close()
+        return summary
+
+    try:
+        cursor.execute('''
+            CREATE TEMP TABLE image_fix (
+                code TEXT PRIMARY KEY,
+                image_path TEXT,
+                has_image INTEGER
+            )
+        ''')
+        cursor.executemany('INSERT INTO image_fix (code, image_path, has_image) VALUES (?, ?, ?)', updates)
+        # One statement for the whole catalog (correlated join on the temp table PK)
+        cursor.execute('''
+            UPDATE products SET
+                image_path = (SELECT f.image_path FROM image_fix f WHERE f.code = products.code),
+                has_image = (SELECT f.has_image FROM image_fix f WHERE f.code = products.code)
+            WHERE code IN (SELECT code FROM image_fix)
+        ''')
+        conn.commit()
+    finally:
+        conn.close()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate static/ images and fix products.image_path in bulk")
+    parser.add_argument("--dry-run", action="store_true", help="Report only, do not update the DB")
+    parser.add_argument("--verbose", action="store_true", help="List every problem file")
+    args = parser.parse_args()
+
+    summary = reconcile(dry_run=args.dry_run)
+    print(f"Products: {summary['products']} | Files: {summary['files']} "
+          f"(invalid: {summary['invalid_files']})")
+    print(f"With image: {summary['with_image']} | Without image: {summary['without_image']} | "
+          f"{'Would change' if args.dry_run else 'Changed'}: {summary['changed']}")
+    problems = summary['problems']
+    for line in problems if args.verbose else problems[:20]:
+        print(f"  [WARN] {line}")
+    if not args.verbose and len(problems) > 20:
+        print(f"  ... {len(problems) - 20} more (use --verbose)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
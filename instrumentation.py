@@ -0,0 +1,205 @@
+import os
+import sys
+import json
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+
+# ==============================================================================
+# HOT-PATH INSTRUMENTATION
+# ==============================================================================
+# Timers and counters for DB calls, ETL phases and UI render sections.
+# Disabled by default: a disabled @timed function costs one flag check and
+# timer() hands back a shared no-op context. Enable with STOCK_PROFILE=1 or
+# enable() at runtime (the diagnostics tab's toggle; disable() turns it off).
+#
+# Each timer keeps count / total / min / max and a histogram over fixed
+# millisecond buckets. snapshot() and export_json() return everything.
+
+BUCKETS_MS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000]
+
+_enabled = os.environ.get("STOCK_PROFILE", "") not in ("", "0")
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Drop all collected timings and counters."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def record(name, elapsed_ms):
+    """Add one measurement (milliseconds) to timer `name`."""
+    with _lock:
+        stat = _timers.get(name)
+        if stat is None:
+            stat = _timers[name] = {
+                'count': 0, 'total_ms': 0.0, 'min_ms': None, 'max_ms': 0.0,
+                'buckets': [0] * (len(BUCKETS_MS) + 1)
+            }
+        stat['count'] += 1
+        stat['total_ms'] += elapsed_ms
+        if stat['min_ms'] is None or elapsed_ms < stat['min_ms']:
+            stat['min_ms'] = elapsed_ms
+        if elapsed_ms > stat['max_ms']:
+            stat['max_ms'] = elapsed_ms
+        stat['buckets'][bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+
+
+def incr(name, n=1):
+    """Bump counter `name` by n (no-op when disabled)."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+@contextmanager
+def _timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000.0)
+
+
+def timer(name):
+    """Context manager timing the enclosed block under `name`."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _timer(name)
+
+
+def timed(name=None):
+    """Decorator timing every call of the function (default name: module.function)."""
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(label, (time.perf_counter() - start) * 1000.0)
+        return wrapper
+    return decorator
+
+
+def bucket_labels():
+    """Histogram bucket labels matching the 'buckets' lists in snapshot()."""
+    labels = [f"<={b}ms" for b in BUCKETS_MS]
+    labels.append(f">{BUCKETS_MS[-1]}ms")
+    return labels
+
+
+def snapshot():
+    """Copy of all timers (with avg_ms) and counters."""
+    with _lock:
+        timers = {}
+        for name, stat in _timers.items():
+            entry = dict(stat)
+            entry['buckets'] = list(stat['buckets'])
+            entry['avg_ms'] = stat['total_ms'] / stat['count'] if stat['count'] else 0.0
+            timers[name] = entry
+        return {
+            'enabled': _enabled,
+            'bucket_labels': bucket_labels(),
+            'timers': timers,
+            'counters': dict(_counters),
+        }
+
+
+def export_json(path=None):
+    """Serialize snapshot() to JSON; also write it to `path` if given."""
+    data = json.dumps(snapshot(), indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+    return data
+
+
+# ------------------------------------------------------------------------------
+# Memory
+# ------------------------------------------------------------------------------
+# Resident set size of this process, for the ETL and its benchmarks. Linux
+# reads /proc. Elsewhere psutil is used if it is installed (optional, like
+# pyarrow); without it macOS and the BSDs only know the peak (resource), and
+# on Windows nothing is known - both functions then return None.
+
+def _proc_status_kb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _psutil_memory():
+    """psutil's memory_info() for this process, or None without psutil."""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info()
+
+
+def rss_mb():
+    """Current resident memory in MB, or None where it cannot be read."""
+    kb = _proc_status_kb("VmRSS")
+    if kb is not None:
+        return kb / 1024.0
+    info = _psutil_memory()
+    return info.rss / (1024.0 * 1024.0) if info is not None else None
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where it cannot be read."""
+    kb = _proc_status_kb("VmHWM")
+    if kb is not None:
+        return kb / 1024.0
+    try:
+        import resource
+    except ImportError:
+        # Windows: psutil reports the peak working set there
+        info = _psutil_memory()
+        peak = getattr(info, "peak_wset", None)
+        return peak / (1024.0 * 1024.0) if peak is not None else None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KB on the other Unixes
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
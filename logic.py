@@ -1,14 +1,19 @@
 import os
 import time
-import requests
-import pdfplumber
 import re
 import datetime
 import json
-from bs4 import BeautifulSoup
-from database import update_product, log_sale_db, get_next_sale_number, add_product
+import heapq
+from database import update_product, log_sale_db, add_product, get_product, record_price_changes, get_image_status
+import pdf_backends
+import pdf_cache
+import prices
+import reports
+import reservations
+import sales_journal
 
 import config
+from instrumentation import timed, timer, peak_rss_mb
 
 # --- CONFIGURATION ---
 LOG_DIR = config.LOG_DIR
@@ -24,6 +29,22 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
+# Product image selectors on the search results page, in order of preference.
+# Only the subtrees of IMAGE_CONTAINER_CLASSES are parsed (the rest of the page
+# - header, menus, scripts - never becomes a tree), so every selector must
+# start at one of them.
+IMAGE_SELECTORS = [
+    "article.product-miniature div.thumbnail-container img",
+    ".product_img_link img",  # Older PS
+    ".product-image img",
+]
+IMAGE_CONTAINER_CLASSES = ["product-miniature", "product_img_link", "product-image"]
+
+# Image downloads are streamed to "<file>.part" and renamed into place, so a
+# killed run never leaves a truncated image behind
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
 def calculate_sale_price(cost_price):
     if cost_price is None: return 0.0
     return round(cost_price * 1.51, 2)
@@ -32,342 +53,420 @@ def calculate_sale_price(cost_price):
 # PHASE 1: The Data Skeleton (PDF Parsing)
 # ==============================================================================
 
-def extract_brand_from_cell(page, cell_rect):
-    """
-    Scans a specific rectangular area (the Description cell) for text 
-    that is BOTH Bold and UPPERCASE.
+def _extract_page(tables):
+    """Phase 1 for one page: list of product dicts from its extracted tables (see pdf_backends.py)."""
+    page_products = []
     
-    cell_rect: (x0, top, x1, bottom)
-    """
-    # Crop the page to the cell
-    try:
-        # pdfplumber rect is (x0, top, x1, bottom)
-        cell_crop = page.crop(cell_rect)
+    for table in tables:
+        table_data = table.rows
         
-        # Extract words with font info
-        words = cell_crop.extract_words(extra_attrs=['fontname'])
+        # Price column: number format decided once per table, then parsed in one pass
+        price_cells = [row[3] if len(row) > 3 else None for row in table_data]
+        price_format = prices.detect_format(price_cells)
+        column_prices = prices.parse_price_column(price_cells, price_format)
         
-        brand_parts = []
-        for w in words:
-            text = w['text']
-            font = w['fontname'].lower()
+        for row_idx, row_data in enumerate(table_data):
+            clean_row = [c for c in row_data if c and c.strip()]
             
-            # Check criteria
-            is_bold = 'bold' in font or 'black' in font
-            is_upper = text.isupper()
-            # Ignore numbers or small tokens if needed, but User said "Bold AND UPPER".
-            # Sometimes brands have numbers like "3M". 
+            # Less than 3 valid items? Likely invalid
+            if len(clean_row) < 3: continue
             
-            if is_bold and is_upper:
-                brand_parts.append(text)
-        
-        if brand_parts:
-            return " ".join(brand_parts)
+            # MAPPING based on User feedback:
+            # Raw Row often has empty cells.
+            # e.g. ["W123", "Product Name...", "50", "12.00"]
+            # If some are empty, indices shift in `clean_row`.
+            # But `row_data` preserves Structure (None for empty).
             
-    except Exception:
-        pass # Cropping might fail if rect is invalid
-        
-    return "Generic" # Default
+            # We expect roughly 4 columns in the visual table.
+            # Let's rely on `row_data` indices if possible, or mapping clean_row.
+            
+            # 1. CODE (Always Col 0)
+            code = row_data[0]
+            if not code: code = clean_row[0] # Fallback
+            if not code or code.lower() in ['código', 'codigo', 'code']: continue
+            
+            # 2. PRICE
+            # Col 4 (index 3) is Price, parsed above for the whole column.
+            # Col 3 (index 2) is Ignore (Xbulto). Fallback: last non-empty cell.
+            cost_price = column_prices[row_idx] or 0.0
+            if cost_price == 0.0 and len(clean_row) > 0:
+                cost_price = prices.parse_price(clean_row[-1], price_format) or 0.0
+                    
+            if cost_price == 0.0:
+                print(f"[WARN] Failed to parse price for CODE: {code}. Raw Row: {clean_row}")
+            
+            # 3. CONTENT (Col 1)
+            raw_content = ""
+            
+            if len(row_data) > 1 and row_data[1]:
+                raw_content = row_data[1].replace('\n', ' ').strip()
+            else:
+                 # Fallback if row_data[1] is None?? Unlikely for a valid row
+                 continue
+
+            # 4. PARSING CONTENT
+            # Format: "Name TYPE Brand Description"
+            # - Brand: Extract via Bold Style
+            brand = table.brand(row_idx)
+            
+            # Remove Brand from content string to simplify parsing
+            # (Simple string replace, might correspond to exact substring)
+            if brand != "Generic":
+                # Case insensitive replace?
+                pattern = re.compile(re.escape(brand), re.IGNORECASE)
+                content_minus_brand = pattern.sub("", raw_content).strip()
+            else:
+                content_minus_brand = raw_content
+                
+            # Split Name vs Type vs Description
+            # User: "Name is first... Type is UPPERCASE... Description has numbers"
+            tokens = content_minus_brand.split()
+            
+            name_parts = []
+            type_parts = []
+            desc_parts = []
+            
+            # Heuristic State Machine being simple:
+            # 1. Accumulate Name until we hit an ALL-CAPS word (Type)?
+            #    But Name itself might be "ASIENTO" (all caps).
+            #    User ex: "Asiento NENA 14/16..." -> Name=Asiento, Type=NENA
+            #    User ex: "Asiento freestyle..." -> Type is Uppercase? "freestyle" is lower.
+            #    User said: "type (MTB, freestyle, etc.) always in uppercase"
+            #    So "FREESTYLE" would be type.
+            
+            # Let's try:
+            # First word is always Name?
+            # Then look for Type-like Uppercase words.
+            # The rest is Description.
+            
+            if not tokens:
+                final_name = "Unknown"
+                category = "Generic"
+                description = ""
+            else:
+                # Assumed Name = First Word + maybe more?
+                # Let's treat valid Categories as Upper Case words found early.
+                
+                # Simplistic approach:
+                # Name = First word
+                # Rest = Scan for Upper Case -> Category
+                # Everything else -> Description
+                
+                final_name = tokens[0] # "Asiento"
+                category_found = []
+                remaining_tokens = tokens[1:]
+                
+                desc_tokens = []
+                
+                for t in remaining_tokens:
+                    # Uppercase and length > 2 (avoid 'A', 'Y', 'X' noise?)
+                    # User said "always in uppercase". 
+                    # "NENA", "KALF" (Wait, KALF might be Brand?)
+                    # If we extracted Brand separately, KALF might be gone.
+                    # If Brand wasn't bold, it might still be here.
+                    
+                    if t.isupper() and len(t) > 1 and not any(c.isdigit() for c in t):
+                        category_found.append(t)
+                    else:
+                        desc_tokens.append(t)
+                        
+                if category_found:
+                    category = " ".join(category_found)
+                else:
+                    category = "Generic"
+                
+                if desc_tokens:
+                    description = " ".join(desc_tokens)
+                else:
+                    description = ""
+                    
+                # If the name is just one word, maybe append if description looks like text?
+                # User wants separate columns.
+            
+            page_products.append({
+                'code': code.strip(),
+                'name': final_name,
+                'brand': brand,
+                'category': category,
+                'description': description,
+                'cost_price': cost_price,
+                'image_path': None # Computed later
+            })
 
-def process_data_pdf(pdf_path):
+    return page_products
+
+# Bump whenever the Phase 1 output for the same PDF can change (table
+# mapping, brand/category heuristics, price parsing): cached pages are keyed
+# on it, so older results are never reused
+PHASE1_PARSER_VERSION = 1
+
+def iter_pdf_products(pdf_path, use_cache=True, backend=None, low_memory=False):
+    """
+    Phase 1 as a stream: yields (page_no, page_count, products) page by page,
+    in page order, cached pages included. Nothing but the current page is
+    kept by the parser, so callers that consume pages as they come (instead
+    of building one list) parse any size of PDF in bounded memory.
+    low_memory: also flush the backend's document caches after every page.
+    """
+    backend = backend or pdf_backends.DEFAULT_BACKEND
+    iter_pages = pdf_backends.get_backend(backend)
+
+    pdf_hash = None
+    page_count, cached_pages = None, {}
+    # Backends may differ slightly, so each one has its own cache entries
+    cache_version = f"{PHASE1_PARSER_VERSION}:{backend}"
+    if use_cache:
+        with timer("etl.phase1.cache_lookup"):
+            pdf_hash = pdf_cache.file_hash(pdf_path)
+            page_count, cached_pages = pdf_cache.load(pdf_hash, cache_version)
+
+    if page_count is not None and len(cached_pages) == page_count:
+        print(f"[Phase 1] All {page_count} pages found in cache, skipping PDF parsing")
+        for i in sorted(cached_pages):
+            yield i, page_count, cached_pages[i]
+        return
+
+    pending_cached = sorted(cached_pages)
+    for i, total_pages, tables in iter_pages(pdf_path, skip_pages=cached_pages, low_memory=low_memory):
+        # Cached pages before this one go out first, to keep page order
+        while pending_cached and pending_cached[0] < i:
+            j = pending_cached.pop(0)
+            yield j, total_pages, cached_pages.pop(j)
+        print(f"[Phase 1] Processing Page {i+1}/{total_pages}...")
+        products = _extract_page(tables)
+        if use_cache:
+            # Stored page by page so an interrupted import keeps what it parsed
+            pdf_cache.store_page(pdf_hash, cache_version, total_pages, i, products)
+        yield i, total_pages, products
+    for j in pending_cached:
+        yield j, page_count, cached_pages.pop(j)
+
+    if use_cache:
+        pdf_cache.evict()
+
+@timed("etl.phase1.process_data_pdf")
+def process_data_pdf(pdf_path, use_cache=True, backend=None, low_memory=False):
     """
     Parses the Text-PDF with strict 4-column layout:
     Col 0: Code
     Col 1: Content (Name TYPE BRAND Description)
     Col 2: Xbulto (Ignore)
     Col 3: Price
+    
+    Each page's result is cached by PDF content hash (see pdf_cache.py), so
+    re-importing the same file skips table detection for the cached pages.
+    backend: extraction backend name from pdf_backends.BACKENDS (default pdfplumber).
+    low_memory: flush parser caches after every page (see iter_pdf_products).
     """
+    backend = backend or pdf_backends.DEFAULT_BACKEND
     extracted_products = []
     
-    print(f"[Phase 1] Parsing PDF: {pdf_path}")
+    print(f"[Phase 1] Parsing PDF: {pdf_path} (backend: {backend}{', low memory' if low_memory else ''})")
     
-    with pdfplumber.open(pdf_path) as pdf:
-        total_pages = len(pdf.pages)
-        
-        for i, page in enumerate(pdf.pages):
-            if i % 1 == 0: print(f"[Phase 1] Processing Page {i+1}/{total_pages}...")
-            
-            # Find tables
-            tables = page.find_tables()
-            
-            for table in tables:
-                table_data = table.extract()
-                table_rows = table.rows
-                
-                for row_idx, row_data in enumerate(table_data):
-                    clean_row = [c for c in row_data if c and c.strip()]
-                    
-                    # Less than 3 valid items? Likely invalid
-                    if len(clean_row) < 3: continue
-                    
-                    # MAPPING based on User feedback:
-                    # Raw Row often has empty cells.
-                    # e.g. ["W123", "Product Name...", "50", "12.00"]
-                    # If some are empty, indices shift in `clean_row`.
-                    # But `row_data` preserves Structure (None for empty).
-                    
-                    # We expect roughly 4 columns in the visual table.
-                    # Let's rely on `row_data` indices if possible, or mapping clean_row.
-                    
-                    # 1. CODE (Always Col 0)
-                    code = row_data[0]
-                    if not code: code = clean_row[0] # Fallback
-                    if not code or code.lower() in ['código', 'codigo', 'code']: continue
-                    
-                    # 2. PRICE (Heuristic Strategy)
-                    # User states: Col 4 (index 3) is Price. Col 3 (index 2) is Ignore (Xbulto).
-                    # We will try to fetch from Index 3 first. If not, scan backwards.
-                    
-                    cost_price = 0.0
-                    
-                    def parse_price_str(s):
-                        if not s: return None
-                        # Remove Currency symbol and whitespace
-                        s_clean = s.replace('$', '').strip()
-                        if not s_clean: return None
-                        
-                        # Handle formats:
-                        # 1.234,56 (AR/EU) -> remove dots, replace comma with dot
-                        # 1,234.56 (US) -> remove comma, keep dot (Less likely but possible)
-                        # Simple Heuristic: 
-                        # If matches ^[\d]+$ (Int) -> OK
-                        # If matches ^[\d\.]+,[\d]+$ (AR) -> 1234.56
-                        
-                        # Aggressive cleaning for standard AR usage:
-                        # Remove ALL spaces
-                        s_clean = s_clean.replace(' ', '')
-                        
-                        # Replace . with nothing (thousands)
-                        # Replace , with . (decimal)
-                        # BUT be careful if it is 123.45 (US style simple float) and no thousands.
-                        # Conflict: 1.200 (1200) vs 1.2 (1.20).
-                        # Context: Prices usually > 1?
-                        
-                        # Let's try standard replace first
-                        try_ar = s_clean.replace('.', '').replace(',', '.')
-                        try:
-                            return float(try_ar)
-                        except:
-                            pass
-                            
-                        # Try direct float (US style)
-                        try:
-                            return float(s_clean)
-                        except:
-                            return None
-
-                    # A. Try strict Column 3 (4th column)
-                    if len(row_data) > 3:
-                        p_val = parse_price_str(row_data[3])
-                        if p_val is not None:
-                            cost_price = p_val
-                            
-                    # B. If failed, try last item of clean_row
-                    if cost_price == 0.0 and len(clean_row) > 0:
-                        p_val = parse_price_str(clean_row[-1])
-                        if p_val is not None:
-                            cost_price = p_val
-                            
-                    if cost_price == 0.0:
-                        print(f"[WARN] Failed to parse price for CODE: {code}. Raw Row: {clean_row}")
-                    
-                    # 3. CONTENT (Col 1)
-                    raw_content = ""
-                    content_cell_rect = None
-                    
-                    if len(row_data) > 1 and row_data[1]:
-                        raw_content = row_data[1].replace('\n', ' ').strip()
-                        # Get rect for Brand extraction
-                        if row_idx < len(table_rows) and len(table_rows[row_idx].cells) > 1:
-                            content_cell_rect = table_rows[row_idx].cells[1]
-                    else:
-                         # Fallback if row_data[1] is None?? Unlikely for a valid row
-                         continue
-
-                    # 4. PARSING CONTENT
-                    # Format: "Name TYPE Brand Description"
-                    # - Brand: Extract via Bold Style
-                    brand = "Generic"
-                    if content_cell_rect:
-                        brand = extract_brand_from_cell(page, content_cell_rect)
-                    
-                    # Remove Brand from content string to simplify parsing
-                    # (Simple string replace, might correspond to exact substring)
-                    if brand != "Generic":
-                        # Case insensitive replace?
-                        pattern = re.compile(re.escape(brand), re.IGNORECASE)
-                        content_minus_brand = pattern.sub("", raw_content).strip()
-                    else:
-                        content_minus_brand = raw_content
-                        
-                    # Split Name vs Type vs Description
-                    # User: "Name is first... Type is UPPERCASE... Description has numbers"
-                    tokens = content_minus_brand.split()
-                    
-                    name_parts = []
-                    type_parts = []
-                    desc_parts = []
-                    
-                    # Heuristic State Machine being simple:
-                    # 1. Accumulate Name until we hit an ALL-CAPS word (Type)?
-                    #    But Name itself might be "ASIENTO" (all caps).
-                    #    User ex: "Asiento NENA 14/16..." -> Name=Asiento, Type=NENA
-                    #    User ex: "Asiento freestyle..." -> Type is Uppercase? "freestyle" is lower.
-                    #    User said: "type (MTB, freestyle, etc.) always in uppercase"
-                    #    So "FREESTYLE" would be type.
-                    
-                    # Let's try:
-                    # First word is always Name?
-                    # Then look for Type-like Uppercase words.
-                    # The rest is Description.
-                    
-                    if not tokens:
-                        final_name = "Unknown"
-                        category = "Generic"
-                        description = ""
-                    else:
-                        # Assumed Name = First Word + maybe more?
-                        # Let's treat valid Categories as Upper Case words found early.
-                        
-                        # Simplistic approach:
-                        # Name = First word
-                        # Rest = Scan for Upper Case -> Category
-                        # Everything else -> Description
-                        
-                        final_name = tokens[0] # "Asiento"
-                        category_found = []
-                        remaining_tokens = tokens[1:]
-                        
-                        desc_tokens = []
-                        
-                        for t in remaining_tokens:
-                            # Uppercase and length > 2 (avoid 'A', 'Y', 'X' noise?)
-                            # User said "always in uppercase". 
-                            # "NENA", "KALF" (Wait, KALF might be Brand?)
-                            # If we extracted Brand separately, KALF might be gone.
-                            # If Brand wasn't bold, it might still be here.
-                            
-                            if t.isupper() and len(t) > 1 and not any(c.isdigit() for c in t):
-                                category_found.append(t)
-                            else:
-                                desc_tokens.append(t)
-                                
-                        if category_found:
-                            category = " ".join(category_found)
-                        else:
-                            category = "Generic"
-                        
-                        if desc_tokens:
-                            description = " ".join(desc_tokens)
-                        else:
-                            description = ""
-                            
-                        # If the name is just one word, maybe append if description looks like text?
-                        # User wants separate columns.
-                    
-                    extracted_products.append({
-                        'code': code.strip(),
-                        'name': final_name,
-                        'brand': brand,
-                        'category': category,
-                        'description': description,
-                        'cost_price': cost_price,
-                        'image_path': None # Computed later
-                    })
-
-    print(f"[Phase 1] Completed. Found {len(extracted_products)} products.")
+    for _, _, products in iter_pdf_products(pdf_path, use_cache, backend, low_memory):
+        extracted_products.extend(products)
+
+    peak = peak_rss_mb()
+    peak_info = f" Peak RSS {peak:.0f} MB." if peak is not None else ""
+    print(f"[Phase 1] Completed. Found {len(extracted_products)} products.{peak_info}")
     return extracted_products
 
 # ==============================================================================
 # PHASE 2: The Image Skin (Web Scraping)
 # ==============================================================================
 
-def scrape_product_images(product_list, progress_callback=None):
+# Phase 2 runs highest-priority products first, so a run cut short by the
+# time budget has fetched the images cashiers actually look at:
+#   score = velocity * units sold per day (last SCRAPE_VELOCITY_DAYS)
+#         + in_stock (stock > 0) + missing_image (no usable image in the DB yet)
+# Ties keep PDF order.
+SCRAPE_PRIORITY_WEIGHTS = {'velocity': 10.0, 'in_stock': 5.0, 'missing_image': 3.0}
+SCRAPE_VELOCITY_DAYS = 30
+
+def scrape_priority(units_per_day, stock_quantity, has_image):
+    w = SCRAPE_PRIORITY_WEIGHTS
+    return (w['velocity'] * units_per_day
+            + (w['in_stock'] if (stock_quantity or 0) > 0 else 0.0)
+            + (w['missing_image'] if not has_image else 0.0))
+
+@timed("etl.phase2.build_queue")
+def build_scrape_queue(product_list, indices=None):
     """
-    Iterates through products, searches web, downloads image.
-    Updates the 'image_path' key in the product dicts.
+    Heap of (-score, pdf_index) for the products at `indices` (default: all),
+    scored from the catalog and the sales summary. Pop with heapq.heappop.
+    """
+    reports.refresh_sales_summary()
+    velocity = reports.get_sales_velocity(SCRAPE_VELOCITY_DAYS)
+    catalog = get_image_status()
+    if indices is None:
+        indices = range(len(product_list))
+
+    queue = []
+    for i in indices:
+        code = product_list[i]['code']
+        stock_quantity, has_image = catalog.get(code, (0, False))
+        queue.append((-scrape_priority(velocity.get(code, 0.0), stock_quantity, has_image), i))
+    heapq.heapify(queue)
+    return queue
+
+def _image_strainer():
+    from bs4 import SoupStrainer
+    # Regex on the class attribute: matches multi-class elements on every bs4 version
+    classes = "|".join(re.escape(c) for c in IMAGE_CONTAINER_CLASSES)
+    return SoupStrainer(class_=re.compile(rf"(^|\s)({classes})(\s|$)"))
+
+def find_image_url(html):
+    """src (or lazy-load data-src) of the first product image in a search results page, or None."""
+    from bs4 import BeautifulSoup  # ETL-only dependency, loaded on first use
+
+    soup = BeautifulSoup(html, 'html.parser', parse_only=_image_strainer())
+    for selector in IMAGE_SELECTORS:
+        img_tag = soup.select_one(selector)
+        if img_tag:
+            return img_tag.get('src') or img_tag.get('data-src') or ""
+    return None
+
+def download_image(session, img_url, local_abs_path, max_bytes=MAX_IMAGE_BYTES):
+    """
+    Stream an image to local_abs_path through a .part file, renamed into
+    place only when complete. Returns None on success or the reason it was
+    rejected (HTTP status, not an image, too large).
+    """
+    part_path = local_abs_path + ".part"
+    with session.get(img_url, headers=HEADERS, timeout=10, stream=True) as response:
+        if response.status_code != 200:
+            return f"Image HTTP {response.status_code}"
+        content_type = response.headers.get('Content-Type', '')
+        if not content_type.startswith('image/'):
+            return f"Not an image ({content_type or 'no content type'})"
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            return f"Image too large ({int(declared)} bytes)"
+
+        size = 0
+        try:
+            with open(part_path, "wb") as f:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+                    size += len(chunk)
+                    # Content-Length may be missing or wrong: count what arrives
+                    if size > max_bytes:
+                        raise ValueError(f"Image too large (over {max_bytes} bytes)")
+                    f.write(chunk)
+            os.replace(part_path, local_abs_path)
+        except ValueError as e:
+            os.remove(part_path)
+            return str(e)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+    return None
+
+def _fetch_product_image(code, local_abs_path, missing_log, session=None):
+    """Search the supplier site for `code` and save its image. True if saved."""
+    import requests  # ETL-only dependency, loaded on first use
+    session = session or requests
+
+    # 2. Construct Search URL
+    url = SEARCH_TEMPLATE.format(CODE=code)
+    
+    try:
+        # 3. Request
+        print(f"[DEBUG] Web request for CODE: {code} -> {url}")
+        with timer("etl.phase2.search_request"):
+            response = session.get(url, headers=HEADERS, timeout=10)
+        with timer("etl.phase2.delay"):
+            time.sleep(1) # Respectful delay
+        
+        if response.status_code == 200:
+            # 4. Extract Image URL
+            with timer("etl.phase2.html_parse"):
+                img_url = find_image_url(response.text)
+
+            if img_url:
+                # Download Image
+                print(f"[DEBUG] Downloading image for CODE: {code} from {img_url}")
+                with timer("etl.phase2.image_download"):
+                    rejected = download_image(session, img_url, local_abs_path)
+                if rejected is None:
+                    print(f"[INFO] Downloaded image for CODE: {code}")
+                    return True
+                print(f"[WARN] {rejected} for CODE: {code}")
+                missing_log.write(f"{code}: {rejected}\n")
+            elif img_url == "":
+                 print(f"[WARN] Img tag found but no src for CODE: {code}")
+                 missing_log.write(f"{code}: Img tag found but no src\n")
+            else:
+                print(f"[WARN] No image selector matched for CODE: {code}")
+                missing_log.write(f"{code}: No image selector matched\n")
+        else:
+            print(f"[ERROR] HTTP {response.status_code} for CODE: {code}")
+            missing_log.write(f"{code}: HTTP {response.status_code}\n")
+            
+    except Exception as e:
+        print(f"[ERROR] Exception processing {code}: {e}")
+        missing_log.write(f"{code}: Exception {e}\n")
+    return False
+
+@timed("etl.phase2.scrape_product_images")
+def scrape_product_images(product_list, progress_callback=None, time_budget=None):
+    """
+    Searches the web and downloads a missing image per product, highest
+    priority first (see build_scrape_queue).
+    Updates the 'image_path' key in the product dicts, and sets
+    'image_verified' on the ones whose image was downloaded (and validated)
+    in this run; files already in static/ are not checked here.
     
     progress_callback: function(current, total) for UI updates.
+    time_budget: seconds; when spent, the remaining products are left for
+    the next run (image_path None, so the DB keeps what it had).
     """
     total = len(product_list)
     print(f"[Phase 2] Starting Web Scraping including 1s delay (Total: {total})...")
     
-    with open(MISSING_IMAGES_LOG, "w") as missing_log:
-        for i, product in enumerate(product_list):
+    # 1. Images we already have locally need no request
+    to_fetch = []
+    for i, product in enumerate(product_list):
+        filename = config.image_filename(product['code'])
+        if os.path.exists(os.path.join(DOWNLOADS_DIR, filename)):
+            product['image_path'] = f"{config.STATIC_DIR_NAME}/{filename}"
+        else:
+            product['image_path'] = None
+            to_fetch.append(i)
+        product['image_verified'] = False
+    done = total - len(to_fetch)
+    print(f"[Phase 2] {done} images already local, {len(to_fetch)} to fetch")
+    if progress_callback: progress_callback(done, total)
+
+    queue = build_scrape_queue(product_list, to_fetch)
+    import requests  # ETL-only dependency, loaded on first use
+    start = time.perf_counter()
+    # One session: the search and image requests reuse the same connections
+    with requests.Session() as session, open(MISSING_IMAGES_LOG, "w") as missing_log:
+        while queue:
+            if time_budget is not None and time.perf_counter() - start >= time_budget:
+                print(f"[Phase 2] Time budget of {time_budget}s reached, {len(queue)} products left for the next run")
+                for _, i in queue:
+                    missing_log.write(f"{product_list[i]['code']}: Skipped (time budget)\n")
+                break
+            neg_score, i = heapq.heappop(queue)
+            product = product_list[i]
             code = product['code']
-            filename = f"{code.replace('/','-')}.jpg"
+            filename = config.image_filename(code)
             # Absolute path for saving file
             local_abs_path = os.path.join(DOWNLOADS_DIR, filename)
-            # Relative path for Database (portable)
-            db_rel_path = f"{config.STATIC_DIR_NAME}/{filename}"
-
-            print(f"[DEBUG] Processing {i}/{total} - Code: {code}")
 
-            # 1. Check if we already have it locally
-            if os.path.exists(local_abs_path):
-                print(f"[DEBUG] Image already exists locally for CODE: {code}, skipping download")
-                product['image_path'] = db_rel_path
-                if progress_callback: progress_callback(i, total)
-                continue
-
-            # report progress
+            print(f"[DEBUG] Processing {done}/{total} - Code: {code} (priority {-neg_score:.1f})")
             if progress_callback:
-                progress_callback(i, total)
-            elif i % 10 == 0:
-                print(f"[INFO] Scraping {i}/{total} - Code: {code}")
-            
-            # 2. Construct Search URL
-            url = SEARCH_TEMPLATE.format(CODE=code)
-            
-            try:
-                # 3. Request
-                print(f"[DEBUG] Web request for CODE: {code} -> {url}")
-                response = requests.get(url, headers=HEADERS, timeout=10)
-                time.sleep(1) # Respectful delay
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # 4. Extract Image URL
-                    # ADAPT SELECTOR HERE based on site inspection.
-                    img_tag = soup.select_one("article.product-miniature div.thumbnail-container img")
-                    
-                    # Fallback selectors if site is different
-                    if not img_tag:
-                        img_tag = soup.select_one(".product_img_link img") # Older PS
-                    if not img_tag:
-                         img_tag = soup.select_one(".product-image img")
-                         
-                    if img_tag:
-                        img_url = img_tag.get('src') or img_tag.get('data-src')
-                        
-                        # Download Image
-                        if img_url:
-                            print(f"[DEBUG] Downloading image for CODE: {code} from {img_url}")
-                            img_data = requests.get(img_url, headers=HEADERS, timeout=10).content
-                            
-                            with open(local_abs_path, "wb") as f:
-                                f.write(img_data)
-                                
-                            product['image_path'] = db_rel_path
-                            print(f"[INFO] Downloaded image for CODE: {code}")
-                        else:
-                             print(f"[WARN] Img tag found but no src for CODE: {code}")
-                             missing_log.write(f"{code}: Img tag found but no src\n")
-                    else:
-                        print(f"[WARN] No image selector matched for CODE: {code}")
-                        missing_log.write(f"{code}: No image selector matched\n")
-                else:
-                    print(f"[ERROR] HTTP {response.status_code} for CODE: {code}")
-                    missing_log.write(f"{code}: HTTP {response.status_code}\n")
-                    
-            except Exception as e:
-                print(f"[ERROR] Exception processing {code}: {e}")
-                missing_log.write(f"{code}: Exception {e}\n")
-                
-            # Default missing path
-            if 'image_path' not in product:
-                product['image_path'] = None
+                progress_callback(done, total)
+            elif done % 10 == 0:
+                print(f"[INFO] Scraping {done}/{total} - Code: {code}")
+
+            if _fetch_product_image(code, local_abs_path, missing_log, session):
+                # Relative path for Database (portable)
+                product['image_path'] = f"{config.STATIC_DIR_NAME}/{filename}"
+                product['image_verified'] = True
+            done += 1
 
     if progress_callback: progress_callback(total, total)
     print("[Phase 2] Completed.")
@@ -377,66 +476,112 @@ def scrape_product_images(product_list, progress_callback=None):
 # PHASE 3: DB Assembly
 # ==============================================================================
 
-def run_etl_pipeline(pdf_path, progress_callback=None):
+@timed("etl.run_etl_pipeline")
+def run_etl_pipeline(pdf_path, progress_callback=None, use_cache=True, backend=None, low_memory=False,
+                     scrape_budget=None):
     """
     Master function to run Phase 1 (PDF) + Phase 2 (Scrape) + Phase 3 (DB).
     """
     # Phase 1
-    products = process_data_pdf(pdf_path)
+    products = process_data_pdf(pdf_path, use_cache=use_cache, backend=backend, low_memory=low_memory)
     
     # Phase 2
-    products = scrape_product_images(products, progress_callback)
+    products = scrape_product_images(products, progress_callback, time_budget=scrape_budget)
     
     # Phase 3
     added_count = 0
     print(f"[Phase 3] Updating Database with {len(products)} items...")
-    for i, p in enumerate(products):
-        print(f"[DEBUG] DB Sync {i}/{len(products)} - Code: {p['code']}")
+    # Compared against the catalog, so it must run before the upserts below
+    with timer("etl.phase3.price_history"):
+        changed = record_price_changes(products)
+    print(f"[Phase 3] {changed} price changes recorded in price_history")
+    with timer("etl.phase3.db_sync"):
+        for i, p in enumerate(products):
+            print(f"[DEBUG] DB Sync {i}/{len(products)} - Code: {p['code']}")
         
-        if add_product(
-            code=p['code'],
-            name=p['name'],
-            category=p['category'],
-            brand=p['brand'],
-            cost_price=p['cost_price'],
-            image_path=p['image_path'],
-            description=p.get('description', '')
-        ):
-            added_count += 1
-            print(f"[INFO] DB Insert/Update Success: {p['code']}")
-        else:
-             print(f"[WARN] DB Insert/Update Failed/Skipped: {p['code']}")
+            if add_product(
+                code=p['code'],
+                name=p['name'],
+                category=p['category'],
+                brand=p['brand'],
+                cost_price=p['cost_price'],
+                image_path=p['image_path'],
+                description=p.get('description', ''),
+                image_verified=p.get('image_verified', False)
+            ):
+                added_count += 1
+                print(f"[INFO] DB Insert/Update Success: {p['code']}")
+            else:
+                 print(f"[WARN] DB Insert/Update Failed/Skipped: {p['code']}")
             
     print(f"[Phase 3] Done. Added/Updated {added_count} records.")
     return added_count
 
 # ==============================================================================
-# SALES LOGIC (Unchanged)
+# SALES LOGIC
 # ==============================================================================
-def process_sale_transaction(cart_items):
+# Checkout: stock through the reservation system, sale row in sales_log, text
+# log through the daily journal, report aggregates folded in.
+@timed("pos.process_sale_transaction")
+def process_sale_transaction(cart_items, till_id=None):
+    """
+    Record a sale. With a till_id the stock is taken through the reservation
+    system (atomic check against other tills' holds); ValueError is raised
+    and nothing is recorded if some item is no longer available.
+    """
     total_value = sum(item['quantity'] * item['sale_price'] for item in cart_items)
     sale_timestamp = datetime.datetime.now()
-    sale_number = get_next_sale_number()
-    
-    for item in cart_items:
-        update_product(item['code'], stock_delta=-item['quantity'])
     
-    ts_str = sale_timestamp.strftime("%Y%m%d-%H%M%S")
-    filename = f"venta_{sale_number}_{ts_str}.log"
-    filepath = os.path.join(LOG_DIR, filename)
-    
-    log_content = []
+    if till_id is not None:
+        shortages = reservations.commit_sale(till_id, cart_items)
+        if shortages:
+            detail = ", ".join(f"{code} (disponible: {available})" for code, available in shortages)
+            raise ValueError(f"Stock insuficiente: {detail}")
+    else:
+        for item in cart_items:
+            update_product(item['code'], stock_delta=-item['quantity'])
+
+    # Capture cost at time of sale so margin reports survive later price imports
+    sold_items = []
     for item in cart_items:
-        line = f"{item['name']}, {item.get('brand','N/A')}, {item['code']}, {item['quantity']}, {item['sale_price']}"
-        log_content.append(line)
-    
+        sold = dict(item)
+        if sold.get('cost_price') is None:
+            product = get_product(item['code'])
+            sold['cost_price'] = product['cost_price'] if product else None
+        sold_items.append(sold)
+
+    items_json = json.dumps(sold_items)
+    sale_number = log_sale_db(total_value, items_json)
+
+    # Text log goes to the daily journal via the background writer;
+    # legacy venta_*.log files are produced on demand by sales_journal.export_legacy_logs
+    journal_file = None
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write("\n".join(log_content))
+        journal_file = sales_journal.get_journal().append({
+            'sale_number': sale_number,
+            'timestamp': sale_timestamp.isoformat(timespec='seconds'),
+            'total': total_value,
+            'items': [
+                {
+                    'name': item['name'],
+                    'brand': item.get('brand', 'N/A'),
+                    'code': item['code'],
+                    'quantity': item['quantity'],
+                    'sale_price': item['sale_price']
+                }
+                for item in cart_items
+            ]
+        })
     except Exception as e:
         print(f"Error logging: {e}")
 
-    items_json = json.dumps(cart_items)
-    log_sale_db(total_value, items_json)
+    # Fold this sale into the report aggregates (incremental, only new rows)
+    try:
+        reports.refresh_sales_summary()
+    except Exception as e:
+        print(f"Error updating sales summary: {e}")
     
-    return filename
+    if journal_file is None:
+        # The sale is recorded in sales_log; only the text log is missing
+        return f"venta #{sale_number} (sin registro de texto)"
+    return f"{journal_file} (venta #{sale_number})"
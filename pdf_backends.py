@@ -0,0 +1,245 @@
+import bisect
+
+from instrumentation import timed, timer
+
+# ==============================================================================
+# PHASE 1 EXTRACTION BACKENDS
+# ==============================================================================
+# A backend turns a supplier PDF into tables of raw cells; logic.py maps the
+# cells to products the same way whatever backend produced them.
+#
+# Backend interface - a generator function:
+#     iter_pages(pdf_path, skip_pages=(), low_memory=False)
+#         -> yields (page_no, page_count, tables)
+# for every page not in skip_pages, where tables is a list of ExtractedTable.
+# A page's tables are only valid until the next page is requested: backends
+# free the page's parsed objects when the generator resumes. low_memory also
+# drops the document-wide caches after every page, so memory stays flat on
+# lists of hundreds of pages at the cost of re-reading shared objects (fonts).
+#
+#   pdfplumber - pdfplumber table finder + per-cell crop for fonts (reference)
+#   pymupdf    - rebuilds the 4-column grid from the ruling lines and the text
+#                spans of PyMuPDF; brands come from the span fonts. Much faster,
+#                tied to the ruled layout of the supplier lists.
+
+DEFAULT_BACKEND = "pdfplumber"
+
+
+class ExtractedTable:
+    """
+    Cells of one table (rows of strings, None/'' for empty cells) plus the
+    bold uppercase brand of a row's content cell, computed on demand because
+    it is the expensive part for pdfplumber.
+    """
+
+    def __init__(self, rows, brand_of):
+        self.rows = rows
+        self._brand_of = brand_of
+
+    def brand(self, row_idx):
+        """Bold uppercase words of column 1 in this row, or 'Generic'."""
+        return self._brand_of(row_idx)
+
+
+def _brand_from_words(words):
+    """words: (text, fontname) pairs of one cell -> bold uppercase words or 'Generic'."""
+    brand_parts = []
+    for text, fontname in words:
+        font = fontname.lower()
+        # Bold AND uppercase. Brands may contain digits ("3M"), so no digit filter
+        if ('bold' in font or 'black' in font) and text.isupper():
+            brand_parts.append(text)
+    if brand_parts:
+        return " ".join(brand_parts)
+    return "Generic"
+
+
+# ------------------------------------------------------------------------------
+# pdfplumber
+# ------------------------------------------------------------------------------
+
+@timed("etl.phase1.extract_brand")
+def extract_brand_from_cell(page, cell_rect):
+    """
+    Scans a specific rectangular area (the Description cell) for text
+    that is BOTH Bold and UPPERCASE.
+
+    cell_rect: (x0, top, x1, bottom)
+    """
+    try:
+        # pdfplumber rect is (x0, top, x1, bottom)
+        cell_crop = page.crop(cell_rect)
+        words = cell_crop.extract_words(extra_attrs=['fontname'])
+        return _brand_from_words((w['text'], w['fontname']) for w in words)
+    except Exception:
+        return "Generic" # Cropping might fail if rect is invalid
+
+
+def _flush_pdfminer_cache(pdf):
+    """Drop pdfminer's per-document object caches (they grow with every page read)."""
+    for attr in ('_cached_objs', '_parsed_objs'):
+        cache = getattr(pdf.doc, attr, None)
+        if cache is not None:
+            cache.clear()
+
+
+def iter_pages_pdfplumber(pdf_path, skip_pages=(), low_memory=False):
+    import pdfplumber  # ETL-only dependency, loaded on first use
+
+    with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+        for page_no, page in enumerate(pdf.pages):
+            if page_no in skip_pages:
+                continue
+            with timer("etl.phase1.find_tables"):
+                found = page.find_tables()
+            tables = []
+            for table in found:
+                with timer("etl.phase1.table_extract"):
+                    rows = table.extract()
+
+                def brand_of(row_idx, page=page, table_rows=table.rows):
+                    if row_idx < len(table_rows) and len(table_rows[row_idx].cells) > 1:
+                        cell_rect = table_rows[row_idx].cells[1]
+                        if cell_rect:
+                            return extract_brand_from_cell(page, cell_rect)
+                    return "Generic"
+
+                tables.append(ExtractedTable(rows, brand_of))
+            yield page_no, page_count, tables
+            # pdfplumber keeps every visited page's layout objects alive
+            # otherwise: several MB per page of a supplier list
+            page.close()
+            if low_memory:
+                _flush_pdfminer_cache(pdf)
+
+
+# ------------------------------------------------------------------------------
+# PyMuPDF
+# ------------------------------------------------------------------------------
+# Supplier lists are ruled tables: vertical rules split the 4 columns, thin
+# rects/lines between rows split the rows. Rules are read from the page
+# drawings, every text span is dropped into the grid cell holding its centre.
+
+RULE_MAX_THICKNESS = 2.0
+EDGE_TOLERANCE = 1.5
+N_COLUMNS = 4
+PYMUPDF_REOPEN_PAGES = 50  # low_memory: reopen the document every N pages
+
+
+def _cluster(values, tolerance=EDGE_TOLERANCE):
+    """Sorted positions with near-duplicates (double-drawn rules) merged."""
+    merged = []
+    for v in sorted(values):
+        if merged and v - merged[-1] <= tolerance:
+            continue
+        merged.append(v)
+    return merged
+
+
+def _page_rules(page):
+    """(x positions of vertical rules, y positions of horizontal rules)."""
+    xs, ys = [], []
+    for drawing in page.get_drawings():
+        for item in drawing['items']:
+            if item[0] == 'l':
+                p1, p2 = item[1], item[2]
+                if abs(p1.x - p2.x) < EDGE_TOLERANCE:
+                    xs.append((p1.x + p2.x) / 2)
+                elif abs(p1.y - p2.y) < EDGE_TOLERANCE:
+                    ys.append((p1.y + p2.y) / 2)
+            elif item[0] == 're':
+                r = item[1]
+                if r.width <= RULE_MAX_THICKNESS:
+                    xs.append((r.x0 + r.x1) / 2)
+                elif r.height <= RULE_MAX_THICKNESS:
+                    ys.append((r.y0 + r.y1) / 2)
+                else:
+                    # Cell borders / row backgrounds: all four sides are edges
+                    xs.extend((r.x0, r.x1))
+                    ys.extend((r.y0, r.y1))
+    return _cluster(xs), _cluster(ys)
+
+
+def _cell_text(lines):
+    """Cell text as pdfplumber gives it: one output line per text line, single spaces."""
+    out = []
+    for spans in lines:
+        text = " ".join(word for s in spans for word in s['text'].split())
+        if text:
+            out.append(text)
+    return "\n".join(out)
+
+
+def _page_tables_pymupdf(page):
+    col_edges, row_edges = _page_rules(page)
+    if len(col_edges) < N_COLUMNS + 1 or len(row_edges) < 2:
+        return []
+    # Outermost rules frame the table; the inner ones split the columns
+    col_edges = col_edges[-(N_COLUMNS + 1):]
+
+    # cells[(row, col)] -> list of text lines, each a list of spans
+    cells = {}
+    for block in page.get_text("dict")['blocks']:
+        for line in block.get('lines', []):
+            line_cells = {}
+            for span in line['spans']:
+                x0, y0, x1, y1 = span['bbox']
+                cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+                row = bisect.bisect(row_edges, cy) - 1
+                col = bisect.bisect(col_edges, cx) - 1
+                if not (0 <= row < len(row_edges) - 1 and 0 <= col < N_COLUMNS):
+                    continue  # page header/footer, outside the grid
+                line_cells.setdefault((row, col), []).append(span)
+            for key, spans in line_cells.items():
+                cells.setdefault(key, []).append(spans)
+
+    rows = []
+    brands = []
+    for row in sorted({r for r, _ in cells}):
+        rows.append([_cell_text(cells.get((row, col), [])) or None for col in range(N_COLUMNS)])
+        content = cells.get((row, 1), [])
+        brands.append(_brand_from_words(
+            (word, span['font'])
+            for spans in content for span in spans for word in span['text'].split()
+        ))
+    return [ExtractedTable(rows, brands.__getitem__)]
+
+
+def iter_pages_pymupdf(pdf_path, skip_pages=(), low_memory=False):
+    import pymupdf  # ETL-only dependency, loaded on first use
+
+    doc = pymupdf.open(pdf_path)
+    try:
+        page_count = doc.page_count
+        parsed = 0
+        for page_no in range(page_count):
+            if page_no in skip_pages:
+                continue
+            if low_memory and parsed == PYMUPDF_REOPEN_PAGES:
+                # MuPDF keeps every parsed PDF object of the document loaded;
+                # reopening is the only way to let them go (and costs ~nothing)
+                doc.close()
+                doc = pymupdf.open(pdf_path)
+                parsed = 0
+            with timer("etl.phase1.find_tables"):
+                tables = _page_tables_pymupdf(doc[page_no])
+            parsed += 1
+            yield page_no, page_count, tables
+    finally:
+        if not doc.is_closed:
+            doc.close()
+
+
+BACKENDS = {
+    "pdfplumber": iter_pages_pdfplumber,
+    "pymupdf": iter_pages_pymupdf,
+}
+
+
+def get_backend(name=None):
+    """Backend generator by name (None = DEFAULT_BACKEND)."""
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend '{name}'. Use one of {list(BACKENDS)}")
+    return BACKENDS[name]
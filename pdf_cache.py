@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import argparse
+
+import config
+from instrumentation import timed
+
+# ==============================================================================
+# PHASE 1 PAGE CACHE
+# ==============================================================================
+# Products extracted from each PDF page, keyed by (sha256 of the file, Phase 1
+# parser version + backend, page number) and stored as zlib-compressed JSON
+# in a SQLite file of its own (config.PDF_CACHE_PATH) - not in products.db,
+# it is not business data. Re-importing the same file after a failed scrape
+# skips PDF parsing for every cached page. When the cache grows past
+# MAX_BYTES the least recently used PDFs are dropped whole.
+
+MAX_BYTES = 64 * 1024 * 1024
+# Bump on a layout change of the cache file; an older file is simply rebuilt
+CACHE_SCHEMA_VERSION = 2
+
+
+def _connect(path=None):
+    path = path or config.PDF_CACHE_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    if conn.execute('PRAGMA user_version').fetchone()[0] != CACHE_SCHEMA_VERSION:
+        conn.execute('DROP TABLE IF EXISTS pdf_pages')
+        conn.execute('''
+            CREATE TABLE pdf_pages (
+                pdf_hash TEXT NOT NULL,
+                parser_version TEXT NOT NULL,
+                page_no INTEGER NOT NULL,
+                page_count INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (pdf_hash, parser_version, page_no)
+            )
+        ''')
+        conn.execute(f'PRAGMA user_version = {CACHE_SCHEMA_VERSION}')
+        conn.commit()
+    return conn
+
+
+@timed("pdf_cache.file_hash")
+def file_hash(pdf_path, chunk_size=1024 * 1024):
+    """sha256 of the file contents (the name and mtime do not matter)."""
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@timed("pdf_cache.load")
+def load(pdf_hash, parser_version):
+    """
+    Cached pages of a PDF. Returns (page_count, {page_no: [product dicts]});
+    page_count is None when nothing is cached.
+    """
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT page_no, page_count, data FROM pdf_pages
+        WHERE pdf_hash = ? AND parser_version = ?
+    ''', (pdf_hash, parser_version))
+    rows = cursor.fetchall()
+    if rows:
+        cursor.execute('UPDATE pdf_pages SET last_used = ? WHERE pdf_hash = ? AND parser_version = ?',
+                       (time.time(), pdf_hash, parser_version))
+        conn.commit()
+    conn.close()
+
+    if not rows:
+        return None, {}
+    pages = {page_no: json.loads(zlib.decompress(data)) for page_no, _, data in rows}
+    return rows[0][1], pages
+
+
+@timed("pdf_cache.store_page")
+def store_page(pdf_hash, parser_version, page_count, page_no, products):
+    """Cache the products extracted from one page."""
+    data = zlib.compress(json.dumps(products, separators=(',', ':')).encode('utf-8'))
+    conn = _connect()
+    conn.execute('''
+        INSERT OR REPLACE INTO pdf_pages
+            (pdf_hash, parser_version, page_no, page_count, data, size, last_used)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (pdf_hash, parser_version, page_no, page_count, data, len(data), time.time()))
+    conn.commit()
+    conn.close()
+
+
+@timed("pdf_cache.evict")
+def evict(max_bytes=MAX_BYTES):
+    """Drop least recently used PDFs until the cached data fits in max_bytes. Returns PDFs dropped."""
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT pdf_hash, parser_version, SUM(size) FROM pdf_pages
+        GROUP BY pdf_hash, parser_version
+        ORDER BY MAX(last_used) DESC
+    ''')
+    kept_bytes = 0
+    dropped = []
+    for pdf_hash, parser_version, size in cursor.fetchall():
+        kept_bytes += size
+        if kept_bytes > max_bytes:
+            dropped.append((pdf_hash, parser_version))
+    if dropped:
+        cursor.executemany('DELETE FROM pdf_pages WHERE pdf_hash = ? AND parser_version = ?', dropped)
+        conn.commit()
+        # Give the space back, the cache file should not stay at its peak size
+        conn.execute('VACUUM')
+    conn.close()
+    return len(dropped)
+
+
+def clear():
+    conn = _connect()
+    conn.execute('DELETE FROM pdf_pages')
+    conn.commit()
+    conn.execute('VACUUM')
+    conn.close()
+
+
+def stats():
+    """{'pdfs', 'pages', 'bytes'} currently cached."""
+    conn = _connect()
+    pdfs, pages, size = conn.execute('''
+        SELECT COUNT(DISTINCT pdf_hash || ':' || parser_version), COUNT(*), COALESCE(SUM(size), 0)
+        FROM pdf_pages
+    ''').fetchone()
+    conn.close()
+    return {'pdfs': pdfs, 'pages': pages, 'bytes': size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the Phase 1 PDF page cache")
+    parser.add_argument("--clear", action="store_true", help="Delete every cached page")
+    parser.add_argument("--max-mb", type=float, help="Evict down to this size")
+    args = parser.parse_args()
+
+    if args.clear:
+        clear()
+    elif args.max_mb is not None:
+        print(f"Dropped {evict(int(args.max_mb * 1024 * 1024))} PDFs")
+    s = stats()
+    print(f"{config.PDF_CACHE_PATH}: {s['pdfs']} PDFs, {s['pages']} pages, {s['bytes'] / 1024:.1f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import re
+
+# ==============================================================================
+# PRICE PARSING
+# ==============================================================================
+# Supplier lists write prices as "$ 1.234,56" (AR) but some come as
+# "1,234.56" (US). Most strings are unambiguous under the strict patterns
+# below ("1.2" can only be US, "1,5" only AR); the ones that are not -
+# "1.200", "12,500" - are settled once per table column: the column takes the
+# format its unambiguous values agree on (AR when nothing decides).
+
+AR = "ar"
+US = "us"
+DEFAULT_FORMAT = AR
+
+# format -> strict pattern: grouped or plain integer part, optional decimals
+_PATTERNS = {
+    AR: re.compile(r'(?:\d{1,3}(?:\.\d{3})+|\d+)(?:,\d+)?'),
+    US: re.compile(r'(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?'),
+}
+
+def _clean(s):
+    """Drop the currency symbol and every blank (incl. NBSP from PDF text)."""
+    return ''.join(s.replace('$', '').split()) if s else ''
+
+
+def _formats_of(s):
+    """Formats under which the cleaned string is a valid number."""
+    return [fmt for fmt, pattern in _PATTERNS.items() if pattern.fullmatch(s)]
+
+
+def _convert(s, fmt):
+    if fmt == AR:
+        return float(s.replace('.', '').replace(',', '.'))
+    return float(s.replace(',', ''))
+
+
+def detect_format(values):
+    """
+    Number format of a column of price strings. Unambiguous values decide;
+    if none does, ambiguous ones lean on their separator ("1.200" reads as AR
+    thousands, "12,500" as US thousands - prices rarely carry 3 decimals).
+    DEFAULT_FORMAT on a tie.
+    """
+    votes = {AR: 0, US: 0}
+    leaning = {AR: 0, US: 0}
+    for value in values:
+        s = _clean(value)
+        if not s or s.isdigit():
+            continue
+        formats = _formats_of(s)
+        if len(formats) == 1:
+            votes[formats[0]] += 1
+        elif formats:
+            leaning[AR if '.' in s else US] += 1
+    if votes[AR] == votes[US]:
+        votes = leaning
+    if votes[US] > votes[AR]:
+        return US
+    return DEFAULT_FORMAT
+
+
+def parse_price(value, fmt=DEFAULT_FORMAT):
+    """
+    '$ 1.234,56' -> 1234.56. Ambiguous strings are read in `fmt`; a string
+    that is only valid in the other format is read in that one. None if the
+    string is not a price.
+    """
+    s = _clean(value)
+    if not s:
+        return None
+    formats = _formats_of(s)
+    if not formats:
+        return None
+    return _convert(s, fmt if fmt in formats else formats[0])
+
+
+def parse_price_column(values, fmt=None):
+    """
+    Parse a whole column of price strings (None for blanks / non-prices).
+    The format is detected from the column itself unless `fmt` is given.
+    """
+    cleaned = [_clean(v) for v in values]
+    if fmt is None:
+        fmt = detect_format(cleaned)
+    match = _PATTERNS[fmt].fullmatch
+    # Fast path: one compiled match per cell in the column's format
+    return [
+        _convert(s, fmt) if s and match(s) else parse_price(s, fmt)
+        for s in cleaned
+    ]
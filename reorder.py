@@ -0,0 +1,91 @@
+import math
+import sqlite3
+from datetime import datetime, timedelta
+
+from database import get_connection
+import reports
+
+# ==============================================================================
+# REORDER SUGGESTIONS
+# ==============================================================================
+# Sales velocity comes from the sales_summary aggregates (see reports.py), so
+# a suggestion run is one grouped query over the lookback window joined to
+# products - no sales_log scan and no per-product queries.
+#
+#   velocity       = units sold in window / lookback_days
+#   reorder_point  = velocity * (lead_time_days + safety_days)
+#   suggested qty  = velocity * (lead_time_days + safety_days + cover_days) - stock
+#
+# A product is suggested when stock_quantity <= reorder_point.
+
+DEFAULT_LOOKBACK_DAYS = 30
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_SAFETY_DAYS = 3
+DEFAULT_COVER_DAYS = 14
+
+
+def get_reorder_suggestions(lookback_days=DEFAULT_LOOKBACK_DAYS,
+                            lead_time_days=DEFAULT_LEAD_TIME_DAYS,
+                            safety_days=DEFAULT_SAFETY_DAYS,
+                            cover_days=DEFAULT_COVER_DAYS):
+    """
+    Suggested supply order lines, most urgent (fewest days of stock) first.
+    Each dict carries the supply_order keys (code, name, quantity, cost_price)
+    plus stock_quantity, velocity and reorder_point for display.
+    """
+    reports.refresh_sales_summary()
+
+    since = (datetime.now() - timedelta(days=lookback_days)).strftime("%Y-%m-%d")
+    trigger_days = lead_time_days + safety_days
+
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT p.code, p.name, p.cost_price, p.stock_quantity,
+               s.units * 1.0 / ? AS velocity
+        FROM (
+            SELECT code, SUM(units) AS units FROM sales_summary
+            WHERE day >= ? GROUP BY code
+        ) s
+        JOIN products p ON p.code = s.code
+        WHERE s.units > 0
+          AND p.stock_quantity <= s.units * 1.0 / ? * ?
+    ''', (lookback_days, since, lookback_days, trigger_days))
+    rows = cursor.fetchall()
+    conn.close()
+
+    ranked = []
+    for row in rows:
+        velocity = row['velocity']
+        stock = max(row['stock_quantity'] or 0, 0)
+        target = velocity * (trigger_days + cover_days)
+        quantity = max(1, math.ceil(target - stock))
+        # Days of cover from the unrounded velocity: a slow seller over a long
+        # lookback rounds to 0.00
+        ranked.append((stock / velocity, {
+            'code': row['code'],
+            'name': row['name'],
+            'quantity': quantity,
+            'cost_price': row['cost_price'],
+            'stock_quantity': row['stock_quantity'],
+            'velocity': round(velocity, 2),
+            'reorder_point': math.ceil(velocity * trigger_days),
+        }))
+    ranked.sort(key=lambda pair: pair[0])
+    return [suggestion for _, suggestion in ranked]
+
+
+def merge_into_supply_order(supply_order, suggestions):
+    """
+    Add suggested lines to a supply order (cart.Cart), summing quantities
+    for codes already in the order. Returns the number of lines touched.
+    """
+    for s in suggestions:
+        supply_order.add({
+            'code': s['code'],
+            'name': s['name'],
+            'quantity': s['quantity'],
+            'cost_price': s['cost_price']
+        })
+    return len(suggestions)
@@ -0,0 +1,309 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+from database import get_connection
+
+# ==============================================================================
+# SALES REPORTS
+# ==============================================================================
+# Reports never read sales_log directly. Every sale is folded once into the
+# sales_summary / sales_daily tables and report_state remembers the last
+# sales_log id that was folded in (the high-water mark). Refreshing only
+# touches the sales written since the previous refresh. Sales moved to the
+# monthly archive (sales_archive.py) keep their summary rows.
+
+HWM_KEY = "sales_summary_last_id"
+
+# SQLite strftime patterns used to bucket sales_summary.day
+PERIOD_FORMATS = {
+    "daily": "%Y-%m-%d",
+    "weekly": "%Y-W%W",
+    "monthly": "%Y-%m",
+}
+
+
+def _fold_sales(cursor, sales):
+    """
+    Add sales, (id, local day, total_amount, items_json) rows, to the
+    summary tables. The caller commits and moves the high-water mark.
+    """
+    parsed_sales = []
+    missing_cost = set()
+    for sale_id, day, total_amount, items_json in sales:
+        try:
+            items = json.loads(items_json) if items_json else []
+        except ValueError:
+            print(f"[WARN] Skipping unreadable items_json in sale {sale_id}")
+            items = []
+        parsed_sales.append((day, total_amount, items))
+        missing_cost.update(i.get('code') for i in items if i.get('cost_price') is None)
+
+    # Current cost is only a fallback for sales logged before the cost
+    # was captured at checkout
+    current_costs = {}
+    missing_cost.discard(None)
+    missing_cost = list(missing_cost)
+    for start in range(0, len(missing_cost), 500):
+        chunk = missing_cost[start:start + 500]
+        cursor.execute(
+            f"SELECT code, cost_price FROM products WHERE code IN ({','.join('?' * len(chunk))})",
+            chunk
+        )
+        current_costs.update(cursor.fetchall())
+
+    per_sku = {}
+    per_day = {}
+    for day, total_amount, items in parsed_sales:
+        tickets, revenue = per_day.get(day, (0, 0.0))
+        per_day[day] = (tickets + 1, revenue + (total_amount or 0.0))
+
+        for item in items:
+            code = item.get('code')
+            if not code:
+                continue
+            qty = item.get('quantity') or 0
+            cost_price = item.get('cost_price')
+            if cost_price is None:
+                cost_price = current_costs.get(code) or 0.0
+
+            key = (day, code)
+            agg = per_sku.get(key)
+            if agg is None:
+                agg = per_sku[key] = {
+                    'name': item.get('name'), 'brand': item.get('brand'),
+                    'units': 0, 'revenue': 0.0, 'cost': 0.0
+                }
+            agg['units'] += qty
+            agg['revenue'] += qty * (item.get('sale_price') or 0.0)
+            agg['cost'] += qty * cost_price
+
+    cursor.executemany('''
+        INSERT INTO sales_summary (day, code, name, brand, units, revenue, cost)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(day, code) DO UPDATE SET
+            name = excluded.name,
+            brand = excluded.brand,
+            units = units + excluded.units,
+            revenue = revenue + excluded.revenue,
+            cost = cost + excluded.cost
+    ''', [(day, code, a['name'], a['brand'], a['units'], a['revenue'], a['cost'])
+          for (day, code), a in per_sku.items()])
+
+    cursor.executemany('''
+        INSERT INTO sales_daily (day, tickets, revenue) VALUES (?, ?, ?)
+        ON CONFLICT(day) DO UPDATE SET
+            tickets = tickets + excluded.tickets,
+            revenue = revenue + excluded.revenue
+    ''', [(day, t, r) for day, (t, r) in per_day.items()])
+
+
+def refresh_sales_summary():
+    """
+    Fold every sale newer than the high-water mark into the summary tables.
+    Returns the number of sales processed.
+    """
+    conn = get_connection()
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    try:
+        # Cheap check without the write lock: most calls (Reports reruns) find nothing new
+        cursor.execute('SELECT (SELECT value FROM report_state WHERE name = ?), (SELECT MAX(id) FROM sales_log)',
+                       (HWM_KEY,))
+        last_id, max_id = cursor.fetchone()
+        if max_id is None or max_id <= (last_id or 0):
+            return 0
+
+        # Two tills checking out at once: the second waits here and re-reads
+        # the mark the first one wrote, so no sale is folded twice
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('SELECT value FROM report_state WHERE name = ?', (HWM_KEY,))
+        row = cursor.fetchone()
+        last_id = row[0] if row else 0
+
+        cursor.execute('''
+            SELECT id, date(sale_timestamp, 'localtime'), total_amount, items_json
+            FROM sales_log WHERE id > ? ORDER BY id
+        ''', (last_id,))
+        new_sales = cursor.fetchall()
+        if not new_sales:
+            cursor.execute('ROLLBACK')
+            return 0
+
+        _fold_sales(cursor, new_sales)
+        cursor.execute('''
+            INSERT INTO report_state (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = excluded.value
+        ''', (HWM_KEY, new_sales[-1][0]))
+
+        cursor.execute('COMMIT')
+        return len(new_sales)
+    finally:
+        # Closing with the transaction still open rolls it back
+        conn.close()
+
+
+def rebuild_sales_summary():
+    """
+    Recompute the summary tables from scratch: archived months (see
+    sales_archive.py) first, then sales_log. Returns the number of sales.
+    """
+    import sales_archive
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM sales_summary')
+        cursor.execute('DELETE FROM sales_daily')
+        cursor.execute('DELETE FROM report_state WHERE name = ?', (HWM_KEY,))
+        archived = 0
+        for month_sales in sales_archive.iter_archived_months(cursor):
+            # A sale back in sales_log (restored, re-imported) counts once, from there
+            ids = [sale[0] for sale in month_sales]
+            cursor.execute('SELECT id FROM sales_log WHERE id BETWEEN ? AND ?', (min(ids), max(ids)))
+            live = {row[0] for row in cursor.fetchall()}
+            month_sales = [(sale_id, day, total, items_json)
+                           for sale_id, _, day, total, items_json in month_sales if sale_id not in live]
+            _fold_sales(cursor, month_sales)
+            archived += len(month_sales)
+        conn.commit()
+    finally:
+        conn.close()
+    return archived + refresh_sales_summary()
+
+
+def _date_filter(column, start_date, end_date):
+    """Build a WHERE fragment for an optional [start_date, end_date] range."""
+    clauses = []
+    params = []
+    if start_date:
+        clauses.append(f"{column} >= ?")
+        params.append(str(start_date))
+    if end_date:
+        clauses.append(f"{column} <= ?")
+        params.append(str(end_date))
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+
+def get_sales_report(period="daily", start_date=None, end_date=None):
+    """
+    Sales totals per day, week or month.
+    Returns a list of dicts: period, tickets, units, revenue, cost, margin.
+    """
+    if period not in PERIOD_FORMATS:
+        raise ValueError(f"Unknown period '{period}'. Use one of {list(PERIOD_FORMATS)}")
+    fmt = PERIOD_FORMATS[period]
+    where, params = _date_filter("day", start_date, end_date)
+
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT d.period, d.tickets, COALESCE(s.units, 0) AS units,
+               d.revenue, COALESCE(s.cost, 0.0) AS cost,
+               d.revenue - COALESCE(s.cost, 0.0) AS margin
+        FROM (
+            SELECT strftime('{fmt}', day) AS period,
+                   SUM(tickets) AS tickets, SUM(revenue) AS revenue
+            FROM sales_daily {where} GROUP BY period
+        ) d
+        LEFT JOIN (
+            SELECT strftime('{fmt}', day) AS period,
+                   SUM(units) AS units, SUM(cost) AS cost
+            FROM sales_summary {where} GROUP BY period
+        ) s ON s.period = d.period
+        ORDER BY d.period
+    ''', params + params)
+    rows = cursor.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+def get_margin_by_sku(start_date=None, end_date=None, limit=None):
+    """
+    Units, revenue, cost and margin per SKU, best margin first.
+    Sale price is what the POS charged; cost is cost_price at time of sale.
+    """
+    where, params = _date_filter("day", start_date, end_date)
+    limit_sql = ""
+    if limit:
+        limit_sql = "LIMIT ?"
+        params.append(int(limit))
+
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT code, MAX(name) AS name, MAX(brand) AS brand,
+               SUM(units) AS units, SUM(revenue) AS revenue, SUM(cost) AS cost,
+               SUM(revenue) - SUM(cost) AS margin,
+               CASE WHEN SUM(revenue) > 0
+                    THEN (SUM(revenue) - SUM(cost)) * 100.0 / SUM(revenue)
+                    ELSE 0 END AS margin_pct
+        FROM sales_summary {where}
+        GROUP BY code
+        ORDER BY margin DESC
+        {limit_sql}
+    ''', params)
+    rows = cursor.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+def get_stock_turnover(days=30):
+    """
+    Stock turnover per SKU over the last `days` days.
+    Opening stock is estimated as current stock plus units sold in the window,
+    so turnover = units_sold / average_stock. days_of_cover is how long the
+    current stock lasts at the window's sales rate.
+    """
+    since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT s.code, p.name, p.brand, s.units AS units_sold,
+               p.stock_quantity
+        FROM (
+            SELECT code, SUM(units) AS units FROM sales_summary
+            WHERE day >= ? GROUP BY code
+        ) s
+        JOIN products p ON p.code = s.code
+    ''', (since,))
+    rows = cursor.fetchall()
+    conn.close()
+
+    report = []
+    for row in rows:
+        units_sold = row['units_sold'] or 0
+        stock = max(row['stock_quantity'] or 0, 0)
+        avg_stock = stock + units_sold / 2.0
+        daily_rate = units_sold / float(days)
+        report.append({
+            'code': row['code'],
+            'name': row['name'],
+            'brand': row['brand'],
+            'units_sold': units_sold,
+            'stock_quantity': row['stock_quantity'],
+            'turnover': round(units_sold / avg_stock, 2) if avg_stock > 0 else 0.0,
+            'days_of_cover': round(stock / daily_rate, 1) if daily_rate > 0 else None,
+        })
+    report.sort(key=lambda r: r['turnover'], reverse=True)
+    return report
+
+
+def get_sales_velocity(days=30):
+    """{code: units sold per day} over the last `days` days (SKUs with sales only)."""
+    since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT code, SUM(units) FROM sales_summary
+        WHERE day >= ? GROUP BY code
+    ''', (since,))
+    velocity = {code: (units or 0) / float(days) for code, units in cursor.fetchall()}
+    conn.close()
+    return velocity
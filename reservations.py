@@ -0,0 +1,192 @@
+import sys
+import time
+import argparse
+
+from database import get_connection
+from instrumentation import timed
+
+# ==============================================================================
+# STOCK RESERVATIONS
+# ==============================================================================
+# Several tills (browser sessions) can sell from the same stock. Adding to a
+# cart places a hold on the product row in stock_reservations; a till can only
+# hold what is left after the live holds of every other till. Holds expire
+# after RESERVATION_TTL_SECONDS unless the till keeps refreshing them, so an
+# abandoned cart frees its stock on its own - sweep_expired() only deletes
+# the dead rows. Checkout re-checks availability and decrements stock in the
+# same write transaction, so two tills can never sell the same last unit.
+
+RESERVATION_TTL_SECONDS = 15 * 60
+SWEEP_INTERVAL_SECONDS = 60
+
+_last_sweep = 0.0
+
+
+def _begin(conn):
+    """Switch to manual transactions and take the write lock right away."""
+    conn.isolation_level = None
+    conn.execute('BEGIN IMMEDIATE')
+
+
+def _available(cursor, session_id, code, now):
+    """Stock of `code` minus the live holds of every other till (None if unknown code)."""
+    cursor.execute('''
+        SELECT p.stock_quantity - COALESCE((
+            SELECT SUM(r.quantity) FROM stock_reservations r
+            WHERE r.code = p.code AND r.session_id != ? AND r.expires_at > ?
+        ), 0)
+        FROM products p WHERE p.code = ?
+    ''', (session_id, now, code))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+@timed("reservations.reserve")
+def reserve(session_id, code, quantity, ttl=RESERVATION_TTL_SECONDS):
+    """
+    Set this till's hold on `code` to `quantity` units (0 releases it).
+    Returns (ok, available): ok is False when other tills' holds leave less
+    than `quantity`; available is what this till could hold.
+    """
+    now = time.time()
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        _begin(conn)
+        available = _available(cursor, session_id, code, now)
+        if available is None or available < quantity:
+            conn.execute('ROLLBACK')
+            return False, max(available or 0, 0)
+        if quantity > 0:
+            cursor.execute('''
+                INSERT INTO stock_reservations (session_id, code, quantity, expires_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(session_id, code) DO UPDATE SET
+                    quantity = excluded.quantity,
+                    expires_at = excluded.expires_at
+            ''', (session_id, code, quantity, now + ttl))
+        else:
+            cursor.execute('DELETE FROM stock_reservations WHERE session_id = ? AND code = ?',
+                           (session_id, code))
+        conn.execute('COMMIT')
+        return True, available
+    finally:
+        conn.close()
+
+
+@timed("reservations.release")
+def release(session_id, code=None):
+    """Drop this till's hold on one product, or on everything when code is None."""
+    conn = get_connection()
+    if code is None:
+        conn.execute('DELETE FROM stock_reservations WHERE session_id = ?', (session_id,))
+    else:
+        conn.execute('DELETE FROM stock_reservations WHERE session_id = ? AND code = ?',
+                     (session_id, code))
+    conn.commit()
+    conn.close()
+
+
+@timed("reservations.touch")
+def touch(session_id, ttl=RESERVATION_TTL_SECONDS):
+    """Extend every hold of a till that is still active (called on each POS rerun)."""
+    conn = get_connection()
+    conn.execute('UPDATE stock_reservations SET expires_at = ? WHERE session_id = ?',
+                 (time.time() + ttl, session_id))
+    conn.commit()
+    conn.close()
+
+
+@timed("reservations.held_by_others")
+def held_by_others(session_id):
+    """{code: units} held by the other tills' live reservations."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT code, SUM(quantity) FROM stock_reservations
+        WHERE session_id != ? AND expires_at > ?
+        GROUP BY code
+    ''', (session_id, time.time()))
+    held = dict(cursor.fetchall())
+    conn.close()
+    return held
+
+
+@timed("reservations.commit_sale")
+def commit_sale(session_id, cart_items):
+    """
+    Decrement stock for a cart and drop the till's holds, atomically.
+    Nothing is written if any item exceeds the stock left after the other
+    tills' holds. Returns the shortages as a list of (code, available);
+    an empty list means the stock was taken.
+    """
+    now = time.time()
+    quantities = {}
+    for item in cart_items:
+        quantities[item['code']] = quantities.get(item['code'], 0) + item['quantity']
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        _begin(conn)
+        shortages = []
+        for code, quantity in quantities.items():
+            available = _available(cursor, session_id, code, now)
+            if available is None or available < quantity:
+                shortages.append((code, max(available or 0, 0)))
+        if shortages:
+            conn.execute('ROLLBACK')
+            return shortages
+        cursor.executemany('UPDATE products SET stock_quantity = stock_quantity - ? WHERE code = ?',
+                           [(quantity, code) for code, quantity in quantities.items()])
+        cursor.execute('DELETE FROM stock_reservations WHERE session_id = ?', (session_id,))
+        conn.execute('COMMIT')
+        return []
+    finally:
+        # Closing with the transaction still open rolls it back
+        conn.close()
+
+
+@timed("reservations.sweep_expired")
+def sweep_expired(force=False):
+    """
+    Delete expired holds. Throttled to once per SWEEP_INTERVAL_SECONDS per
+    process unless force=True. Returns the number of rows removed.
+    """
+    global _last_sweep
+    now = time.time()
+    if not force and now - _last_sweep < SWEEP_INTERVAL_SECONDS:
+        return 0
+    _last_sweep = now
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM stock_reservations WHERE expires_at <= ?', (now,))
+    removed = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clean POS stock reservations")
+    parser.add_argument("--sweep", action="store_true", help="Delete expired reservations")
+    args = parser.parse_args()
+
+    if args.sweep:
+        print(f"Removed {sweep_expired(force=True)} expired reservations")
+    conn = get_connection()
+    rows = conn.execute('''
+        SELECT session_id, code, quantity, expires_at FROM stock_reservations
+        ORDER BY expires_at
+    ''').fetchall()
+    conn.close()
+    now = time.time()
+    for session_id, code, quantity, expires_at in rows:
+        state = f"expires in {int(expires_at - now)}s" if expires_at > now else "expired"
+        print(f"  {session_id[:8]}  {code:<20} {quantity:>5}  {state}")
+    print(f"{len(rows)} reservations")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
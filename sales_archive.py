@@ -0,0 +1,297 @@
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import tarfile
+import argparse
+from datetime import datetime, timedelta
+
+import config
+import reports
+from database import get_connection
+from instrumentation import timed
+
+# ==============================================================================
+# SALES ARCHIVE
+# ==============================================================================
+# Keeps products.db and logs/ from growing forever:
+#
+# - Sales older than the retention window (whole months) move from sales_log
+#   to sales_archive, one row per month holding the month's sales as
+#   zlib-compressed JSON lines. They were folded into sales_summary /
+#   sales_daily first, so reports do not change; the sale numbers are kept
+#   (restore_month puts a month back, data_export still exports them).
+# - The pages they leave free are given back to the filesystem with
+#   PRAGMA incremental_vacuum, VACUUM_STEP_PAGES at a time, so the tills
+#   never wait for a full VACUUM. DBs created before auto_vacuum=INCREMENTAL
+#   are converted once, with one full VACUUM.
+# - Old ventas_*.jsonl journals, venta_*.log and order_*.csv files in logs/
+#   are packed into one tar.gz per kind and month under logs/archive/.
+#
+#     python sales_archive.py run [--retention-days 365] [--no-logs] [--no-vacuum]
+#     python sales_archive.py list
+#     python sales_archive.py restore 2024-03
+
+ZLIB_LEVEL = 9
+VACUUM_STEP_PAGES = 1000      # ~4 MB per incremental_vacuum step
+VACUUM_STEP_PAUSE = 0.01      # let waiting writers in between steps
+ARCHIVE_DIR_NAME = "archive"
+
+# Daily sales journals and per-sale / per-order files in logs/: kind ->
+# pattern with the date
+LOG_FILE_PATTERNS = {
+    "ventas": re.compile(r"^ventas_(\d{8})\.jsonl$"),
+    "venta": re.compile(r"^venta_\d+_(\d{8})-\d{6}\.log$"),
+    "order": re.compile(r"^order_(\d{8})-\d{6}\.csv$"),
+}
+
+
+def _cutoff_month(retention_days):
+    """First month ('YYYY-MM') that is kept: the one holding today - retention_days."""
+    return (datetime.now() - timedelta(days=retention_days)).strftime("%Y-%m")
+
+
+def _month_bounds(month):
+    """[start, end) of a local 'YYYY-MM' month as local 'YYYY-MM-DD' strings."""
+    start = datetime.strptime(month + "-01", "%Y-%m-%d")
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+def _pack(sales):
+    return zlib.compress("\n".join(json.dumps(sale) for sale in sales).encode("utf-8"), ZLIB_LEVEL)
+
+
+def _unpack(data):
+    return [tuple(json.loads(line)) for line in zlib.decompress(data).decode("utf-8").splitlines()]
+
+
+def iter_archived_months(cursor):
+    """
+    Yield each archived month's sales, oldest month first, as lists of
+    (id, sale_timestamp, local day, total_amount, items_json).
+    """
+    months = [row[0] for row in cursor.execute('SELECT month FROM sales_archive ORDER BY month').fetchall()]
+    for month in months:
+        cursor.execute('SELECT data FROM sales_archive WHERE month = ?', (month,))
+        yield _unpack(cursor.fetchone()[0])
+
+
+def list_archive():
+    """Archived months: dicts with month, sales, total_amount, first_id, last_id, size_kb."""
+    conn = get_connection()
+    try:
+        rows = conn.execute('''
+            SELECT month, sales, total_amount, first_id, last_id, LENGTH(data), archived_at
+            FROM sales_archive ORDER BY month
+        ''').fetchall()
+    finally:
+        conn.close()
+    return [{'month': m, 'sales': n, 'total_amount': total, 'first_id': first, 'last_id': last,
+             'size_kb': size / 1024.0, 'archived_at': at} for m, n, total, first, last, size, at in rows]
+
+
+@timed("archive.archive_sales")
+def archive_sales(retention_days=None):
+    """
+    Move whole months of sales older than retention_days (default
+    config.SALES_RETENTION_DAYS) into sales_archive, one transaction per
+    month. Returns {month: sales moved}.
+    """
+    retention_days = config.SALES_RETENTION_DAYS if retention_days is None else retention_days
+    # Only sales already in the report aggregates may leave sales_log
+    reports.refresh_sales_summary()
+    cutoff_start = _month_bounds(_cutoff_month(retention_days))[0]
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    moved = {}
+    try:
+        cursor.execute('SELECT value FROM report_state WHERE name = ?', (reports.HWM_KEY,))
+        row = cursor.fetchone()
+        folded_id = row[0] if row else 0
+        cursor.execute('''
+            SELECT DISTINCT strftime('%Y-%m', sale_timestamp, 'localtime') FROM sales_log
+            WHERE sale_timestamp < datetime(?, 'utc') AND id <= ?
+        ''', (cutoff_start, folded_id))
+        months = sorted(row[0] for row in cursor.fetchall() if row[0])
+
+        for month in months:
+            start, end = _month_bounds(month)
+            where = "sale_timestamp >= datetime(?, 'utc') AND sale_timestamp < datetime(?, 'utc') AND id <= ?"
+            params = (start, end, folded_id)
+            cursor.execute(f'''
+                SELECT id, sale_timestamp, date(sale_timestamp, 'localtime'), total_amount, items_json
+                FROM sales_log WHERE {where} ORDER BY id
+            ''', params)
+            sales = cursor.fetchall()
+            if not sales:
+                continue
+
+            # A month archived before (late import, restore_month) is merged
+            cursor.execute('SELECT data FROM sales_archive WHERE month = ?', (month,))
+            existing = cursor.fetchone()
+            if existing:
+                ids = {sale[0] for sale in sales}
+                sales = sorted([s for s in _unpack(existing[0]) if s[0] not in ids] + sales)
+
+            cursor.execute('''
+                INSERT INTO sales_archive (month, first_id, last_id, sales, total_amount, data, archived_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(month) DO UPDATE SET
+                    first_id = excluded.first_id, last_id = excluded.last_id, sales = excluded.sales,
+                    total_amount = excluded.total_amount, data = excluded.data,
+                    archived_at = excluded.archived_at
+            ''', (month, sales[0][0], sales[-1][0], len(sales), sum(s[3] or 0.0 for s in sales),
+                  _pack(sales), datetime.now().isoformat(timespec='seconds')))
+            cursor.execute(f'DELETE FROM sales_log WHERE {where}', params)
+            moved[month] = cursor.rowcount
+            conn.commit()
+            print(f"[INFO] Archived {moved[month]} sales of {month}")
+    finally:
+        conn.close()
+    return moved
+
+
+@timed("archive.restore_month")
+def restore_month(month):
+    """Put an archived month back into sales_log (reports are unaffected). Returns the sales restored."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT data FROM sales_archive WHERE month = ?', (month,))
+        row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"Month {month} is not archived")
+        sales = _unpack(row[0])
+        cursor.executemany('''
+            INSERT INTO sales_log (id, sale_timestamp, total_amount, items_json) VALUES (?, ?, ?, ?)
+            ON CONFLICT(id) DO NOTHING
+        ''', [(sale_id, ts, total, items_json) for sale_id, ts, _, total, items_json in sales])
+        cursor.execute('DELETE FROM sales_archive WHERE month = ?', (month,))
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"[INFO] Restored {len(sales)} sales of {month} to sales_log")
+    return len(sales)
+
+
+@timed("archive.reclaim_space")
+def reclaim_space(step_pages=VACUUM_STEP_PAGES, pause=VACUUM_STEP_PAUSE):
+    """
+    Return free pages to the filesystem in steps of step_pages.
+    Returns the number of pages released.
+    """
+    conn = get_connection()
+    conn.isolation_level = None
+    try:
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            # Older DB: the mode only changes with a full VACUUM (once)
+            print("[INFO] Converting the database to auto_vacuum=INCREMENTAL (one-time full VACUUM)...")
+            pages = conn.execute('PRAGMA page_count').fetchone()[0]
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+            released = pages - conn.execute('PRAGMA page_count').fetchone()[0]
+            print(f"[INFO] Released {released} pages")
+            return released
+        released = 0
+        while True:
+            free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if not free:
+                break
+            # executescript steps the pragma to the end (execute() frees one page)
+            conn.executescript(f'PRAGMA incremental_vacuum({min(free, step_pages)})')
+            released += min(free, step_pages)
+            if pause:
+                time.sleep(pause)
+    finally:
+        conn.close()
+    if released:
+        print(f"[INFO] Released {released} free pages")
+    return released
+
+
+@timed("archive.pack_logs")
+def pack_logs(retention_days=None, log_dir=None):
+    """
+    Pack ventas_*.jsonl / venta_*.log / order_*.csv files of months before
+    the retention window into logs/archive/<kind>_YYYY-MM.tar.gz, then delete them.
+    Returns the number of files packed.
+    """
+    retention_days = config.SALES_RETENTION_DAYS if retention_days is None else retention_days
+    log_dir = log_dir or config.LOG_DIR
+    cutoff = _cutoff_month(retention_days)
+
+    groups = {}
+    for name in os.listdir(log_dir):
+        for kind, pattern in LOG_FILE_PATTERNS.items():
+            match = pattern.match(name)
+            if match:
+                month = f"{match.group(1)[:4]}-{match.group(1)[4:6]}"
+                if month < cutoff:
+                    groups.setdefault((kind, month), []).append(name)
+    if not groups:
+        return 0
+
+    archive_dir = os.path.join(log_dir, ARCHIVE_DIR_NAME)
+    os.makedirs(archive_dir, exist_ok=True)
+    packed = 0
+    for (kind, month), names in sorted(groups.items()):
+        bundle = os.path.join(archive_dir, f"{kind}_{month}.tar.gz")
+        with tarfile.open(bundle + ".part", "w:gz") as tar:
+            if os.path.exists(bundle):
+                # tar.gz cannot be appended to: carry the earlier members over
+                with tarfile.open(bundle, "r:gz") as old:
+                    for member in old.getmembers():
+                        if member.name not in names:
+                            tar.addfile(member, old.extractfile(member))
+            for name in sorted(names):
+                tar.add(os.path.join(log_dir, name), arcname=name)
+        os.replace(bundle + ".part", bundle)
+        for name in names:
+            os.remove(os.path.join(log_dir, name))
+        packed += len(names)
+        print(f"[INFO] Packed {len(names)} files into {os.path.relpath(bundle, log_dir)}")
+    return packed
+
+
+def run(retention_days=None, logs=True, vacuum=True):
+    """The full archival job. Returns a summary dict."""
+    moved = archive_sales(retention_days)
+    summary = {'months': len(moved), 'sales': sum(moved.values()), 'files_packed': 0, 'pages_released': 0}
+    if logs:
+        summary['files_packed'] = pack_logs(retention_days)
+    if vacuum:
+        summary['pages_released'] = reclaim_space()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old sales and reclaim space")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_cmd = sub.add_parser("run", help="Archive, pack logs and reclaim space")
+    run_cmd.add_argument("--retention-days", type=int, default=config.SALES_RETENTION_DAYS)
+    run_cmd.add_argument("--no-logs", action="store_true", help="Leave logs/ alone")
+    run_cmd.add_argument("--no-vacuum", action="store_true", help="Do not reclaim free pages")
+    sub.add_parser("list", help="Archived months")
+    restore = sub.add_parser("restore", help="Put an archived month back into sales_log")
+    restore.add_argument("month", help="YYYY-MM")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        summary = run(args.retention_days, logs=not args.no_logs, vacuum=not args.no_vacuum)
+        print(f"Archived {summary['sales']} sales ({summary['months']} months), "
+              f"packed {summary['files_packed']} files, released {summary['pages_released']} pages")
+    elif args.command == "list":
+        for m in list_archive():
+            print(f"{m['month']}  {m['sales']:7d} sales  ${m['total_amount']:14,.2f}  "
+                  f"ids {m['first_id']}-{m['last_id']}  {m['size_kb']:8.0f} kB")
+    elif args.command == "restore":
+        restore_month(args.month)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import os
+import glob
+import json
+import queue
+import atexit
+import argparse
+import datetime
+import threading
+
+import config
+
+# ==============================================================================
+# SALES JOURNAL
+# ==============================================================================
+# Append-only JSONL journal of POS sales, one file per day:
+#   logs/ventas_YYYYMMDD.jsonl
+# Checkout only enqueues the record. A background writer thread drains the
+# bounded queue in batches, appending all pending lines with one write and
+# one fsync. The queue is flushed on interpreter shutdown (atexit).
+# The legacy per-sale venta_<n>_<ts>.log files can be produced on demand
+# with export_legacy_logs().
+
+LOG_DIR = config.LOG_DIR
+JOURNAL_PREFIX = "ventas_"
+JOURNAL_SUFFIX = ".jsonl"
+QUEUE_SIZE = 1000     # Max pending records before checkout waits
+BATCH_SIZE = 200      # Max records appended per write
+PUT_TIMEOUT = 5       # Seconds to wait for a queue slot before writing inline
+
+_STOP = object()
+
+
+def journal_filename(ts):
+    """Journal file name for the day of `ts` (daily rotation)."""
+    return f"{JOURNAL_PREFIX}{ts.strftime('%Y%m%d')}{JOURNAL_SUFFIX}"
+
+
+class SalesJournal:
+    """Background, batched writer for the daily JSONL sales journal."""
+
+    def __init__(self, log_dir=LOG_DIR, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="sales-journal", daemon=True)
+        self._thread.start()
+
+    def append(self, record):
+        """
+        Queue a sale record (dict with a 'timestamp' ISO string).
+        Returns the journal file name the record goes to.
+        """
+        ts = datetime.datetime.fromisoformat(record['timestamp'])
+        try:
+            self._queue.put(record, timeout=PUT_TIMEOUT)
+        except queue.Full:
+            # Writer is stuck or far behind - never lose a sale
+            print("[WARN] Sales journal queue full, writing inline")
+            self._write_batch([record])
+        return journal_filename(ts)
+
+    def flush(self):
+        """Block until every queued record has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Flush pending records and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            batch = [record]
+            # Drain whatever else is already waiting, up to batch_size
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            if _STOP in batch:
+                stop = True
+                batch = [r for r in batch if r is not _STOP]
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception as e:
+                print(f"Error writing sales journal: {e}")
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, records):
+        # Group by day so a batch spanning midnight lands in both files
+        by_file = {}
+        for record in records:
+            ts = datetime.datetime.fromisoformat(record['timestamp'])
+            by_file.setdefault(journal_filename(ts), []).append(
+                json.dumps(record, ensure_ascii=False)
+            )
+        with self._write_lock:
+            for filename, lines in by_file.items():
+                path = os.path.join(self.log_dir, filename)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    """Process-wide journal, started on first use and flushed at exit."""
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = SalesJournal()
+                atexit.register(_journal.close)
+    return _journal
+
+
+# ==============================================================================
+# LEGACY EXPORT
+# ==============================================================================
+
+def read_journal(log_dir=LOG_DIR, day=None):
+    """Yield sale records from the journal, optionally for one day (YYYY-MM-DD)."""
+    if day:
+        pattern = journal_filename(datetime.datetime.strptime(str(day), "%Y-%m-%d"))
+    else:
+        pattern = f"{JOURNAL_PREFIX}*{JOURNAL_SUFFIX}"
+    for path in sorted(glob.glob(os.path.join(log_dir, pattern))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash - skip it
+                    print(f"[WARN] Skipping unreadable journal line in {path}")
+
+
+def format_legacy_log(record):
+    """Render a journal record in the old venta_*.log layout."""
+    lines = []
+    for item in record['items']:
+        lines.append(f"{item['name']}, {item.get('brand','N/A')}, {item['code']}, {item['quantity']}, {item['sale_price']}")
+    return "\n".join(lines)
+
+
+def legacy_log_filename(record):
+    ts = datetime.datetime.fromisoformat(record['timestamp'])
+    return f"venta_{record['sale_number']}_{ts.strftime('%Y%m%d-%H%M%S')}.log"
+
+
+def export_legacy_logs(output_dir, day=None, sale_number=None, log_dir=LOG_DIR):
+    """
+    Write venta_<n>_<ts>.log files from the journal into output_dir.
+    Filter by day (YYYY-MM-DD) and/or sale_number. Returns the file names written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for record in read_journal(log_dir, day):
+        if sale_number is not None and record['sale_number'] != sale_number:
+            continue
+        filename = legacy_log_filename(record)
+        with open(os.path.join(output_dir, filename), "w", encoding="utf-8") as f:
+            f.write(format_legacy_log(record))
+        written.append(filename)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export sales journal to legacy venta_*.log files")
+    parser.add_argument("output_dir", help="Directory for the exported .log files")
+    parser.add_argument("--day", help="Only export sales from this day (YYYY-MM-DD)")
+    parser.add_argument("--sale", type=int, help="Only export this sale number")
+    args = parser.parse_args()
+
+    written = export_legacy_logs(args.output_dir, day=args.day, sale_number=args.sale)
+    print(f"Exported {len(written)} sale logs to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
 import pymupdf  # PyMuPDF (v1.24+ uses 'pymupdf' instead of 'fitz')
-import re
 import requests
 import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
+import config
+
 PDF_PATH = "catalogo-repuestos-y-accesorios.pdf"
 IMAGE_DIR = "imagenes"
 
@@ -12,6 +19,8 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0"
 }
 
+MANIFEST_NAME = "manifest.json"
+
 os.makedirs(IMAGE_DIR, exist_ok=True)
 
 # --------------------------------------------------
@@ -56,8 +65,6 @@ def process_product(url):
         return
 
     product_code = sku_span.text.strip()
-    # Sanitizar caracteres inválidos para Windows (: * ? " < > | \ /)
-    product_code = re.sub(r'[:\\*?"<>|/\\]', '_', product_code)
 
     if not product_code:
         print(f"⚠️ No se encontró referencia en {url}")
@@ -85,7 +92,8 @@ def process_product(url):
         print(f"❌ Error descargando imagen {product_code}: {e}")
         return
 
-    image_path = os.path.join(IMAGE_DIR, f"{product_code}.jpg")
+    # Mismo nombre que el ETL (sin caracteres inválidos para Windows)
+    image_path = os.path.join(IMAGE_DIR, config.image_filename(product_code))
 
     with open(image_path, "wb") as f:
         f.write(img_data)
@@ -94,12 +102,214 @@ def process_product(url):
 
 
 # --------------------------------------------------
-# 3. PIPELINE
+# 3. CRAWLER CONCURRENTE
+# --------------------------------------------------
+# Las imágenes se guardan por contenido: <sha256>.<ext> dentro de image_dir,
+# así dos SKUs con la misma foto la guardan una sola vez. manifest.json
+# guarda URL->SKU y SKU->hash para no volver a pedir lo que ya está.
+# Con link_names=True además se crea <codigo>.jpg (hardlink al archivo del
+# hash) con el mismo nombre que usa el ETL, así static/ sirve para ambos.
+
+class RateLimiter:
+    """Limita los requests a `rate` por segundo entre todos los workers."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ImageStore:
+    """Directorio de imágenes por hash + manifest (thread-safe)."""
+
+    EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+
+    def __init__(self, image_dir, link_names=False):
+        self.image_dir = image_dir
+        self.link_names = link_names
+        self.manifest_path = os.path.join(image_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        os.makedirs(image_dir, exist_ok=True)
+        self.manifest = {"urls": {}, "skus": {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest.update(json.load(f))
+
+    @staticmethod
+    def etl_filename(sku):
+        # Mismo nombre que logic.scrape_product_images
+        return config.image_filename(sku)
+
+    def has_url(self, url):
+        with self._lock:
+            return url in self.manifest["urls"]
+
+    def has_sku(self, sku):
+        with self._lock:
+            if sku in self.manifest["skus"]:
+                return True
+        # Imagen ya bajada por el ETL (static/<codigo>.jpg)
+        return self.link_names and os.path.exists(os.path.join(self.image_dir, self.etl_filename(sku)))
+
+    def mark_url(self, url, sku):
+        with self._lock:
+            self.manifest["urls"][url] = sku
+
+    def save(self, sku, data, content_type=None):
+        """Guarda los bytes una sola vez por hash. Devuelve (hash, nuevo)."""
+        digest = hashlib.sha256(data).hexdigest()
+        ext = self.EXTENSIONS.get((content_type or "").split(";")[0].strip(), ".jpg")
+        path = os.path.join(self.image_dir, digest + ext)
+        with self._lock:
+            is_new = not os.path.exists(path)
+            if is_new:
+                tmp_path = path + ".part"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self.manifest["skus"][sku] = digest + ext
+        if self.link_names:
+            self._link(sku, path)
+        return digest, is_new
+
+    def _link(self, sku, path):
+        alias = os.path.join(self.image_dir, self.etl_filename(sku))
+        if os.path.exists(alias):
+            return
+        try:
+            os.link(path, alias)
+        except OSError:
+            # Sin soporte de hardlinks: copia
+            with open(path, "rb") as src, open(alias, "wb") as dst:
+                dst.write(src.read())
+
+    def flush(self):
+        with self._lock:
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, indent=1, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+
+
+def fetch_product_image_url(url, limiter, session):
+    """Devuelve (sku, image_url) o (None, motivo)."""
+    limiter.wait()
+    r = session.get(url, headers=HEADERS, timeout=15)
+    r.raise_for_status()
+    soup = BeautifulSoup(r.text, "html.parser")
+
+    sku_div = soup.find("div", class_="product-sku")
+    sku_span = sku_div.find("span", itemprop="sku") if sku_div else None
+    if not sku_span or not sku_span.text.strip():
+        return None, "sin product-sku"
+    # SKU tal cual (clave del manifest = código en la base); el nombre de
+    # archivo lo sanea config.image_filename
+    product_code = sku_span.text.strip()
+
+    img_tag = (soup.select_one(".images-container img")
+               or soup.select_one(".product-cover img")
+               or soup.select_one(".product-image img"))
+    if not img_tag or not (img_tag.get("src") or img_tag.get("data-src")):
+        return product_code, None
+    return product_code, urljoin(url, img_tag.get("src") or img_tag.get("data-src"))
+
+
+def crawl_product(url, store, limiter, session):
+    if store.has_url(url):
+        return "skip-url"
+    try:
+        sku, image_url = fetch_product_image_url(url, limiter, session)
+    except Exception as e:
+        print(f"❌ Error cargando {url}: {e}")
+        return "error"
+    if sku is None:
+        print(f"⚠️ {image_url} en {url}")
+        return "error"
+    if store.has_sku(sku):
+        store.mark_url(url, sku)
+        return "skip-sku"
+    if not image_url:
+        print(f"⚠️ No se encontró imagen para {sku}")
+        return "error"
+
+    try:
+        limiter.wait()
+        r = session.get(image_url, headers=HEADERS, timeout=15)
+        r.raise_for_status()
+    except Exception as e:
+        print(f"❌ Error descargando imagen {sku}: {e}")
+        return "error"
+
+    digest, is_new = store.save(sku, r.content, r.headers.get("Content-Type"))
+    store.mark_url(url, sku)
+    print(f"✅ {sku} -> {digest[:12]}{'' if is_new else ' (duplicada)'}")
+    return "saved" if is_new else "dedup"
+
+
+def crawl(urls, image_dir=IMAGE_DIR, workers=4, rate=2.0, link_names=False):
+    """Procesa las URLs con un pool de workers. Devuelve conteo por resultado."""
+    store = ImageStore(image_dir, link_names=link_names)
+    limiter = RateLimiter(rate)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    pending = [u for u in urls if not store.has_url(u)]
+    counts = {"skip-url": len(urls) - len(pending)}
+    print(f"🔗 {len(pending)} URLs nuevas ({counts['skip-url']} ya procesadas)")
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(crawl_product, u, store, limiter, session) for u in pending]
+            for i, future in enumerate(as_completed(futures), 1):
+                status = future.result()
+                counts[status] = counts.get(status, 0) + 1
+                if i % 50 == 0:
+                    store.flush()
+                    print(f"[{i}/{len(pending)}] {counts}")
+    finally:
+        store.flush()
+    return counts
+
+
+# --------------------------------------------------
+# 4. PIPELINE
 # --------------------------------------------------
 def main():
-    urls = extract_urls_from_pdf(PDF_PATH)
+    parser = argparse.ArgumentParser(description="Scraping de imágenes desde los links del catálogo PDF")
+    parser.add_argument("--pdf", default=PDF_PATH, help="PDF con links a productos")
+    parser.add_argument("--crawl", action="store_true", help="Modo concurrente con dedup por hash y manifest")
+    parser.add_argument("--workers", type=int, default=4, help="Workers del crawler")
+    parser.add_argument("--rate", type=float, default=2.0, help="Máximo de requests por segundo")
+    parser.add_argument("--image-dir", default=IMAGE_DIR, help="Directorio de imágenes (ej: static para compartir con el ETL)")
+    parser.add_argument("--link-names", action="store_true", help="Crear también <codigo>.jpg como el ETL")
+    parser.add_argument("--etl", action="store_true", help="Usar el directorio de imágenes del ETL (static/) con --link-names")
+    args = parser.parse_args()
+
+    if args.etl:
+        args.image_dir = config.STATIC_DIR
+        args.link_names = True
+
+    urls = extract_urls_from_pdf(args.pdf)
     print(f"🔗 URLs encontradas: {len(urls)}")
 
+    if args.crawl:
+        counts = crawl(urls, image_dir=args.image_dir, workers=args.workers,
+                       rate=args.rate, link_names=args.link_names)
+        print(f"Resultado: {counts}")
+        return
+
     for i, url in enumerate(urls, 1):
         print(f"[{i}/{len(urls)}] Procesando producto")
         process_product(url)
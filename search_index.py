@@ -0,0 +1,240 @@
+import re
+import sqlite3
+import threading
+import unicodedata
+
+import database
+from database import get_connection
+from instrumentation import timed, timer
+
+# ==============================================================================
+# TYPO-TOLERANT PRODUCT SEARCH
+# ==============================================================================
+# In-memory trigram index over code, name, brand and description. Every word
+# is padded (" asiento " -> " as", "asi", ..., "to ") and each trigram maps to
+# the set of product ids containing it. A query matches a product by the share
+# of the query's trigrams the product has, so "asientto" or "simano" still
+# find "Asiento" / "SHIMANO"; exact substring hits rank first.
+#
+# The index lives in the process (one per Streamlit server / ETL runner) and
+# stays current by replaying product_changes, a change log filled by triggers
+# on products (migration 8): each search costs one indexed query when nothing
+# changed, and only the changed rows are re-indexed when something did.
+#
+# Lookups are bounded: candidates come only from the rarest query trigrams
+# (a product below MIN_SIMILARITY cannot be missing from all of them), and
+# only those candidates are scored.
+
+MIN_SIMILARITY = 0.4          # share of the query's trigrams a match must have
+MIN_QUERY_CHARS = 3           # shorter queries use a plain substring match
+EXACT_MATCH_BONUS = 1.0       # query found verbatim in the product text
+REBUILD_FRACTION = 0.2        # replaying more changes than this x catalog: rebuild
+CHANGELOG_MAX_ROWS = 20000    # prune product_changes beyond this many rows...
+CHANGELOG_KEEP_ROWS = 5000    # ...keeping the newest ones
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    """Lowercase, accents stripped, anything but letters/digits -> single space."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def trigrams(normalized):
+    """Set of padded per-word trigrams of an already normalized string."""
+    grams = set()
+    for word in normalized.split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def _product_text(code, name, brand, description):
+    return normalize(" ".join(str(v) for v in (code, name, brand, description) if v))
+
+
+class TrigramIndex:
+    """Trigram -> product ids, plus each product's code and normalized text."""
+
+    def __init__(self):
+        self.postings = {}
+        self.docs = {}        # product id -> (code, normalized text)
+        self.last_seq = 0
+
+    def _add(self, product_id, code, text):
+        self.docs[product_id] = (code, text)
+        for gram in trigrams(text):
+            ids = self.postings.get(gram)
+            if ids is None:
+                ids = self.postings[gram] = set()
+            ids.add(product_id)
+
+    def _remove(self, product_id):
+        doc = self.docs.pop(product_id, None)
+        if doc is None:
+            return
+        for gram in trigrams(doc[1]):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self.postings[gram]
+
+    @timed("search.rebuild")
+    def rebuild(self, cursor):
+        self.postings = {}
+        self.docs = {}
+        self.last_seq = cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM product_changes').fetchone()[0]
+        for product_id, code, name, brand, description in cursor.execute(
+                'SELECT id, code, name, brand, description FROM products'):
+            self._add(product_id, code, _product_text(code, name, brand, description))
+
+    @timed("search.refresh")
+    def refresh(self, cursor):
+        """
+        Apply the product changes logged since the last refresh (or rebuild).
+        Returns True if anything changed.
+        """
+        max_seq, pending = cursor.execute(
+            'SELECT (SELECT COALESCE(MAX(seq), 0) FROM product_changes), '
+            '(SELECT COUNT(*) FROM product_changes WHERE seq > ?)', (self.last_seq,)
+        ).fetchone()
+        if max_seq < self.last_seq:
+            # The log went back in time: DB restored from a backup
+            self.rebuild(cursor)
+            return True
+        if not pending:
+            return False
+        oldest = cursor.execute('SELECT MIN(seq) FROM product_changes').fetchone()[0]
+        # Log pruned past our position, or so many changes a rebuild is cheaper
+        if oldest > self.last_seq + 1 or pending > max(len(self.docs), 1000) * REBUILD_FRACTION:
+            self.rebuild(cursor)
+            return True
+
+        changed = [row[0] for row in cursor.execute(
+            'SELECT DISTINCT product_id FROM product_changes WHERE seq > ? AND seq <= ?',
+            (self.last_seq, max_seq))]
+        for product_id in changed:
+            self._remove(product_id)
+        for start in range(0, len(changed), 500):
+            chunk = changed[start:start + 500]
+            cursor.execute(
+                f"SELECT id, code, name, brand, description FROM products WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            for product_id, code, name, brand, description in cursor.fetchall():
+                self._add(product_id, code, _product_text(code, name, brand, description))
+        self.last_seq = max_seq
+        return True
+
+    @timed("search.query")
+    def search(self, query, limit=None, min_similarity=MIN_SIMILARITY):
+        """Codes of the matching products, best match first."""
+        q = normalize(query)
+        if not q:
+            return []
+        if len(q.replace(" ", "")) < MIN_QUERY_CHARS:
+            # Too short for trigrams to mean anything: substring match, catalog order
+            hits = [code for _, (code, text) in sorted(self.docs.items()) if q in text]
+            return hits[:limit] if limit else hits
+
+        grams = trigrams(q)
+        needed = max(1, int(len(grams) * min_similarity + 0.999999))
+        # A product with `needed` of the grams must hold at least one of the
+        # (len - needed + 1) rarest ones: only those postings produce candidates
+        by_rarity = sorted(grams, key=lambda g: len(self.postings.get(g, ())))
+        candidates = set()
+        for gram in by_rarity[:len(grams) - needed + 1]:
+            candidates.update(self.postings.get(gram, ()))
+
+        # Score each query word on its own so a short brand counts as much as
+        # a long name: "pedal gw" must not rank any pedal above GW's pedals
+        word_postings = []
+        for word in set(q.split()):
+            word_grams = trigrams(word)
+            word_postings.append(([self.postings[g] for g in word_grams if g in self.postings],
+                                  float(len(word_grams))))
+        scored = []
+        for product_id in candidates:
+            word_hits = [sum(1 for ids in sets if product_id in ids) for sets, _ in word_postings]
+            if sum(word_hits) < needed:
+                continue
+            code, text = self.docs[product_id]
+            score = sum(h / n for h, (_, n) in zip(word_hits, word_postings)) / len(word_postings)
+            if q in text:
+                score += EXACT_MATCH_BONUS
+            scored.append((-score, code))
+        scored.sort()
+        codes = [code for _, code in scored]
+        return codes[:limit] if limit else codes
+
+
+# One index per DB file, kept for the life of the process and shared by all
+# Streamlit sessions: refresh/rebuild and searches all hold _lock, so a search
+# never walks postings while another session is updating them
+_indexes = {}
+_lock = threading.RLock()
+
+
+def _prune_changelog(conn):
+    """Keep product_changes small; indexes left behind rebuild themselves."""
+    count = conn.execute('SELECT COUNT(*) FROM product_changes').fetchone()[0]
+    if count <= CHANGELOG_MAX_ROWS:
+        return
+    try:
+        conn.execute('DELETE FROM product_changes WHERE seq <= (SELECT MAX(seq) FROM product_changes) - ?',
+                     (CHANGELOG_KEEP_ROWS,))
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        # Busy DB (ETL running): try again on a later search
+        print(f"[WARN] Could not prune product_changes: {e}")
+
+
+def get_index():
+    """
+    The up-to-date index of the current DB (built on first use).
+    Hold search_index._lock while using it from more than one thread.
+    """
+    with _lock:
+        return _current_index()
+
+
+def _current_index():
+    index = _indexes.get(database.DB_NAME)
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        if index is None:
+            index = _indexes[database.DB_NAME] = TrigramIndex()
+            index.rebuild(cursor)
+            _prune_changelog(conn)
+        elif index.refresh(cursor):
+            _prune_changelog(conn)
+    finally:
+        conn.close()
+    return index
+
+
+def drop_index():
+    """Forget the current DB's index (after a restore); the next search rebuilds it."""
+    with _lock:
+        _indexes.pop(database.DB_NAME, None)
+
+
+def search(query, limit=None):
+    """Product codes matching `query` (typos tolerated), best first."""
+    with timer("search.total"), _lock:
+        return _current_index().search(query, limit)
+
+
+def filter_products(products, query):
+    """The given product dicts that match `query`, best match first."""
+    if not query or not query.strip():
+        return products
+    by_code = {p['code']: p for p in products}
+    return [by_code[code] for code in search(query) if code in by_code]
@@ -0,0 +1,314 @@
+import io
+import os
+import csv
+import sys
+import glob
+import uuid
+import sqlite3
+import argparse
+from datetime import datetime
+
+import config
+from database import get_connection
+from instrumentation import timed
+
+# ==============================================================================
+# SUPPLY ORDERS
+# ==============================================================================
+# Every generated supply order is stored in supply_orders / supply_order_lines
+# (status pending -> received), so past and pending orders are one indexed
+# query away instead of a glob over logs/order_*.csv. The CSV is still
+# written for the supplier, with the same columns as before.
+#
+# Receiving an order adds its lines to stock and marks it received in one
+# write transaction; used_orders keeps recording redeemed IDs, so an order
+# can never be received twice, whether by ID or by uploading its CSV.
+#
+#     python supply_orders.py import-csv      # backfill from logs/order_*.csv
+#     python supply_orders.py list [--status pending]
+#     python supply_orders.py receive ORD-1A2B3C4D
+#     python supply_orders.py csv ORD-1A2B3C4D [path]
+
+STATUS_PENDING = "pending"
+STATUS_RECEIVED = "received"
+CSV_COLUMNS = ['code', 'name', 'quantity', 'cost_price', 'total', 'order_id']
+
+
+def new_order_id():
+    return f"ORD-{uuid.uuid4().hex[:8].upper()}"
+
+
+def _now_local():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _merge_lines(lines):
+    """Lines with the same code summed into one, in first-seen order."""
+    merged = {}
+    for line in lines:
+        code = str(line['code'])
+        if code in merged:
+            merged[code]['quantity'] += int(line['quantity'])
+        else:
+            merged[code] = {'code': code, 'name': line.get('name'), 'quantity': int(line['quantity']),
+                            'cost_price': line.get('cost_price')}
+    return list(merged.values())
+
+
+def _blank(value):
+    """None, '' and NaN (pandas' empty cell) all mean an empty cell."""
+    return value is None or value != value or str(value).strip() == ""
+
+
+def lines_from_records(records):
+    """
+    Order lines from CSV records (dicts with code, quantity, optionally name
+    and cost_price), merged by code. ValueError naming the file rows
+    (header = row 1) with a blank code or a quantity that is not a positive
+    whole number.
+    """
+    lines, bad = [], []
+    for row_number, record in enumerate(records, start=2):
+        code, quantity, cost = record.get('code'), record.get('quantity'), record.get('cost_price')
+        try:
+            quantity = float(quantity)
+            cost = None if _blank(cost) else float(cost)
+        except (TypeError, ValueError):
+            bad.append(row_number)
+            continue
+        if _blank(code) or quantity != quantity or quantity <= 0 or quantity != int(quantity):
+            bad.append(row_number)
+            continue
+        name = record.get('name')
+        lines.append({'code': str(code).strip(), 'name': None if _blank(name) else str(name),
+                      'quantity': int(quantity), 'cost_price': cost})
+    if bad:
+        shown = ", ".join(str(n) for n in bad[:10]) + (" ..." if len(bad) > 10 else "")
+        raise ValueError(f"Invalid code or quantity in row(s) {shown}")
+    if not lines:
+        raise ValueError("The order has no lines")
+    return _merge_lines(lines)
+
+
+def order_differences(order, lines):
+    """(code, stored quantity, file quantity) for every code where a stored order and file lines disagree."""
+    stored = {l['code']: l['quantity'] for l in order['lines']}
+    given = {l['code']: l['quantity'] for l in lines}
+    return [(code, stored.get(code, 0), given.get(code, 0))
+            for code in sorted(set(stored) | set(given)) if stored.get(code, 0) != given.get(code, 0)]
+
+
+def _insert_order(cursor, order_id, lines, created_at, status, csv_file):
+    lines = _merge_lines(lines)
+    total_items = sum(line['quantity'] for line in lines)
+    total_cost = sum(line['quantity'] * (line['cost_price'] or 0.0) for line in lines)
+    cursor.execute('''
+        INSERT INTO supply_orders (order_id, status, created_at, total_items, total_cost, csv_file)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (order_id, status, created_at or _now_local(), total_items, total_cost, csv_file))
+    cursor.executemany('''
+        INSERT INTO supply_order_lines (order_id, code, name, quantity, cost_price)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(order_id, l['code'], l['name'], l['quantity'], l['cost_price']) for l in lines])
+
+
+@timed("orders.create_order")
+def create_order(lines, order_id=None, created_at=None, status=STATUS_PENDING, csv_file=None):
+    """
+    Store an order (lines: dicts with code, quantity and optionally name,
+    cost_price). Returns the order ID; ValueError if it already exists.
+    """
+    order_id = order_id or new_order_id()
+    conn = get_connection()
+    try:
+        _insert_order(conn.cursor(), order_id, lines, created_at, status, csv_file)
+        conn.commit()
+    except sqlite3.IntegrityError:
+        raise ValueError(f"Order {order_id} already exists")
+    finally:
+        conn.close()
+    return order_id
+
+
+@timed("orders.get_order")
+def get_order(order_id):
+    """The order with its lines (dict, 'lines' list), or None."""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT * FROM supply_orders WHERE order_id = ?', (order_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        order = dict(row)
+        cursor.execute('''
+            SELECT code, name, quantity, cost_price FROM supply_order_lines
+            WHERE order_id = ? ORDER BY id
+        ''', (order_id,))
+        order['lines'] = [dict(line) for line in cursor.fetchall()]
+        return order
+    finally:
+        conn.close()
+
+
+@timed("orders.list_orders")
+def list_orders(status=None, limit=50):
+    """Orders (without lines), newest first, optionally only one status."""
+    where, params = ("WHERE status = ?", [status]) if status else ("", [])
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(f'''
+            SELECT order_id, status, created_at, received_at, total_items, total_cost
+            FROM supply_orders {where} ORDER BY created_at DESC LIMIT ?
+        ''', params + [limit]).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+@timed("orders.receive_order")
+def receive_order(order_id):
+    """
+    Add the order's lines to stock and mark it received, atomically.
+    Returns the number of products updated; ValueError if the order is
+    unknown or was already received.
+    """
+    conn = get_connection()
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    try:
+        # Write lock first: two tabs receiving the same order serialize here
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('SELECT status, total_items FROM supply_orders WHERE order_id = ?', (order_id,))
+        row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"Unknown order {order_id}")
+        cursor.execute('SELECT 1 FROM used_orders WHERE order_id = ?', (order_id,))
+        if row[0] == STATUS_RECEIVED or cursor.fetchone():
+            raise ValueError(f"Order {order_id} was already redeemed")
+
+        cursor.execute('SELECT code, quantity FROM supply_order_lines WHERE order_id = ?', (order_id,))
+        lines = cursor.fetchall()
+        updated = 0
+        for code, quantity in lines:
+            cursor.execute('UPDATE products SET stock_quantity = stock_quantity + ? WHERE code = ?',
+                           (quantity, code))
+            updated += cursor.rowcount
+        cursor.execute('INSERT INTO used_orders (order_id, total_items) VALUES (?, ?)', (order_id, row[1]))
+        cursor.execute('UPDATE supply_orders SET status = ?, received_at = ? WHERE order_id = ?',
+                       (STATUS_RECEIVED, _now_local(), order_id))
+        cursor.execute('COMMIT')
+        return updated
+    finally:
+        # Closing with the transaction still open rolls it back
+        conn.close()
+
+
+def order_csv_text(order):
+    """The supplier CSV (CSV_COLUMNS) of an order dict from get_order()."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(CSV_COLUMNS)
+    writer.writerows([l['code'], l['name'], l['quantity'], l['cost_price'],
+                      l['quantity'] * (l['cost_price'] or 0.0), order['order_id']] for l in order['lines'])
+    return buf.getvalue()
+
+
+def write_order_csv(order_id, path):
+    """Write an order as the supplier CSV; returns the path."""
+    order = get_order(order_id)
+    if order is None:
+        raise ValueError(f"Unknown order {order_id}")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(order_csv_text(order))
+    return path
+
+
+@timed("orders.import_order_csvs")
+def import_order_csvs(log_dir=None):
+    """
+    Backfill orders from logs/order_*.csv files with an order_id column
+    (received if their ID is in used_orders). Files without an order ID or
+    with invalid rows are skipped. Returns (imported, skipped).
+    """
+    log_dir = log_dir or config.LOG_DIR
+    conn = get_connection()
+    cursor = conn.cursor()
+    imported = skipped = 0
+    try:
+        known = {row[0] for row in cursor.execute('SELECT order_id FROM supply_orders')}
+        used = {row[0] for row in cursor.execute('SELECT order_id FROM used_orders')}
+        for path in sorted(glob.glob(os.path.join(log_dir, "order_*.csv"))):
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+            if not rows or not rows[0].get('order_id'):
+                # Files from before order IDs: they could never be redeemed
+                skipped += 1
+                continue
+            order_id = rows[0]['order_id']
+            if order_id in known:
+                continue
+            stamp = os.path.basename(path)[len("order_"):-len(".csv")]
+            try:
+                created_at = datetime.strptime(stamp, "%Y%m%d-%H%M%S").strftime('%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                created_at = datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M:%S')
+            try:
+                lines = lines_from_records(rows)
+            except ValueError as e:
+                print(f"[WARN] Skipping {os.path.basename(path)}: {e}")
+                skipped += 1
+                continue
+            _insert_order(cursor, order_id, lines, created_at,
+                          STATUS_RECEIVED if order_id in used else STATUS_PENDING, os.path.basename(path))
+            known.add(order_id)
+            imported += 1
+        # One transaction for the whole backfill
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"[INFO] Imported {imported} order files ({skipped} skipped)")
+    return imported, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supply order history")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("import-csv", help="Backfill orders from logs/order_*.csv")
+    list_cmd = sub.add_parser("list", help="Orders, newest first")
+    list_cmd.add_argument("--status", choices=[STATUS_PENDING, STATUS_RECEIVED])
+    list_cmd.add_argument("--limit", type=int, default=50)
+    receive = sub.add_parser("receive", help="Add an order to stock")
+    receive.add_argument("order_id")
+    export = sub.add_parser("csv", help="Write an order as the supplier CSV")
+    export.add_argument("order_id")
+    export.add_argument("path", nargs="?", help="Default: <order_id>.csv")
+    args = parser.parse_args()
+
+    if args.command == "import-csv":
+        import_order_csvs()
+    elif args.command == "list":
+        for o in list_orders(args.status, args.limit):
+            print(f"{o['order_id']}  {o['status']:<9} {o['created_at']}  {o['total_items']:5d} items  "
+                  f"${o['total_cost'] or 0:12,.2f}")
+    elif args.command == "receive":
+        try:
+            updated = receive_order(args.order_id)
+        except ValueError as e:
+            print(f"[WARN] {e}")
+            return 1
+        print(f"Order {args.order_id} received: {updated} products updated")
+    elif args.command == "csv":
+        try:
+            path = write_order_csv(args.order_id, args.path or f"{args.order_id}.csv")
+        except ValueError as e:
+            print(f"[WARN] {e}")
+            return 1
+        print(f"Order {args.order_id} written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
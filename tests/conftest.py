@@ -0,0 +1,26 @@
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+import pytest
+
+# Tests import the app modules from the repository root, and never touch
+# products.db or logs/: config reads these before any project module loads
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="stock_tests_")
+os.environ["STOCK_DB_PATH"] = os.path.join(WORK_DIR, "products.db")
+os.environ["STOCK_LOG_DIR"] = os.path.join(WORK_DIR, "logs")
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+sys.path.insert(0, ROOT_DIR)
+
+
+@pytest.fixture
+def scratch_db(tmp_path, monkeypatch):
+    """A fresh, migrated database for one test; returns its path."""
+    import database
+    path = str(tmp_path / "products.db")
+    monkeypatch.setattr(database, "DB_NAME", path)
+    database.init_db()
+    return path
@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+from cart import Cart
+
+
+def line(code, quantity=1, price=10.0):
+    return {'code': code, 'name': f"Producto {code}", 'quantity': quantity, 'sale_price': price}
+
+
+def recomputed(cart):
+    """Totals summed from scratch over the cart's lines."""
+    return (sum(l['quantity'] for l in cart),
+            sum(l['quantity'] * l['sale_price'] for l in cart))
+
+
+def test_add_merges_existing_code():
+    cart = Cart('sale_price')
+    cart.add(line('A', 2))
+    cart.add(line('B', 1, 5.0))
+    merged = cart.add(line('A', 3))
+
+    assert len(cart) == 2
+    assert merged['quantity'] == 5
+    assert cart.quantity('A') == 5
+    assert [l['code'] for l in cart] == ['A', 'B']  # first-added order kept
+    assert (cart.total_items, cart.total_amount) == (6, 55.0)
+
+
+def test_add_copies_the_line():
+    original = line('A', 2)
+    cart = Cart('sale_price', [original])
+    cart.add(line('A', 1))
+    assert original['quantity'] == 2
+
+
+def test_add_explicit_quantity():
+    cart = Cart('sale_price')
+    cart.add(line('A', 99), quantity=4)
+    assert cart.quantity('A') == 4
+    assert cart.total_amount == 40.0
+
+
+def test_set_quantity_updates_totals():
+    cart = Cart('sale_price', [line('A', 2), line('B', 1, 5.0)])
+    cart.set_quantity('A', 7)
+    assert cart.quantity('A') == 7
+    assert (cart.total_items, cart.total_amount) == (8, 75.0)
+
+
+@pytest.mark.parametrize("quantity", [0, -3])
+def test_set_quantity_zero_or_less_removes_line(quantity):
+    cart = Cart('sale_price', [line('A', 2), line('B', 1, 5.0)])
+    assert cart.set_quantity('A', quantity) is None
+    assert 'A' not in cart
+    assert cart.quantity('A') == 0
+    assert (cart.total_items, cart.total_amount) == (1, 5.0)
+
+
+def test_set_quantity_unknown_code_raises():
+    cart = Cart('sale_price')
+    with pytest.raises(KeyError):
+        cart.set_quantity('X', 1)
+
+
+def test_remove_missing_code_is_a_noop():
+    cart = Cart('sale_price', [line('A', 2)])
+    assert cart.remove('X') is None
+    assert len(cart) == 1
+    assert (cart.total_items, cart.total_amount) == (2, 20.0)
+
+
+def test_remove_returns_line_and_resets_empty_cart():
+    cart = Cart('sale_price', [line('A', 3, 0.1), line('B', 7, 0.7)])
+    removed = cart.remove('A')
+    assert removed['code'] == 'A'
+    cart.remove('B')
+    assert not cart
+    assert (cart.total_items, cart.total_amount) == (0, 0.0)
+
+
+def test_clear():
+    cart = Cart('sale_price', [line('A', 2), line('B', 1)])
+    cart.clear()
+    assert len(cart) == 0
+    assert cart.lines() == []
+    assert (cart.total_items, cart.total_amount) == (0, 0.0)
+    cart.add(line('C', 1))
+    assert (cart.total_items, cart.total_amount) == (1, 10.0)
+
+
+def test_missing_price_counts_as_zero():
+    cart = Cart('cost_price', [{'code': 'A', 'name': 'a', 'quantity': 3, 'cost_price': None}])
+    assert (cart.total_items, cart.total_amount) == (3, 0.0)
+
+
+def test_running_totals_match_recomputation():
+    rng = random.Random(42)
+    cart = Cart('sale_price')
+    codes = [f"SKU{n}" for n in range(30)]
+    prices = {code: round(rng.uniform(0.5, 900), 2) for code in codes}
+    for _ in range(2000):
+        code = rng.choice(codes)
+        op = rng.random()
+        if op < 0.5:
+            cart.add(line(code, rng.randint(1, 5), prices[code]))
+        elif op < 0.75 and code in cart:
+            cart.set_quantity(code, rng.randint(-1, 10))
+        else:
+            cart.remove(code)
+        items, amount = recomputed(cart)
+        assert cart.total_items == items
+        assert cart.total_amount == pytest.approx(amount, abs=1e-6)
@@ -0,0 +1,31 @@
+import database
+import data_export
+
+
+def product_rows():
+    conn = database.get_connection()
+    rows = conn.execute('SELECT code, description, image_path, has_image FROM products ORDER BY code').fetchall()
+    conn.close()
+    return rows
+
+
+def test_csv_round_trip_keeps_nulls(scratch_db, tmp_path, monkeypatch):
+    database.add_product("IMG", "Con imagen", "C", "B", 1.0, image_path="static/IMG.jpg",
+                         description="Filtro", image_verified=True)
+    database.add_product("NOIMG", "Sin imagen", "C", "B", 1.0)
+    conn = database.get_connection()
+    conn.execute("UPDATE products SET description = NULL WHERE code = 'NOIMG'")
+    conn.commit()
+    conn.close()
+    before = product_rows()
+    assert before[1] == ("NOIMG", None, None, 0)
+
+    export_dir = str(tmp_path / "export")
+    data_export.export_data(export_dir, fmt="csv", tables=["products"])
+
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "copy.db"))
+    database.init_db()
+    data_export.import_data(export_dir, replace=True)
+
+    assert product_rows() == before
+    assert database.get_image_status() == {"IMG": (0, True), "NOIMG": (0, False)}
@@ -0,0 +1,34 @@
+import database
+
+
+def has_image(code):
+    conn = database.get_connection()
+    row = conn.execute('SELECT image_path, has_image FROM products WHERE code = ?', (code,)).fetchone()
+    conn.close()
+    return row
+
+
+def test_new_product_flag(scratch_db):
+    database.add_product("NEW", "Nuevo", "C", "B", 1.0, image_path="static/NEW.jpg", image_verified=True)
+    database.add_product("OLD", "Previo", "C", "B", 1.0, image_path="static/OLD.jpg")
+    database.add_product("NONE", "Sin imagen", "C", "B", 1.0)
+
+    assert has_image("NEW") == ("static/NEW.jpg", 1)
+    # Pre-existing static/ file the scraper skipped: not checked yet
+    assert has_image("OLD") == ("static/OLD.jpg", None)
+    assert has_image("NONE") == (None, 0)
+
+
+def test_update_keeps_or_resets_flag(scratch_db):
+    database.add_product("A", "A", "C", "B", 1.0, image_path="static/A.jpg", image_verified=True)
+    database.add_product("A", "A", "C", "B", 2.0, image_path="static/A.jpg")
+    assert has_image("A") == ("static/A.jpg", 1)
+
+    database.add_product("A", "A", "C", "B", 2.0)
+    assert has_image("A") == ("static/A.jpg", 1)
+
+    database.add_product("A", "A", "C", "B", 2.0, image_path="static/other/A.jpg")
+    assert has_image("A") == ("static/other/A.jpg", None)
+
+    database.add_product("A", "A", "C", "B", 2.0, image_path="static/A.jpg", image_verified=True)
+    assert has_image("A") == ("static/A.jpg", 1)
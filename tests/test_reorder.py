@@ -0,0 +1,44 @@
+import json
+
+import database
+import reorder
+
+
+def add_products(rows):
+    conn = database.get_connection()
+    conn.executemany(
+        'INSERT INTO products (code, name, brand, cost_price, stock_quantity) VALUES (?, ?, ?, ?, ?)',
+        [(code, f"Producto {code}", "TEST", 10.0, stock) for code, stock in rows]
+    )
+    conn.commit()
+    conn.close()
+
+
+def sell(code, quantity):
+    items = [{'code': code, 'name': f"Producto {code}", 'quantity': quantity,
+              'sale_price': 20.0, 'cost_price': 10.0}]
+    database.log_sale_db(20.0 * quantity, json.dumps(items))
+
+
+def test_slow_seller_over_long_lookback(scratch_db):
+    # One unit in a year: velocity rounds to 0.00 for display
+    add_products([("SLOW", 0), ("FAST", 2)])
+    sell("SLOW", 1)
+    sell("FAST", 30)
+
+    suggestions = reorder.get_reorder_suggestions(lookback_days=365, lead_time_days=30, safety_days=30)
+
+    assert [s['code'] for s in suggestions] == ["SLOW", "FAST"]
+    assert suggestions[0]['velocity'] == 0.0
+    assert suggestions[0]['quantity'] >= 1
+
+
+def test_most_urgent_first(scratch_db):
+    add_products([("A", 9), ("B", 1), ("C", 100)])
+    for code in ("A", "B", "C"):
+        sell(code, 10)
+
+    suggestions = reorder.get_reorder_suggestions(lookback_days=10, lead_time_days=7, safety_days=3)
+
+    # C has 100 days of stock and is not suggested; B runs out before A
+    assert [s['code'] for s in suggestions] == ["B", "A"]
@@ -0,0 +1,28 @@
+import os
+import tarfile
+
+import sales_archive
+
+
+def touch(log_dir, name):
+    with open(os.path.join(log_dir, name), "w", encoding="utf-8") as f:
+        f.write("x\n")
+
+
+def test_pack_logs_packs_old_journals(tmp_path):
+    log_dir = str(tmp_path)
+    old = ["ventas_20200103.jsonl", "ventas_20200117.jsonl", "venta_7_20200103-101500.log",
+           "order_20200220-090000.csv"]
+    kept = ["ventas_29990101.jsonl", "notes.txt"]
+    for name in old + kept:
+        touch(log_dir, name)
+
+    packed = sales_archive.pack_logs(retention_days=365, log_dir=log_dir)
+
+    assert packed == len(old)
+    assert sorted(n for n in os.listdir(log_dir) if n != sales_archive.ARCHIVE_DIR_NAME) == sorted(kept)
+    archive_dir = os.path.join(log_dir, sales_archive.ARCHIVE_DIR_NAME)
+    assert sorted(os.listdir(archive_dir)) == ["order_2020-02.tar.gz", "venta_2020-01.tar.gz",
+                                               "ventas_2020-01.tar.gz"]
+    with tarfile.open(os.path.join(archive_dir, "ventas_2020-01.tar.gz")) as tar:
+        assert sorted(tar.getnames()) == ["ventas_20200103.jsonl", "ventas_20200117.jsonl"]